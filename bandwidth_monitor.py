@@ -0,0 +1,199 @@
+# bandwidth_monitor.py - monitor bandwidth live dari `/queue/simple print stats` (1x per detik per router)
+#
+# Satu panggilan per router per tick untuk SEMUA pelanggan, jadi biaya per
+# detik tetap walau jumlah pelanggan bertambah. Sample `rate` disimpan di
+# ring buffer ukuran tetap (array) dan jendela Tk memakai ulang item canvas
+# yang sama setiap tick (tidak ada widget/item baru per tick).
+import heapq
+import threading
+import time
+import tkinter as tk
+from array import array
+
+from mikrotik_usage import parse_counter_pair
+
+DEFAULT_HISTORY = 60        # sample (detik) per pelanggan
+DEFAULT_TOP = 15
+RATE_PROPLIST = ('name', 'target', 'rate')
+STALE_TICKS = 30            # queue yang hilang selama ini dibuang dari monitor
+
+
+class RateRing:
+    """Ring buffer rate (bit/s) ukuran tetap, upload+download disimpan terpisah"""
+    __slots__ = ('name', 'up', 'down', 'pos', 'count', 'seen')
+
+    def __init__(self, name, size):
+        self.name = name
+        self.up = array('d', bytes(8 * size))
+        self.down = array('d', bytes(8 * size))
+        self.pos = 0
+        self.count = 0
+        self.seen = 0
+
+    def push(self, up, down, tick):
+        self.up[self.pos] = up
+        self.down[self.pos] = down
+        self.pos = (self.pos + 1) % len(self.up)
+        self.count = min(self.count + 1, len(self.up))
+        self.seen = tick
+
+    @property
+    def current(self):
+        i = self.pos - 1
+        return self.up[i] + self.down[i] if self.count else 0.0
+
+    def peak(self):
+        return max(u + d for u, d in zip(self.up, self.down)) if self.count else 0.0
+
+    def total_at(self, age):
+        """Rate total `age` sample yang lalu (0 = terbaru)"""
+        i = (self.pos - 1 - age) % len(self.up)
+        return self.up[i] + self.down[i]
+
+
+class BandwidthMonitor:
+    """Thread per router, poll rate semua queue tiap `interval` detik"""
+    def __init__(self, clients, history=DEFAULT_HISTORY, interval=1.0):
+        self.clients = list(clients)
+        self.history = history
+        self.interval = interval
+        self.rings = {}         # (host, target) -> RateRing
+        self.errors = {}        # host -> pesan error terakhir (None = ok)
+        self._ticks = {}        # host -> jumlah poll
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return self
+        self._stop.clear()
+        for client in self.clients:
+            t = threading.Thread(target=self._run, args=(client,), name=f"bw-monitor-{client.host}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._threads = []
+
+    def _run(self, client):
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            self.poll(client)
+            next_at += self.interval
+            delay = next_at - time.monotonic()
+            if delay < 0:
+                next_at = time.monotonic()   # router lambat: jangan kejar tick yang terlewat
+                delay = 0
+            self._stop.wait(delay)
+
+    def poll(self, client):
+        if not client.connect():
+            self.errors[client.host] = client.last_error
+            return
+        try:
+            queues = client.get_queues(proplist=RATE_PROPLIST)
+        except Exception as e:
+            self.errors[client.host] = str(e)
+            return
+        finally:
+            client.disconnect()
+        self.errors[client.host] = None
+        host = client.host
+        with self._lock:
+            tick = self._ticks[host] = self._ticks.get(host, 0) + 1
+            for q in queues:
+                target = q.get('target') or q.get('name')
+                if not target:
+                    continue
+                ring = self.rings.get((host, target))
+                if ring is None:
+                    ring = self.rings[(host, target)] = RateRing(q.get('name') or target, self.history)
+                up, down = parse_counter_pair(q.get('rate'))
+                ring.push(up, down, tick)
+            for key in [k for k, r in self.rings.items() if k[0] == host and tick - r.seen > STALE_TICKS]:
+                del self.rings[key]
+
+    def top(self, n=DEFAULT_TOP):
+        """n pelanggan dengan rate terbaru tertinggi: list ((host, target), RateRing)"""
+        with self._lock:
+            return heapq.nlargest(n, self.rings.items(), key=lambda kv: kv[1].current)
+
+
+def format_rate(bps):
+    for unit, div in (("Gbps", 1e9), ("Mbps", 1e6), ("kbps", 1e3)):
+        if bps >= div:
+            return f"{bps / div:.1f} {unit}"
+    return f"{bps:.0f} bps"
+
+
+# ===== Jendela Tk =====
+ROW_H = 28
+NAME_W = 220
+RATE_W = 110
+SPARK_W = 360
+
+def open_bandwidth_window(parent, clients, top_n=DEFAULT_TOP, history=DEFAULT_HISTORY, interval=1.0):
+    """Toplevel top talker + sparkline; monitor berhenti saat jendela ditutup"""
+    monitor = BandwidthMonitor(clients, history, interval).start()
+
+    win = tk.Toplevel(parent)
+    win.title("📈 Monitor Bandwidth Live")
+    status = tk.Label(win, text="Menunggu data...", anchor="w")
+    status.pack(fill="x", padx=8, pady=(8, 0))
+    width = NAME_W + RATE_W + SPARK_W + 20
+    canvas = tk.Canvas(win, width=width, height=top_n * ROW_H + 10, bg="white", highlightthickness=0)
+    canvas.pack(padx=8, pady=8)
+
+    # item canvas dibuat sekali, tiap tick hanya coords/itemconfigure
+    step = SPARK_W / max(1, history - 1)
+    xs = [NAME_W + RATE_W + i * step for i in range(history)]
+    pts = [0.0] * (2 * history)
+    rows = []
+    for r in range(top_n):
+        y = 5 + r * ROW_H
+        rows.append((
+            canvas.create_rectangle(NAME_W + RATE_W, y + 2, NAME_W + RATE_W, y + ROW_H - 2,
+                                    fill="#cce5ff", outline=""),
+            canvas.create_text(6, y + ROW_H / 2, anchor="w", font=("Segoe UI", 9)),
+            canvas.create_text(NAME_W + RATE_W - 8, y + ROW_H / 2, anchor="e", font=("Consolas", 9, "bold")),
+            canvas.create_line(xs[0], y + ROW_H - 3, xs[-1], y + ROW_H - 3, fill="#0066cc", width=1.5),
+        ))
+
+    def tick():
+        if not win.winfo_exists():
+            return
+        talkers = monitor.top(top_n)
+        scale = max((ring.peak() for _, ring in talkers), default=0.0) or 1.0
+        for r, (bar, name_item, rate_item, line) in enumerate(rows):
+            y = 5 + r * ROW_H
+            if r >= len(talkers):
+                canvas.itemconfigure(name_item, text="")
+                canvas.itemconfigure(rate_item, text="")
+                canvas.coords(bar, NAME_W + RATE_W, y + 2, NAME_W + RATE_W, y + ROW_H - 2)
+                canvas.itemconfigure(line, state="hidden")
+                continue
+            (host, _), ring = talkers[r]
+            canvas.itemconfigure(name_item, text=f"{ring.name}  ({host})")
+            canvas.itemconfigure(rate_item, text=format_rate(ring.current))
+            canvas.coords(bar, NAME_W + RATE_W, y + 2, NAME_W + RATE_W + SPARK_W * ring.current / scale, y + ROW_H - 2)
+            base = y + ROW_H - 3
+            for i in range(history):
+                pts[2 * i] = xs[i]
+                pts[2 * i + 1] = base - (ROW_H - 6) * ring.total_at(history - 1 - i) / scale
+            canvas.coords(line, pts)
+            canvas.itemconfigure(line, state="normal")
+        down = [h for h, err in monitor.errors.items() if err]
+        status.config(text=f"{len(monitor.rings)} queue dipantau dari {len(monitor.clients)} router"
+                           + (f" | gagal: {', '.join(down)}" if down else ""))
+        win.after(int(interval * 1000), tick)
+
+    def on_close():
+        monitor.stop()
+        win.destroy()
+
+    win.protocol("WM_DELETE_WINDOW", on_close)
+    win.after(int(interval * 1000), tick)
+    return win
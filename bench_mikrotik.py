@@ -0,0 +1,112 @@
+# bench_mikrotik.py - ukur refresh & write-back usage terhadap routeros_sim (tanpa router asli)
+#
+#   python bench_mikrotik.py --routers 3 --leases 10000 --latency 0.005
+#   python bench_mikrotik.py --client async --max-refresh 2.0   (exit 1 kalau lebih lambat)
+#   python bench_mikrotik.py --record rekaman/                   (rekam sesi ke rekaman/<host>-*.jsonl.gz)
+#   python bench_mikrotik.py --replay rekaman/a.jsonl.gz --speed 0   (putar ulang rekaman, tanpa router)
+import argparse
+import asyncio
+import sys
+import time
+
+from routeros_sim import SimulatedRouter, make_tables
+
+
+def start_routers(n, leases, latency, error_rate, disconnect_rate):
+    routers = []
+    for i in range(n):
+        r = SimulatedRouter(make_tables(leases, seed=i + 1), latency=latency,
+                            error_rate=error_rate, disconnect_rate=disconnect_rate, seed=i + 1)
+        r.start_in_thread()
+        routers.append(r)
+    return routers
+
+def sim_clients(routers, record_dir=None):
+    from mikrotik_client import MikrotikClient, RouterOsApiPool
+    if RouterOsApiPool is None:
+        print("[ERROR] routeros_api tidak terinstall, pakai --client async atau --replay")
+        sys.exit(2)
+    clients = [MikrotikClient("127.0.0.1", "admin", "", r.port) for r in routers]
+    if record_dir:
+        from mikrotik_replay import enable_recording
+        enable_recording(clients, record_dir)
+    return clients
+
+def replay_clients(files, speed):
+    from mikrotik_replay import ReplayClient
+    return [ReplayClient(f, speed=speed, host=f"replay{i + 1}") for i, f in enumerate(files)]
+
+def bench_sync(clients, rounds):
+    from mikrotik_collector import collect_parallel, load_pelanggan_dari_mikrotik_per_interface
+    from mikrotik_writeback import update_usage_comment_all
+    hasil = {}
+    for n in range(rounds):
+        t = time.perf_counter()
+        rows, _ = collect_parallel(clients, load_pelanggan_dari_mikrotik_per_interface)
+        hasil.setdefault("refresh", []).append(time.perf_counter() - t)
+    for n in range(rounds):
+        t = time.perf_counter()
+        report = update_usage_comment_all(clients)
+        hasil.setdefault("writeback", []).append(time.perf_counter() - t)
+    print(f"[INFO] {len(rows)} pelanggan, write-back terakhir: {len(report['written'])} ditulis, "
+          f"{len(report['skipped'])} dilewati, {len(report['failed'])} gagal")
+    for c in clients:
+        if c.recorder is not None:
+            c.recorder.close()
+        if getattr(c, "misses", 0):
+            print(f"[WARN] {c.host}: {c.misses} panggilan tidak ada di rekaman")
+    return hasil
+
+def bench_async(routers, rounds):
+    from routeros_async import AsyncMikrotikClient, gather_routers
+
+    async def refresh(c):
+        leases, index = await asyncio.gather(c.get_leases_with_comment(), c.get_queue_usage_index())
+        return [(l.get('address'), index.usage_gb(l.get('address'))) for l in leases]
+
+    hasil = {}
+    for n in range(rounds):
+        clients = [AsyncMikrotikClient("127.0.0.1", "admin", "", r.port) for r in routers]
+        t = time.perf_counter()
+        results = asyncio.run(gather_routers(clients, refresh))
+        hasil.setdefault("refresh", []).append(time.perf_counter() - t)
+    total = sum(len(r) for _, r in results if isinstance(r, list))
+    print(f"[INFO] {total} pelanggan dari {len(routers)} router")
+    return hasil
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark refresh/write-back terhadap simulator RouterOS")
+    ap.add_argument("--client", choices=("sync", "async"), default="sync")
+    ap.add_argument("--routers", type=int, default=3)
+    ap.add_argument("--leases", type=int, default=2000)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--disconnect-rate", type=float, default=0.0)
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--max-refresh", type=float, default=None, help="batas detik refresh terbaik (regresi)")
+    ap.add_argument("--record", metavar="DIR", default=None, help="rekam sesi tiap router ke folder ini (sync)")
+    ap.add_argument("--replay", metavar="FILE", nargs="+", default=None, help="putar ulang rekaman, satu file per router")
+    ap.add_argument("--speed", type=float, default=1.0, help="kecepatan replay (1 = asli, 0 = tanpa jeda)")
+    a = ap.parse_args()
+
+    if a.replay:
+        routers = []
+        hasil = bench_sync(replay_clients(a.replay, a.speed), a.rounds)
+    else:
+        routers = start_routers(a.routers, a.leases, a.latency, a.error_rate, a.disconnect_rate)
+        if a.client == "sync":
+            hasil = bench_sync(sim_clients(routers, a.record), a.rounds)
+        else:
+            hasil = bench_async(routers, a.rounds)
+    for name, times in hasil.items():
+        print(f"{name:10}: terbaik {min(times):.3f}s, rata-rata {sum(times) / len(times):.3f}s ({len(times)}x)")
+    for i, r in enumerate(routers):
+        print(f"router {i + 1}: {r.stats}")
+        r.stop()
+
+    if a.max_refresh is not None and min(hasil["refresh"]) > a.max_refresh:
+        print(f"[ERROR] Refresh {min(hasil['refresh']):.3f}s > batas {a.max_refresh}s")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
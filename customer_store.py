@@ -0,0 +1,199 @@
+# customer_store.py - data pelanggan manual di SQLite (pengganti customers.json)
+#
+# Tambah/edit/hapus hanya menyentuh satu baris (transaksi SQLite, mode WAL),
+# bukan menulis ulang seluruh file JSON. Pencarian lewat index nama, IP,
+# no HP dan jatuh tempo. customers.json lama dimigrasikan otomatis sekali;
+# file lama dibiarkan apa adanya, migrasinya dicatat di tabel meta.
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_DB_FILE = "customers.db"
+SCHEMA_VERSION = 2
+COLUMNS = ('nama_pelanggan', 'paket', 'harga', 'no_hp', 'jatuh_tempo', 'ip', 'usage_total')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id             INTEGER PRIMARY KEY,
+    nama_pelanggan TEXT NOT NULL,
+    paket          TEXT DEFAULT '-',
+    harga          INTEGER DEFAULT 0,
+    no_hp          TEXT DEFAULT '-',
+    jatuh_tempo    TEXT DEFAULT '-',
+    ip             TEXT DEFAULT '',
+    usage_total    TEXT DEFAULT '-',
+    extra          TEXT             -- field lain (iface, usage, ...) sebagai JSON
+);
+CREATE INDEX IF NOT EXISTS idx_customers_nama ON customers(nama_pelanggan);
+CREATE INDEX IF NOT EXISTS idx_customers_ip ON customers(ip);
+CREATE INDEX IF NOT EXISTS idx_customers_no_hp ON customers(no_hp);
+CREATE INDEX IF NOT EXISTS idx_customers_jatuh_tempo ON customers(jatuh_tempo);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+MIGRATED_KEY = "legacy_json_migrated"
+
+
+def _harga(v):
+    try:
+        return int(v or 0)
+    except (TypeError, ValueError):
+        digits = ''.join(ch for ch in str(v) if ch.isdigit())
+        return int(digits) if digits else 0
+
+def _split(d):
+    """dict pelanggan -> (nilai kolom, JSON extra atau None)"""
+    values = {k: d[k] for k in COLUMNS if k in d}
+    if 'harga' in values:
+        values['harga'] = _harga(values['harga'])
+    extra = {k: v for k, v in d.items() if k not in COLUMNS and k != 'id'}
+    return values, extra
+
+
+class CustomerStore:
+    """
+    Repository pelanggan manual. Baris dikembalikan sebagai dict biasa
+    (key sama dengan customers.json) ditambah "id" (primary key SQLite).
+    Aman dipakai dari beberapa thread (satu koneksi + lock).
+    """
+    def __init__(self, path=DEFAULT_DB_FILE, legacy_json=None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        if legacy_json:
+            self.migrate_json(legacy_json)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT, ROLLBACK kalau ada error"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    # ---- migrasi ----
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row['value'] if row else default
+
+    def migrate_json(self, json_path):
+        """
+        Import customers.json sekali. File JSON tidak diubah; migrasi dicatat
+        di tabel meta (satu transaksi dengan import), jadi tidak diulang.
+        Dilewati juga kalau tabel sudah berisi. Return jumlah baris.
+        """
+        if not os.path.exists(json_path) or self.get_meta(MIGRATED_KEY) or self.count():
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[WARN] Gagal baca {json_path} untuk migrasi: {e}")
+            return 0
+        try:
+            with self.transaction() as db:
+                for d in data:
+                    self._insert(d)
+                db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                           (MIGRATED_KEY, json.dumps({"file": os.path.basename(json_path), "rows": len(data)})))
+        except Exception as e:
+            print(f"[ERROR] Migrasi {json_path} dibatalkan (rollback): {e}")
+            return 0
+        print(f"[INFO] {len(data)} pelanggan dimigrasikan dari {json_path} ke {self.path}")
+        return len(data)
+
+    # ---- baca ----
+    @staticmethod
+    def _row(row):
+        d = {k: row[k] for k in COLUMNS}
+        if row['extra']:
+            d.update(json.loads(row['extra']))
+        d['id'] = row['id']
+        return d
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+
+    def all(self, order_by='nama_pelanggan'):
+        order = order_by if order_by in COLUMNS or order_by == 'id' else 'nama_pelanggan'
+        with self._lock:
+            rows = self._db.execute(f"SELECT * FROM customers ORDER BY {order}, id").fetchall()
+        return [self._row(r) for r in rows]
+
+    def get(self, customer_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM customers WHERE id=?", (customer_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def find(self, nama_pelanggan=None, ip=None, no_hp=None):
+        """Pelanggan pertama yang cocok (kriteria None diabaikan), atau None"""
+        where, args = [], []
+        for col, val in (('nama_pelanggan', nama_pelanggan), ('ip', ip), ('no_hp', no_hp)):
+            if val is not None:
+                where.append(f"{col}=?")
+                args.append(val)
+        sql = "SELECT * FROM customers" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY id LIMIT 1"
+        with self._lock:
+            row = self._db.execute(sql, args).fetchone()
+        return self._row(row) if row else None
+
+    def due_between(self, start, end):
+        """Pelanggan dengan jatuh_tempo (teks YYYY-MM-DD) di antara start..end"""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM customers WHERE jatuh_tempo BETWEEN ? AND ? ORDER BY jatuh_tempo",
+                                    (start, end)).fetchall()
+        return [self._row(r) for r in rows]
+
+    # ---- tulis ----
+    def _insert(self, d):
+        values, extra = _split(d)
+        values.setdefault('nama_pelanggan', '')
+        cols = list(values) + ['extra']
+        cur = self._db.execute(
+            f"INSERT INTO customers ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+            [*values.values(), json.dumps(extra, ensure_ascii=False) if extra else None])
+        return cur.lastrowid
+
+    def add(self, d):
+        """Tambah pelanggan, return id"""
+        with self.transaction():
+            return self._insert(d)
+
+    def update(self, customer_id, changes):
+        """Ubah sebagian field satu pelanggan. Return True kalau barisnya ada"""
+        values, extra = _split(changes)
+        with self.transaction() as db:
+            row = db.execute("SELECT extra FROM customers WHERE id=?", (customer_id,)).fetchone()
+            if row is None:
+                return False
+            if extra:
+                merged = json.loads(row['extra']) if row['extra'] else {}
+                merged.update(extra)
+                values['extra'] = json.dumps(merged, ensure_ascii=False)
+            if values:
+                db.execute(f"UPDATE customers SET {', '.join(f'{k}=?' for k in values)} WHERE id=?",
+                           [*values.values(), customer_id])
+            return True
+
+    def delete(self, customer_id):
+        with self.transaction() as db:
+            return db.execute("DELETE FROM customers WHERE id=?", (customer_id,)).rowcount > 0
@@ -2,7 +2,7 @@
 import os
 import sys
 import json
-import ipaddress
+import time
 from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
@@ -13,18 +13,23 @@ from PIL import Image, ImageDraw, ImageFont, ImageTk, ImageWin
 import win32print
 import win32ui
 from settings_window import open_settings_window
+from bandwidth_monitor import open_bandwidth_window
+from mikrotik_provision import (DEFAULT_MAX_LIMIT, MANAGED_TAG, desired_queues, provision_router,
+                                apply_queue_changes, summarize_plan)
 from ttkbootstrap import Style
 import tkinter as tk
 from tkinter import ttk
 from ttkbootstrap import Style
 import ttkbootstrap as tb
-
-# Optional libs (jika ada)
-
-try:
-    from routeros_api import RouterOsApiPool
-except ImportError:
-    RouterOsApiPool = None
+from mikrotik_collector import collect_parallel, load_pelanggan_dari_mikrotik_per_interface
+from mikrotik_usage import target_covers
+from mikrotik_writeback import update_usage_comment_per_interface, update_usage_comment_all
+from mikrotik_client import MikrotikClient, CircuitBreaker, RouterOsApiPool, session_pool, parse_comment
+from usage_engine import UsageEngine
+from customer_store import CustomerStore
+from snapshot_cache import load_snapshot, save_snapshot
+from refresh_worker import RefreshWorker
+from virtual_table import VirtualTable
 
 # ========== Utility: resource path & config ==========
 def resource_path(relative_path):
@@ -78,39 +83,8 @@ def format_rupiah(angka):
     except Exception:
         return f"Rp {angka}"
 
-# ===== Helper Parsing Comment =====
-def parse_comment(comment):
-    data = {}
-    key_map = {
-        'nama': 'nama_pelanggan',
-        'paket': 'paket',
-        'harga': 'harga',
-        'due': 'jatuh_tempo',
-        'jatuh_tempo': 'jatuh_tempo',
-        'no_hp': 'no_hp',
-    }
-    try:
-        parts = [p for p in comment.split(';') if ':' in p]
-        for part in parts:
-            k, v = part.split(':', 1)
-            k_clean = k.strip().lower()
-            v_clean = v.strip()
-            if k_clean in key_map:
-                data[key_map[k_clean]] = v_clean
-    except Exception as e:
-        print(f"[ERROR] Gagal parse comment: {comment} -> {e}")
-    return data
-
-def validate_comment(comment):
-    return bool(str(comment or "").strip())
-
 def ip_in_target(ip_addr, target_str):
-    try:
-        if '/' not in target_str:
-            return ip_addr == target_str
-        return ipaddress.ip_address(ip_addr) in ipaddress.ip_network(target_str, strict=False)
-    except:
-        return False
+    return target_covers(ip_addr, target_str)
 
 def build_comment_from_dict(d):
     """
@@ -131,117 +105,20 @@ def build_comment_from_dict(d):
             parts.append(f"{k}:{v}")
     return '; '.join(parts)
 
-# ========== Mikrotik client (jika routeros_api ada) ==========
-class MikrotikClient:
-    def __init__(self, host, username, password, port=8728):
-        self.host = host
-        self.username = username
-        self.password = password
-        self.port = port
-        self.api = None
-        self.connection = None
-
-    def connect(self):
-        try:
-            self.connection = RouterOsApiPool(
-                self.host,
-                username=self.username,
-                password=self.password,
-                port=self.port,
-                plaintext_login=True,
-                use_ssl=False
-            )
-            self.api = self.connection.get_api()
-            return True
-        except Exception as e:
-            print(f"[ERROR] Gagal konek ke {self.host}: {e}")
-            return False
-
-    def disconnect(self):
-        try:
-            if self.connection:
-                self.connection.disconnect()
-        except:
-            pass
-
-    def get_leases_with_comment(self):
-        if not self.api:
-            return []
-        try:
-            leases = self.api.get_resource('/ip/dhcp-server/lease').get()
-            filtered = [l for l in leases if validate_comment(l.get('comment', ''))]
-            for l in filtered:
-                l['parsed'] = parse_comment(l.get('comment', ''))
-            return filtered
-        except Exception as e:
-            print(f"[ERROR] Gagal ambil leases: {e}")
-            return []
-
-    def get_monthly_usage_gb(self, ip_addr):
-        """Hitung total usage per IP dari queue simple (upload+download)"""
-        if not self.api or not ip_addr:
-            return 0.0
-        try:
-            queues = self.api.get_resource('/queue/simple').call('print', {'stats': ''})
-            for q in queues:
-                target = q.get('target', '') or q.get('dst', '')
-                if ip_in_target(ip_addr, target):
-                    tb = q.get('bytes')
-                    if tb:
-                        parts = tb.split('/')
-                        total_bytes = sum(int(p) for p in parts if p.isdigit())
-                        return round(total_bytes / (1024**3), 2)
-        except:
-            pass
-        return 0.0
-
-    def get_interface_usage_gb(self, interface_name=None):
-        """Hitung usage per interface (upload+download)"""
-        if not self.api:
-            return {} if interface_name is None else 0.0
-        usage = {}
-        try:
-            interfaces = self.api.get_resource('/interface').get()
-            for intf in interfaces:
-                name = intf.get('name')
-                if interface_name and name != interface_name:
-                    continue
-                rx = int(intf.get('rx-byte', 0))
-                tx = int(intf.get('tx-byte', 0))
-                usage_gb = round((rx + tx) / (1024**3), 2)
-                usage[name] = usage_gb
-            if interface_name:
-                return usage.get(interface_name, 0.0)
-            return usage
-        except:
-            return {} if interface_name is None else 0.0
-
-    # ---- New: set comment helpers ----
-    def set_lease_comment_by_id(self, lease_id, comment):
-        if not self.api or not lease_id:
-            return False
-        try:
-            self.api.get_resource('/ip/dhcp-server/lease').call('set', {'.id': lease_id, 'comment': comment})
-            return True
-        except Exception as e:
-            print(f"[ERROR] Gagal set comment (.id={lease_id}): {e}")
-            return False
-
-    def set_lease_comment_by_address(self, address, comment):
-        if not self.api or not address:
-            return False
-        try:
-            res = self.api.get_resource('/ip/dhcp-server/lease')
-            leases = res.get()
-            target = next((l for l in leases if l.get('address') == address), None)
-            if not target:
-                print(f"[WARN] Lease untuk address {address} tidak ditemukan.")
-                return False
-            lease_id = target.get('.id')
-            return self.set_lease_comment_by_id(lease_id, comment)
-        except Exception as e:
-            print(f"[ERROR] Gagal set comment (address={address}): {e}")
-            return False
+def parse_comment_to_dict(comment):
+    """Kebalikan build_comment_from_dict: parse_comment + field Usage"""
+    d = parse_comment(comment or "")
+    for part in str(comment or "").split(';'):
+        k, sep, v = part.partition(':')
+        if sep and k.strip().lower() == 'usage':
+            d['usage'] = v.strip()
+    return d
+
+# usage per siklus tagihan (sample counter queue, tahan reset/reboot router)
+usage_engine = None
+if cfg["app"].get("usage_cycle", True):
+    usage_engine = UsageEngine(resource_path(cfg["app"].get("usage_state_file", "usage_state.json")),
+                               cfg["app"].get("billing_cycle_day", 1))
 
 # build mikrotik_clients list from config
 mikrotik_clients = []
@@ -249,49 +126,142 @@ for r in cfg.get("routers", []):
     mikrotik_clients.append(MikrotikClient(r.get("host","127.0.0.1"),
                                            r.get("username","admin"),
                                            r.get("password",""),
-                                           r.get("port",8728)))
+                                           r.get("port",8728),
+                                           connect_timeout=r.get("connect_timeout", cfg["app"].get("connect_timeout", 3)),
+                                           read_timeout=r.get("read_timeout", cfg["app"].get("read_timeout", 15)),
+                                           breaker=CircuitBreaker(
+                                               r.get("breaker_failures", cfg["app"].get("breaker_failures", 3)),
+                                               r.get("breaker_reset", cfg["app"].get("breaker_reset", 30)))))
+    mikrotik_clients[-1].interface_policy = r.get(
+        "interface_usage_policy", cfg["app"].get("interface_usage_policy", "router_total"))
+    mikrotik_clients[-1].usage_engine = usage_engine
+
+# rekam sesi API ke file (untuk replay/benchmark offline, lihat mikrotik_replay.py)
+session_recorders = []
+if cfg["app"].get("record_session_dir"):
+    from mikrotik_replay import enable_recording
+    session_recorders = enable_recording(mikrotik_clients, resource_path(cfg["app"]["record_session_dir"]))
+
+# poll usage background: refresh membaca snapshot lokal, bukan menarik queue dari router
+usage_sampler = None
+if usage_engine is not None and cfg["app"].get("usage_poll_interval", 300) > 0:
+    from usage_sampler import UsageSampler
+    usage_sampler = UsageSampler(mikrotik_clients, usage_engine,
+                                 interval=cfg["app"].get("usage_poll_interval", 300),
+                                 jitter=cfg["app"].get("usage_poll_jitter", 0.1),
+                                 max_backoff=cfg["app"].get("usage_poll_max_backoff", 1800))
+    for _mc in mikrotik_clients:
+        _mc.usage_sampler = usage_sampler
+    usage_sampler.start()
+
+# sesi RouterOS dipakai ulang antar refresh/edit (lihat mikrotik_client.SessionPool)
+session_pool.max_sessions = cfg["app"].get("max_sessions", 8)
+session_pool.idle_check = cfg["app"].get("keepalive_interval", 30)
+session_pool.start_keepalive()
+
+# mirror lease live (listen) per router, refresh tabel tidak download ulang lease
+if cfg["app"].get("lease_mirror", False):
+    from mikrotik_mirror import LeaseMirror
+    for _mc in mikrotik_clients:
+        _mc.mirror = LeaseMirror(_mc).start()
 
 # ========== Local manual customers store ==========
-CUSTOMERS_FILE = resource_path("customers.json")
-
-def load_manual_customers():
-    try:
-        if os.path.exists(CUSTOMERS_FILE):
-            with open(CUSTOMERS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except Exception as e:
-        print("[WARN] Gagal load customers.json:", e)
-    return []
-
-def save_manual_customers(lst):
-    try:
-        with open(CUSTOMERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(lst, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print("[ERROR] Gagal simpan customers.json:", e)
-
-manual_customers = load_manual_customers()
+# SQLite (WAL), customers.json lama dimigrasikan otomatis sekali
+customer_store = CustomerStore(resource_path(cfg["app"].get("customers_db", "customers.db")),
+                               legacy_json=resource_path("customers.json"))
 
 # ========== Generate RSC ==========
 def generate_mikrotik_rsc(pelanggan_list, output_file="queue_pelanggan.rsc"):
     """
-    Generate file .rsc untuk membuat simple queue di MikroTik per pelanggan.
-    pelanggan_list: list of dict [{'nama_pelanggan': 'Ilyas', 'ip': '192.168.22.254'}, ...]
+    Generate file .rsc lengkap (router kosong) untuk simple queue per pelanggan.
+    pelanggan_list: list of dict [{'nama_pelanggan': 'Ilyas', 'ip': '192.168.22.254', 'paket': '10Mbps'}, ...]
+    File hanya ditulis ulang kalau isinya berubah. Untuk router yang sudah
+    punya queue pakai provisioning (hanya perubahan), lihat on_provision_queue.
     """
+    desired = desired_queues(pelanggan_list, cfg["app"].get("queue_default_limit", DEFAULT_MAX_LIMIT))
+    content = "".join([
+        "# Auto-generated Mikrotik Simple Queue\n",
+        f"# Import ke MikroTik dengan: /import {output_file}\n",
+        "\n/queue simple\n",
+    ] + [f'add name="{q["name"]}" target={q["target"]} max-limit={q["max-limit"]} comment={MANAGED_TAG}\n'
+         for q in desired.values()])
     try:
+        if os.path.exists(output_file):
+            with open(output_file, "r") as f:
+                if f.read() == content:
+                    return
         with open(output_file, "w") as f:
-            f.write("# Auto-generated Mikrotik Simple Queue\n")
-            f.write("# Import ke MikroTik dengan: /import queue_pelanggan.rsc\n")
-            f.write("\n/queue simple\n")
-            for p in pelanggan_list:
-                nama = p['nama_pelanggan'].replace(" ", "_")
-                ip = p.get('ip', '')
-                if ip:
-                    f.write(f'add name="{nama}" target={ip}/32 max-limit=20M/20M\n')
+            f.write(content)
         print(f"[INFO] File {output_file} berhasil dibuat.")
     except Exception as e:
         print(f"[ERROR] Gagal membuat file RSC: {e}")
-        
+
+def on_provision_queue():
+    """
+    Hitung changeset queue semua router (di background), tampilkan ringkasan,
+    terapkan kalau disetujui. Plan yang menghapus semua queue aplikasi di
+    sebuah router perlu konfirmasi kedua.
+    """
+    if provisioner.busy:
+        messagebox.showinfo("Provisioning Queue", "Provisioning queue masih berjalan.")
+        return
+    default_limit = cfg["app"].get("queue_default_limit", DEFAULT_MAX_LIMIT)
+
+    def plan_all(token):
+        plans = []
+        for client in mikrotik_clients:
+            token.check()
+            try:
+                plans.append((client, provision_router(client, default_limit, apply=False,
+                                                       rsc_file=f"queue_pelanggan_{client.host}.rsc")))
+            except Exception as e:
+                print(f"[WARN] Provisioning queue {client.host} dilewati: {e}")
+        return plans
+
+    def apply_all(todo, allow_remove_all):
+        def job(token):
+            gagal = 0
+            for client, result in todo:
+                token.check()
+                plan = result["plan"]
+                if not client.connect():
+                    gagal += len(plan["add"]) + len(plan["set"]) + len(plan["remove"])
+                    continue
+                gagal += len(apply_queue_changes(client, plan, allow_remove_all=allow_remove_all))
+            return gagal
+        return job
+
+    def planned(plans):
+        if not plans:
+            messagebox.showwarning("Provisioning Queue", "Tidak ada router yang bisa dihubungi.")
+            return
+        ringkasan = "\n".join(f"{c.host}: {summarize_plan(r['plan'])}" for c, r in plans)
+        todo = [(c, r) for c, r in plans if r["plan"]["add"] or r["plan"]["set"] or r["plan"]["remove"]]
+        if not todo:
+            messagebox.showinfo("Provisioning Queue", ringkasan + "\n\nSemua queue sudah sesuai.")
+            return
+        if not messagebox.askyesno("Provisioning Queue", ringkasan + "\n\nTerapkan perubahan ke router?"):
+            return
+        hapus_semua = [c.host for c, r in todo if r["plan"]["removes_all_managed"]]
+        if hapus_semua and not messagebox.askyesno(
+                "Provisioning Queue",
+                f"PERINGATAN: perubahan ini menghapus SEMUA queue buatan aplikasi di {', '.join(hapus_semua)}.\n\n"
+                "Yakin tetap diterapkan?", icon="warning", default="no"):
+            return
+        lbl_refresh.config(text="⏳ Provisioning queue: menerapkan perubahan...")
+        provisioner.start(apply_all(todo, bool(hapus_semua)), on_done=applied, on_error=failed, name="provision")
+
+    def applied(gagal):
+        lbl_refresh.config(text=f"✅ Provisioning queue selesai, {gagal} gagal")
+        messagebox.showinfo("Provisioning Queue", f"Selesai. {gagal} perubahan gagal (lihat log).")
+
+    def failed(e):
+        print(f"[ERROR] Provisioning queue gagal: {e}")
+        lbl_refresh.config(text=f"❌ Provisioning queue gagal: {e}")
+
+    lbl_refresh.config(text="⏳ Provisioning queue: menghitung perubahan...")
+    provisioner.start(plan_all, on_done=planned, on_error=failed, name="provision")
+
 # ===== Variabel Global =====
 last_selected_data = None   # data pelanggan yang dipilih dari tabel
 latest_pdf_path = None      # path PDF terakhir yang dibuat
@@ -531,91 +501,21 @@ def cetak_struk_win32print(data, printer_name=None):
     except Exception as e:
         messagebox.showerror("Error", f"Gagal mencetak: {e}")
 
-def ip_in_target(ip_addr, target_str):
-    try:
-        if '/' not in target_str:
-            return ip_addr == target_str
-        return ipaddress.ip_address(ip_addr) in ipaddress.ip_network(target_str, strict=False)
-    except:
-        return False
-
 # ========== Load pelanggan from Mikrotik and manual ==========
-def load_pelanggan_dari_mikrotik_per_interface(client: MikrotikClient):
-    if not client.connect():
-        return []
-    leases = client.get_leases_with_comment()
-    pelanggan_list = []
-
-    for lease in leases:
-        data = lease.get('parsed', {})
-        ip_addr = lease.get('address', '')
-
-        usage_total_gb = client.get_monthly_usage_gb(ip_addr)
-        usage_per_interface = {}
-        if usage_total_gb == 0.0:
-            usage_per_interface = client.get_interface_usage_gb()
-            usage_total_gb = sum(usage_per_interface.values())
-        if not usage_per_interface and usage_total_gb > 0:
-            usage_per_interface = {'QueueSimple': usage_total_gb}
-
-        usage_str = f"{usage_total_gb:.2f} GB" if usage_total_gb >= 1 else f"{usage_total_gb*1024:.2f} MB"
-
-        pelanggan_list.append({
-            "nama_pelanggan": data.get('nama_pelanggan', 'Unknown'),
-            "paket": data.get('paket', '-'),
-            "harga": int(data.get('harga', 0)),  # pastikan angka
-            "no_hp": data.get('no_hp', '-'),
-            "jatuh_tempo": data.get('jatuh_tempo', '-'),
-            "ip": ip_addr,
-            "usage_total": usage_str,
-            "usage_per_interface": usage_per_interface
-        })
-
-    client.disconnect()
-    return pelanggan_list
-
-def update_usage_comment_per_interface(client: MikrotikClient):
-    if not client.connect():
-        return
-    leases = client.get_leases_with_comment()
-
-    for lease in leases:
-        ip_addr = lease.get('address', '')
-
-        usage_total_gb = client.get_monthly_usage_gb(ip_addr)
-        usage_per_interface = {}
-        if usage_total_gb == 0.0:
-            usage_per_interface = client.get_interface_usage_gb()
-            usage_total_gb = sum(usage_per_interface.values())
-        if not usage_per_interface and usage_total_gb > 0:
-            usage_per_interface = {'QueueSimple': usage_total_gb}
-
-        usage_total_str = f"{usage_total_gb:.2f} GB" if usage_total_gb >= 1 else f"{usage_total_gb*1024:.2f} MB"
-        usage_interface_strs = []
-        for iface, gb in usage_per_interface.items():
-            s = f"{gb:.2f} GB" if gb >= 1 else f"{gb*1024:.2f} MB"
-            usage_interface_strs.append(f"{iface}: {s}")
-        usage_full_str = f"Total: {usage_total_str}; " + '; '.join(usage_interface_strs)
-
-        old_comment = lease.get('comment', '')
-        comment_parts = [p.strip() for p in old_comment.split(';') if p.strip() and not p.strip().startswith('Usage:')]
-        comment_parts.append(f"Usage: {usage_full_str}")
-        new_comment = '; '.join(comment_parts)
-
-        try:
-            client.api.get_resource('/ip/dhcp-server/lease').call('set', {
-                '.id': lease.get('.id'),
-                'comment': new_comment
-            })
-        except:
-            pass
-
-    client.disconnect()
-
-def collect_all_pelanggan(selected_ip=None):
+def collect_all_pelanggan(selected_ip=None, groups=None, on_progress=None, cancel=None):
+    """
+    groups (opsional): diisi baris per sumber, "manual" dan host router yang ok
+    on_progress(entry, rows): dipanggil begitu satu sumber selesai, "manual" dulu lalu
+                              tiap router (entry seperti report)
+    cancel: token/Event, router yang belum selesai ditinggal kalau di-set
+    Return (data_all, report): report = status per router milik refresh ini
+    (host, status, count, elapsed, error)
+    """
+    report = []
     data_all = []
-    for c in manual_customers:
+    for c in customer_store.all():
         data_all.append({
+            "key": f"manual:{c['id']}",
             "nama_pelanggan": c.get("nama_pelanggan"),
             "paket": c.get("paket","-"),
             "harga": int(c.get("harga",0)),
@@ -624,14 +524,43 @@ def collect_all_pelanggan(selected_ip=None):
             "ip": c.get("ip",""),
             "usage_total": c.get("usage_total","-")
         })
+    if groups is not None:
+        groups["manual"] = list(data_all)
+    if on_progress is not None:
+        on_progress({"host": "manual", "status": "ok", "count": len(data_all), "elapsed": 0.0, "error": None},
+                    list(data_all))
+
+    def on_router(entry, rows):
+        if groups is not None and entry["status"] == "ok":
+            groups[entry["host"]] = rows
+        if on_progress is not None:
+            on_progress(entry, rows)
+
     if selected_ip is None or selected_ip == "Semua MikroTik":
-        for client in mikrotik_clients:
-            data_all.extend(load_pelanggan_dari_mikrotik_per_interface(client))
+        rows, report = collect_parallel(
+            mikrotik_clients,
+            load_pelanggan_dari_mikrotik_per_interface,
+            max_workers=cfg["app"].get("collect_workers", 4),
+            deadline=cfg["app"].get("router_deadline", 20),
+            on_result=on_router,
+            cancel=cancel,
+        )
+        data_all.extend(rows)
     else:
         client = next((c for c in mikrotik_clients if c.host == selected_ip), None)
         if client:
-            data_all.extend(load_pelanggan_dari_mikrotik_per_interface(client))
-    return data_all
+            t0 = time.monotonic()
+            try:
+                rows, status, error = load_pelanggan_dari_mikrotik_per_interface(client), "ok", None
+            except Exception as e:
+                print(f"[ERROR] Gagal ambil pelanggan {client.host}: {e}")
+                rows, status, error = [], "error", str(e)
+            data_all.extend(rows)
+            entry = {"host": client.host, "status": status,
+                     "count": len(rows), "elapsed": round(time.monotonic() - t0, 3), "error": error}
+            report.append(entry)
+            on_router(entry, rows)
+    return data_all, report
 
 # ========== GUI & Handlers ==========
 root = tb.Window(themename="cyborg") 
@@ -710,6 +639,11 @@ ttk.Button(frame_top, text="🌐 Router Setting", style="GlassBlue.TButton", wid
            
 ttk.Button(frame_top, text="Daftar Pelanggan", style="GlassBlue.TButton", width=18,
            command=lambda: show_daftar_pelanggan()).pack(side="left", padx=5)
+ttk.Button(frame_top, text="📈 Bandwidth Live", style="GlassBlue.TButton", width=18,
+           command=lambda: open_bandwidth_window(root, mikrotik_clients,
+                                                 top_n=cfg["app"].get("monitor_top", 15))).pack(side="left", padx=5)
+ttk.Button(frame_top, text="🚦 Provisioning Queue", style="GlassBlue.TButton", width=18,
+           command=on_provision_queue).pack(side="left", padx=5)
 ttk.Button(frame_top, text="❌ Keluar", style="GlassBlue.TButton", width=12, command=root.quit).pack(side="left", padx=10)
 
 # IP combo
@@ -718,6 +652,13 @@ tk.Label(frame_ip, text="Pilih IP MikroTik:", font=("Arial",10,"bold")).pack(sid
 ip_list = ["Semua MikroTik"] + [r.get("host","127.0.0.1") for r in cfg.get("routers", [])]
 combo_ip = ttk.Combobox(frame_ip, values=ip_list, state="readonly", width=30)
 combo_ip.pack(side="left"); combo_ip.current(0)
+tk.Label(frame_ip, text="🔍 Cari:", font=("Arial",10,"bold")).pack(side="left", padx=(15, 5))
+entry_cari = ttk.Entry(frame_ip, width=22)
+entry_cari.pack(side="left")
+lbl_refresh = tk.Label(frame_ip, text="", font=("Segoe UI", 9), fg="#003366")
+lbl_refresh.pack(side="left", padx=10)
+# badge status per sumber data (manual / tiap router)
+frame_badges = tk.Frame(root); frame_badges.pack()
 
 # Metode bayar combo
 frame_bayar = tk.Frame(root); frame_bayar.pack(pady=8)
@@ -727,7 +668,9 @@ combo_metode.set("Belum Bayar"); combo_metode.pack(side="left")
 
 # Treeview table (include hidden ip column at end)
 columns = ('nama_pelanggan', 'paket', 'harga', 'no_hp', 'jatuh_tempo', 'usage_total', 'ip')
-tree = ttk.Treeview(root, columns=columns, show='headings', height=18)
+frame_tree = tk.Frame(root)
+frame_tree.pack(fill="both", expand=True, padx=10, pady=5)
+tree = ttk.Treeview(frame_tree, columns=columns, show='headings', height=18)
 for col in columns:
     heading = col.replace('_',' ').title() if col != 'ip' else 'IP'
     tree.heading(col, text=heading)
@@ -735,27 +678,29 @@ for col in columns:
         tree.column(col, width=0, stretch=False)  # hidden
     else:
         tree.column(col, width=140)
-tree.pack(fill="both", expand=True, padx=10, pady=5)
+tree_scroll = ttk.Scrollbar(frame_tree, orient="vertical")
+tree_scroll.pack(side="right", fill="y")
+tree.pack(side="left", fill="both", expand=True)
 
 def on_tree_select(event):
     global last_selected_data
-    sel = tree.focus()
-    if not sel:
+    row = table.selected_row()
+    if not row:
         last_selected_data = None
         return
-    vals = tree.item(sel)['values']
-    # map with ip at index 6
     last_selected_data = {
-        "nama_pelanggan": vals[0] if len(vals) > 0 else None,
-        "paket": vals[1] if len(vals) > 1 else None,
-        "harga": vals[2] if len(vals) > 2 else None,
-        "no_hp": vals[3] if len(vals) > 3 else None,
-        "jatuh_tempo": vals[4] if len(vals) > 4 else None,
-        "usage": vals[5] if len(vals) > 5 else None,
-        "ip": vals[6] if len(vals) > 6 else None
+        "nama_pelanggan": row.get('nama_pelanggan'),
+        "paket": row.get('paket'),
+        "harga": row.get('harga'),
+        "no_hp": row.get('no_hp'),
+        "jatuh_tempo": row.get('jatuh_tempo'),
+        "usage": row.get('usage_total'),
+        "ip": row.get('ip')
     }
 
-tree.bind("<<TreeviewSelect>>", on_tree_select)
+# tabel virtual: hanya baris yang terlihat jadi item Tk, urut/cari dihitung di model
+table = VirtualTable(tree, scrollbar=tree_scroll, on_select=lambda row: on_tree_select(None))
+entry_cari.bind("<KeyRelease>", lambda e: table.set_filter(entry_cari.get()))
 
 # Buttons frame
 frame_btn = tk.Frame(root); frame_btn.pack(pady=12)
@@ -872,10 +817,9 @@ def on_edit_comment():
 
     old_comment = ""
     # cek manual customers
-    for c in manual_customers:
-        if c.get('nama_pelanggan') == last_selected_data.get('nama_pelanggan') and (not selected_ip or c.get('ip') == selected_ip):
-            old_comment = build_comment_from_dict(c)
-            break
+    manual = customer_store.find(last_selected_data.get('nama_pelanggan'), ip=selected_ip or None)
+    if manual:
+        old_comment = build_comment_from_dict({k: v for k, v in manual.items() if k != 'id'})
 
     # coba ambil dari Mikrotik jika tersedia
     mk_client = None
@@ -884,8 +828,8 @@ def on_edit_comment():
         if mk_client and mk_client.connect():
             addr = last_selected_data.get('ip') or selected_ip
             try:
-                leases = mk_client.get_leases_with_comment()
-                target = next((l for l in leases if l.get('address') == addr or l.get('ip') == addr), None)
+                # satu print ?address= (kolom sempit), .id ikut masuk index untuk set nanti
+                target = mk_client.get_lease(address=addr)
                 if target:
                     old_comment = target.get('comment') or old_comment
             except Exception:
@@ -928,13 +872,7 @@ def on_edit_comment():
                     newd[key] = v
         new_comment = build_comment_from_dict(newd)
 
-        saved_local = False
-        for c in manual_customers:
-            if c.get('nama_pelanggan') == last_selected_data.get('nama_pelanggan') and (not selected_ip or c.get('ip') == selected_ip):
-                c.update(newd)
-                save_manual_customers(manual_customers)
-                saved_local = True
-                break
+        saved_local = bool(manual) and customer_store.update(manual['id'], newd)
 
         updated_mk = False
         if RouterOsApiPool is not None:
@@ -961,24 +899,153 @@ def on_edit_comment():
     ttk.Button(edit_win, text="Batal", command=edit_win.destroy).grid(row=len(fields), column=1, pady=12, padx=8)
 
 # ========== Table update ==========
+# snapshot tabel terakhir: ditampilkan instan saat start, lalu diganti hasil refresh
+SNAPSHOT_FILE = resource_path(cfg["app"].get("snapshot_file", "snapshot.bin"))
+tree.tag_configure('stale', foreground='gray')
+
+def merge_with_snapshot(ip, data_all, groups, report):
+    """
+    Router yang gagal di refresh ini (menurut report dari collect_all_pelanggan):
+    pakai baris snapshot lamanya (ditandai stale) supaya pelanggannya tidak
+    hilang dari tabel. Snapshot disimpan ulang.
+    """
+    if ip not in (None, "Semua MikroTik"):
+        return data_all
+    snap = load_snapshot(SNAPSHOT_FILE)
+    old_groups = snap["groups"] if snap and snap.get("selected") == "Semua MikroTik" else {}
+    for entry in report:
+        host = entry["host"]
+        if entry["status"] != "ok" and old_groups.get(host):
+            groups[host] = old_groups[host]
+            data_all.extend(dict(r, _stale=True) for r in old_groups[host])
+    save_snapshot(SNAPSHOT_FILE, groups, selected="Semua MikroTik")
+    return data_all
+
+# key baris router:mac / manual:id, pilihan & scroll tidak hilang saat refresh
+def table_values(row):
+    return (
+        row.get('nama_pelanggan'),
+        row.get('paket','-'),
+        row.get('harga',0),
+        row.get('no_hp','-'),
+        row.get('jatuh_tempo','-'),
+        row.get('usage_total','-'),
+        row.get('ip','')  # hidden column
+    )
+
+def render_table(data_all, stale_ids=()):
+    global last_selected_data
+    status = table.set_rows(data_all, table_values,
+                            lambda row: ('stale',) if row.get('_stale') or id(row) in stale_ids else ())
+    if status == "removed":
+        last_selected_data = None
+    elif status == "changed":
+        on_tree_select(None)   # data pelanggan terpilih ikut diperbarui
+
+# tabel per sumber (manual + tiap router): baris router muncul begitu router itu
+# selesai, sumber yang belum/gagal tetap menampilkan baris lamanya (abu-abu)
+table_groups = {}    # sumber -> baris yang sedang tampil
+group_status = {}    # sumber -> loading / ok / timeout / error / stale
+BADGE_STYLE = {
+    "loading": ("⏳", "memuat", "#b36b00"),
+    "ok":      ("✅", "ok", "#1e7e34"),
+    "timeout": ("⏱️", "timeout", "#c82333"),
+    "error":   ("❌", "gagal", "#c82333"),
+    "stale":   ("🕒", "data lama", "#6c757d"),
+}
+
+def render_groups():
+    rows, stale = [], set()
+    for src, grp in table_groups.items():
+        rows.extend(grp)
+        if group_status.get(src) != "ok":
+            stale.update(id(r) for r in grp)
+    render_table(rows, stale_ids=stale)
+
+def update_badges():
+    for w in frame_badges.winfo_children():
+        w.destroy()
+    for src, status in group_status.items():
+        icon, text, color = BADGE_STYLE.get(status, BADGE_STYLE["error"])
+        name = "Manual" if src == "manual" else src
+        tk.Label(frame_badges, text=f"{icon} {name}: {text} ({len(table_groups.get(src, []))})",
+                 fg=color, font=("Segoe UI", 9)).pack(side="left", padx=6)
+
+def load_table_data(ip, token=None):
+    """Ambil + gabung data (jalan di thread refresh, tanpa akses Tk)"""
+    groups = {}
+    on_progress = (lambda entry, rows: token.progress((entry, rows))) if token else None
+    data_all, report = collect_all_pelanggan(ip, groups, on_progress=on_progress, cancel=token)
+    if token is not None:
+        token.check()   # dibatalkan: jangan timpa snapshot dengan hasil setengah jadi
+    return merge_with_snapshot(ip, data_all, groups, report)
+
+# refresh berjalan di background; refresh baru (tombol, ganti IP, setelah edit) membatalkan yang lama
+refresher = RefreshWorker(root)
+# provisioning queue punya worker sendiri supaya tidak membatalkan / dibatalkan refresh tabel
+provisioner = RefreshWorker(root)
+
 def update_table(ip):
-    for i in tree.get_children():
-        tree.delete(i)
-    data_all = collect_all_pelanggan(ip)
-    for row in data_all:
-        tree.insert('', 'end', values=(
-            row.get('nama_pelanggan'),
-            row.get('paket','-'),
-            row.get('harga',0),
-            row.get('no_hp','-'),
-            row.get('jatuh_tempo','-'),
-            row.get('usage_total','-'),
-            row.get('ip','')  # hidden column
-        ))
-    try:
-        generate_mikrotik_rsc(data_all)
-    except Exception as e:
-        print("[WARN] generate rsc failed:", e)
+    hosts = [c.host for c in mikrotik_clients] if ip in (None, "Semua MikroTik") else [ip]
+    old = dict(table_groups)
+    table_groups.clear()
+    group_status.clear()
+    for src in ["manual"] + hosts:
+        table_groups[src] = old.get(src, [])
+        group_status[src] = "loading"
+    render_groups()
+    update_badges()
+    total = len(hosts)
+    done = []
+    lbl_refresh.config(text=f"⏳ Refresh 0/{total} router...")
+
+    def progress(info):
+        entry, rows = info
+        src = entry["host"]
+        if entry["status"] == "ok":
+            table_groups[src] = rows
+            group_status[src] = "ok"
+        else:
+            group_status[src] = "stale" if table_groups.get(src) else entry["status"]
+        if src != "manual":
+            done.append(entry)
+            lbl_refresh.config(text=f"⏳ Refresh {len(done)}/{total} router | {src}: "
+                                    f"{entry['status']} {entry['elapsed']:.2f}s")
+        render_groups()
+        update_badges()
+
+    def finished():
+        for src, status in group_status.items():
+            if status == "loading":   # sumber yang tidak melapor (mis. router tidak ada di config)
+                group_status[src] = "stale" if table_groups.get(src) else "error"
+        render_groups()
+        update_badges()
+        fresh = [r for src, grp in table_groups.items() if group_status[src] == "ok" for r in grp]
+        try:
+            generate_mikrotik_rsc(fresh)
+        except Exception as e:
+            print("[WARN] generate rsc failed:", e)
+        bad = [e['host'] for e in done if e['status'] != 'ok']
+        lbl_refresh.config(text=f"✅ {len(fresh)} pelanggan, {total - len(bad)}/{total} router ok"
+                                + (f" | gagal: {', '.join(bad)}" if bad else ""))
+
+    def failed(e):
+        print(f"[ERROR] Refresh gagal: {e}")
+        lbl_refresh.config(text=f"❌ Refresh gagal: {e}")
+
+    # tabel sudah terisi lewat progress(); hasil gabungan job cukup untuk snapshot
+    refresher.start(lambda token: load_table_data(ip, token), progress, lambda _: finished(), failed)
+
+def show_snapshot_then_refresh(ip):
+    """Start: tampilkan snapshot terakhir (abu-abu) lalu refresh di background"""
+    snap = load_snapshot(SNAPSHOT_FILE)
+    if snap and snap.get("selected") == ip:
+        for src, rows in snap["groups"].items():
+            table_groups[src] = rows
+            group_status[src] = "stale"
+        render_groups()
+        print(f"[INFO] Snapshot {datetime.fromtimestamp(snap['saved']):%d/%m/%Y %H:%M} ditampilkan, refresh di background")
+    update_table(ip)
 
 combo_ip.bind("<<ComboboxSelected>>", lambda e: update_table(combo_ip.get()))
 
@@ -988,25 +1055,42 @@ def show_daftar_pelanggan():
     win.title("Daftar Pelanggan")
     win.geometry("900x520")
 
-    tree2 = ttk.Treeview(win, columns=('nama','paket','harga','no_hp','jatuh','ip','usage'), show='headings')
+    frame_cari = tk.Frame(win)
+    frame_cari.pack(fill="x", padx=10, pady=(8, 0))
+    tk.Label(frame_cari, text="🔍 Cari:").pack(side="left")
+    entry_cari2 = ttk.Entry(frame_cari, width=30)
+    entry_cari2.pack(side="left", padx=5)
+    lbl_jumlah = tk.Label(frame_cari, text="")
+    lbl_jumlah.pack(side="left", padx=10)
+
+    frame_tree2 = tk.Frame(win)
+    frame_tree2.pack(fill="both", expand=True, padx=10, pady=8)
+    tree2 = ttk.Treeview(frame_tree2, columns=('nama','paket','harga','no_hp','jatuh','ip','usage'), show='headings')
     for c in ('nama','paket','harga','no_hp','jatuh','ip','usage'):
         tree2.heading(c, text=c.title())
         tree2.column(c, width=120)
-    tree2.pack(fill="both", expand=True, padx=10, pady=8)
+    scroll2 = ttk.Scrollbar(frame_tree2, orient="vertical")
+    scroll2.pack(side="right", fill="y")
+    tree2.pack(side="left", fill="both", expand=True)
+
+    local_table = VirtualTable(tree2, key=lambda c: c['id'], scrollbar=scroll2)
+
+    def on_cari(event=None):
+        local_table.set_filter(entry_cari2.get())
+        lbl_jumlah.config(text=f"{len(local_table)} dari {local_table.total} pelanggan")
+    entry_cari2.bind("<KeyRelease>", on_cari)
 
     def refresh_local_view():
-        for i in tree2.get_children():
-            tree2.delete(i)
-        for c in manual_customers:
-            tree2.insert('', 'end', values=(
-                c.get('nama_pelanggan'),
-                c.get('paket','-'),
-                c.get('harga',0),
-                c.get('no_hp','-'),
-                c.get('jatuh_tempo','-'),
-                c.get('ip','-'),
-                c.get('usage_total','-'),
-            ))
+        local_table.set_rows(customer_store.all(), lambda c: (
+            c.get('nama_pelanggan'),
+            c.get('paket','-'),
+            c.get('harga',0),
+            c.get('no_hp','-'),
+            c.get('jatuh_tempo','-'),
+            c.get('ip','-'),
+            c.get('usage_total','-'),
+        ))
+        on_cari()
 
     def add_customer():
         d = {}
@@ -1022,47 +1106,44 @@ def show_daftar_pelanggan():
         d['jatuh_tempo'] = simpledialog.askstring("Jatuh Tempo", "YYYY-MM-DD:", parent=win) or "-"
         d['ip'] = simpledialog.askstring("IP", "IP:", parent=win) or "-"
         d['usage_total'] = simpledialog.askstring("Usage", "Usage text:", parent=win) or "-"
-        manual_customers.append(d)
-        save_manual_customers(manual_customers)
+        customer_store.add(d)
         refresh_local_view()
         update_table(combo_ip.get())
 
     def edit_customer():
-        sel = tree2.focus()
+        sel = local_table.selected_row()
         if not sel:
             messagebox.showwarning("Pilih", "Pilih baris untuk diedit", parent=win)
             return
-        vals = tree2.item(sel)['values']
-        for c in manual_customers:
-            if c.get('nama_pelanggan') == vals[0] and c.get('ip','-') == vals[5]:
-                c['paket'] = simpledialog.askstring("Paket", "Paket:", initialvalue=c.get('paket','-'), parent=win) or c.get('paket','-')
-                try:
-                    c['harga'] = int(simpledialog.askstring("Harga", "Harga (angka):", initialvalue=str(c.get('harga',0)), parent=win) or c.get('harga',0))
-                except:
-                    pass
-                c['no_hp'] = simpledialog.askstring("No HP", "No HP:", initialvalue=c.get('no_hp','-'), parent=win) or c.get('no_hp','-')
-                c['jatuh_tempo'] = simpledialog.askstring("Jatuh Tempo", "YYYY-MM-DD:", initialvalue=c.get('jatuh_tempo','-'), parent=win) or c.get('jatuh_tempo','-')
-                save_manual_customers(manual_customers)
-                refresh_local_view()
-                update_table(combo_ip.get())
-                return
-        messagebox.showwarning("Tidak ditemukan", "Pelanggan manual tidak ditemukan.", parent=win)
+        c = customer_store.get(sel['id'])
+        if c is None:
+            messagebox.showwarning("Tidak ditemukan", "Pelanggan manual tidak ditemukan.", parent=win)
+            return
+        changes = {}
+        changes['paket'] = simpledialog.askstring("Paket", "Paket:", initialvalue=c.get('paket','-'), parent=win) or c.get('paket','-')
+        try:
+            changes['harga'] = int(simpledialog.askstring("Harga", "Harga (angka):", initialvalue=str(c.get('harga',0)), parent=win) or c.get('harga',0))
+        except:
+            pass
+        changes['no_hp'] = simpledialog.askstring("No HP", "No HP:", initialvalue=c.get('no_hp','-'), parent=win) or c.get('no_hp','-')
+        changes['jatuh_tempo'] = simpledialog.askstring("Jatuh Tempo", "YYYY-MM-DD:", initialvalue=c.get('jatuh_tempo','-'), parent=win) or c.get('jatuh_tempo','-')
+        customer_store.update(c['id'], changes)
+        refresh_local_view()
+        update_table(combo_ip.get())
 
     def delete_customer():
-        sel = tree2.focus()
+        sel = local_table.selected_row()
         if not sel:
             messagebox.showwarning("Pilih", "Pilih baris untuk dihapus", parent=win)
             return
-        vals = tree2.item(sel)['values']
-        for idx, c in enumerate(manual_customers):
-            if c.get('nama_pelanggan') == vals[0] and c.get('ip','-') == vals[5]:
-                if messagebox.askyesno("Konfirmasi", f"Hapus pelanggan {c.get('nama_pelanggan')}?", parent=win):
-                    manual_customers.pop(idx)
-                    save_manual_customers(manual_customers)
-                    refresh_local_view()
-                    update_table(combo_ip.get())
-                return
-        messagebox.showwarning("Tidak ditemukan", "Pelanggan manual tidak ditemukan.", parent=win)
+        c = customer_store.get(sel['id'])
+        if c is None:
+            messagebox.showwarning("Tidak ditemukan", "Pelanggan manual tidak ditemukan.", parent=win)
+            return
+        if messagebox.askyesno("Konfirmasi", f"Hapus pelanggan {c.get('nama_pelanggan')}?", parent=win):
+            customer_store.delete(c['id'])
+            refresh_local_view()
+            update_table(combo_ip.get())
 
     btn_frame = tk.Frame(win)
     btn_frame.pack(pady=6)
@@ -1075,5 +1156,13 @@ def show_daftar_pelanggan():
     refresh_local_view()
 
 # ========== Start app ==========
-update_table(combo_ip.get())
+show_snapshot_then_refresh(combo_ip.get())
 root.mainloop()
+refresher.cancel()
+provisioner.cancel()
+if usage_sampler is not None:
+    usage_sampler.stop()
+for _rec in session_recorders:
+    _rec.close()
+session_pool.close_all()
+customer_store.close()
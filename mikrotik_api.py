@@ -10,14 +10,11 @@ import win32print
 import win32ui
 from tkinter import simpledialog
 import win32con
-import ipaddress
 from datetime import datetime
-
-# Optional RouterOS API
-try:
-    from routeros_api import RouterOsApiPool
-except ImportError:
-    RouterOsApiPool = None
+from mikrotik_client import MikrotikClient, RouterOsApiPool, parse_comment, validate_comment
+from mikrotik_collector import load_pelanggan_dari_mikrotik_per_interface
+from mikrotik_usage import target_covers
+from mikrotik_writeback import update_usage_comment_per_interface, update_usage_comment_all
 
 # Optional ESC/POS USB driver
 try:
@@ -101,198 +98,9 @@ if not os.path.exists(qris_path):
     print(f"⚠️ Peringatan: QRIS tidak ditemukan di {qris_path}")
 
 
-# ===== Helper Parsing Comment =====
-def parse_comment(comment):
-    data = {}
-    key_map = {
-        'nama': 'nama_pelanggan',
-        'paket': 'paket',
-        'harga': 'harga',
-        'due': 'jatuh_tempo',
-        'jatuh_tempo': 'jatuh_tempo',
-        'no_hp': 'no_hp',
-    }
-    try:
-        parts = [p for p in comment.split(';') if ':' in p]
-        for part in parts:
-            k, v = part.split(':', 1)
-            k_clean = k.strip().lower()
-            v_clean = v.strip()
-            if k_clean in key_map:
-                data[key_map[k_clean]] = v_clean
-    except Exception as e:
-        print(f"[ERROR] Gagal parse comment: {comment} -> {e}")
-    return data
-
-def validate_comment(comment):
-    return bool(str(comment or "").strip())
-
 def ip_in_target(ip_addr, target_str):
-    try:
-        if '/' not in target_str:
-            return ip_addr == target_str
-        return ipaddress.ip_address(ip_addr) in ipaddress.ip_network(target_str, strict=False)
-    except:
-        return False
-
-# ===== Mikrotik Client =====
-class MikrotikClient:
-    def __init__(self, host, username, password, port=8728):
-        self.host = host
-        self.username = username
-        self.password = password
-        self.port = port
-        self.api = None
-        self.connection = None
-
-    def connect(self):
-        try:
-            self.connection = RouterOsApiPool(
-                self.host,
-                username=self.username,
-                password=self.password,
-                port=self.port,
-                plaintext_login=True,
-                use_ssl=False
-            )
-            self.api = self.connection.get_api()
-            return True
-        except Exception as e:
-            print(f"[ERROR] Gagal konek ke {self.host}: {e}")
-            return False
-
-    def disconnect(self):
-        try:
-            if self.connection:
-                self.connection.disconnect()
-        except:
-            pass
-
-    def get_leases_with_comment(self):
-        if not self.api:
-            return []
-        try:
-            leases = self.api.get_resource('/ip/dhcp-server/lease').get()
-            filtered = [l for l in leases if validate_comment(l.get('comment', ''))]
-            for l in filtered:
-                l['parsed'] = parse_comment(l.get('comment', ''))
-            return filtered
-        except Exception as e:
-            print(f"[ERROR] Gagal ambil leases: {e}")
-            return []
-
-    def get_monthly_usage_gb(self, ip_addr):
-        """Hitung total usage per IP dari queue simple (upload+download)"""
-        if not self.api or not ip_addr:
-            return 0.0
-        try:
-            queues = self.api.get_resource('/queue/simple').call('print', {'stats': ''})
-            for q in queues:
-                target = q.get('target', '') or q.get('dst', '')
-                if ip_in_target(ip_addr, target):
-                    tb = q.get('bytes')
-                    if tb:
-                        parts = tb.split('/')
-                        total_bytes = sum(int(p) for p in parts if p.isdigit())
-                        return round(total_bytes / (1024**3), 2)
-        except:
-            pass
-        return 0.0
-
-    def get_interface_usage_gb(self, interface_name=None):
-        """Hitung usage per interface (upload+download)"""
-        if not self.api:
-            return {} if interface_name is None else 0.0
-        usage = {}
-        try:
-            interfaces = self.api.get_resource('/interface').get()
-            for intf in interfaces:
-                name = intf.get('name')
-                if interface_name and name != interface_name:
-                    continue
-                rx = int(intf.get('rx-byte', 0))
-                tx = int(intf.get('tx-byte', 0))
-                usage_gb = round((rx + tx) / (1024**3), 2)
-                usage[name] = usage_gb
-            if interface_name:
-                return usage.get(interface_name, 0.0)
-            return usage
-        except:
-            return {} if interface_name is None else 0.0
-
-
-def load_pelanggan_dari_mikrotik_per_interface(client: MikrotikClient):
-    if not client.connect():
-        return []
-    leases = client.get_leases_with_comment()
-    pelanggan_list = []
-
-    for lease in leases:
-        data = lease.get('parsed', {})
-        ip_addr = lease.get('address', '')
-
-        usage_total_gb = client.get_monthly_usage_gb(ip_addr)
-        usage_per_interface = {}
-        if usage_total_gb == 0.0:
-            usage_per_interface = client.get_interface_usage_gb()
-            usage_total_gb = sum(usage_per_interface.values())
-        if not usage_per_interface and usage_total_gb > 0:
-            usage_per_interface = {'QueueSimple': usage_total_gb}
-
-        usage_str = f"{usage_total_gb:.2f} GB" if usage_total_gb >= 1 else f"{usage_total_gb*1024:.2f} MB"
-
-        pelanggan_list.append({
-            "nama_pelanggan": data.get('nama_pelanggan', 'Unknown'),
-            "paket": data.get('paket', '-'),
-            "harga": int(data.get('harga', 0)),  # pastikan angka
-            "no_hp": data.get('no_hp', '-'),
-            "jatuh_tempo": data.get('jatuh_tempo', '-'),
-            "ip": ip_addr,
-            "usage_total": usage_str,
-            "usage_per_interface": usage_per_interface
-        })
-
-    client.disconnect()
-    return pelanggan_list
-    
-def update_usage_comment_per_interface(client: MikrotikClient):
-    if not client.connect():
-        return
-    leases = client.get_leases_with_comment()
-
-    for lease in leases:
-        ip_addr = lease.get('address', '')
-
-        usage_total_gb = client.get_monthly_usage_gb(ip_addr)
-        usage_per_interface = {}
-        if usage_total_gb == 0.0:
-            usage_per_interface = client.get_interface_usage_gb()
-            usage_total_gb = sum(usage_per_interface.values())
-        if not usage_per_interface and usage_total_gb > 0:
-            usage_per_interface = {'QueueSimple': usage_total_gb}
-
-        usage_total_str = f"{usage_total_gb:.2f} GB" if usage_total_gb >= 1 else f"{usage_total_gb*1024:.2f} MB"
-        usage_interface_strs = []
-        for iface, gb in usage_per_interface.items():
-            s = f"{gb:.2f} GB" if gb >= 1 else f"{gb*1024:.2f} MB"
-            usage_interface_strs.append(f"{iface}: {s}")
-        usage_full_str = f"Total: {usage_total_str}; " + '; '.join(usage_interface_strs)
-
-        old_comment = lease.get('comment', '')
-        comment_parts = [p.strip() for p in old_comment.split(';') if p.strip() and not p.strip().startswith('Usage:')]
-        comment_parts.append(f"Usage: {usage_full_str}")
-        new_comment = '; '.join(comment_parts)
-
-        try:
-            client.api.get_resource('/ip/dhcp-server/lease').call('set', {
-                '.id': lease.get('.id'),
-                'comment': new_comment
-            })
-        except:
-            pass
-
-    client.disconnect()
-    
+    return target_covers(ip_addr, target_str)
+
 def generate_mikrotik_rsc(pelanggan_list, output_file="queue_pelanggan.rsc"):
     """
     Generate file .rsc untuk membuat simple queue di MikroTik per pelanggan.
@@ -675,6 +483,8 @@ for r in cfg.get("routers", []):
             r.get("username","admin"),
             r.get("password",""),
             r.get("port", 8728),
+            connect_timeout=r.get("connect_timeout", 3),
+            read_timeout=r.get("read_timeout", 15),
         )
     )
 
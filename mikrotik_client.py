@@ -0,0 +1,769 @@
+# mikrotik_client.py - MikrotikClient + pool session RouterOS (dipakai main.py & mikrotik_api.py)
+import socket
+import threading
+import time
+
+from mikrotik_usage import QueueUsageIndex, DEFAULT_INTERFACE_POLICY
+from routeros_proto import RouterOsConnection, RouterOsTrap
+
+# Optional RouterOS API
+try:
+    from routeros_api import RouterOsApiPool
+    from routeros_api import exceptions as ros_exceptions
+except ImportError:
+    RouterOsApiPool = None
+    ros_exceptions = None
+
+# error yang artinya socket/sesi rusak -> boleh reconnect lalu ulangi sekali
+_CONNECTION_ERRORS = tuple(e for e in (
+    OSError,
+    getattr(ros_exceptions, "RouterOsApiConnectionError", None),
+    getattr(ros_exceptions, "FatalRouterOsApiError", None),
+) if e is not None)
+
+
+# ===== Helper Parsing Comment =====
+def parse_comment(comment):
+    data = {}
+    key_map = {
+        'nama': 'nama_pelanggan',
+        'paket': 'paket',
+        'harga': 'harga',
+        'due': 'jatuh_tempo',
+        'jatuh_tempo': 'jatuh_tempo',
+        'no_hp': 'no_hp',
+        'iface': 'iface',
+    }
+    try:
+        parts = [p for p in comment.split(';') if ':' in p]
+        for part in parts:
+            k, v = part.split(':', 1)
+            k_clean = k.strip().lower()
+            v_clean = v.strip()
+            if k_clean in key_map:
+                data[key_map[k_clean]] = v_clean
+    except Exception as e:
+        print(f"[ERROR] Gagal parse comment: {comment} -> {e}")
+    return data
+
+def validate_comment(comment):
+    return bool(str(comment or "").strip())
+
+
+# ===== Kolom yang diambil (.proplist) & filter di sisi router =====
+LEASE_PROPLIST = ('.id', 'address', 'mac-address', 'comment', 'server', 'status')
+QUEUE_PROPLIST = ('.id', 'name', 'target', 'dst', 'bytes')
+INTERFACE_PROPLIST = ('name', 'rx-byte', 'tx-byte')
+
+# query word RouterOS API: "?comment" = hanya item yang punya properti comment
+HAS_COMMENT = ('?comment',)
+
+class _QueryWords:
+    """
+    Query word mentah untuk routeros_api (argumen additional_queries).
+    String biasa dibungkus routeros_api jadi "?" + word ("?comment" -> "??comment"),
+    jadi word dikirim lewat objek ini apa adanya dan urutannya tetap (penting untuk ?#|).
+    """
+    def __init__(self, words):
+        self.words = [w.encode() if isinstance(w, str) else w for w in words]
+
+    def get_api_format(self):
+        return list(self.words)
+
+def item_id(row):
+    """.id sebuah baris: routeros_api membuang titiknya ('id'), routeros_proto/mirror tetap '.id'"""
+    return row.get('.id') or row.get('id')
+
+def _is_no_such_item(error):
+    return 'no such item' in str(error).lower()
+
+def build_print_arguments(arguments=None, proplist=None):
+    args = dict(arguments or {})
+    if proplist:
+        args['.proplist'] = ','.join(proplist)
+    return args
+
+
+# ===== Timeout & circuit breaker per router =====
+DEFAULT_CONNECT_TIMEOUT = 3.0
+DEFAULT_READ_TIMEOUT = 15.0
+
+class CircuitBreaker:
+    """
+    closed    -> semua koneksi jalan; `failure_threshold` gagal berturut-turut -> open
+    open      -> router dilewati (gagal instan) selama `reset_timeout` detik
+    half_open -> satu percobaan (probe) dibiarkan lewat: sukses -> closed,
+                 gagal -> open lagi dengan jeda dua kali lipat (maks. max_reset_timeout)
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0, max_reset_timeout=300.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.base_reset_timeout = float(reset_timeout)
+        self.reset_timeout = float(reset_timeout)
+        self.max_reset_timeout = float(max_reset_timeout)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True kalau boleh mencoba konek sekarang (di half_open hanya satu probe)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def retry_in(self):
+        """Detik sampai probe berikutnya boleh dicoba (0 kalau tidak open)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            elif self.failures < self.failure_threshold:
+                return
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+# ===== Pool session RouterOS =====
+class _Session:
+    def __init__(self, key, connection, api):
+        self.key = key
+        self.connection = connection
+        self.api = api
+        self.lock = threading.RLock()
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+    def close(self):
+        try:
+            self.connection.disconnect()
+        except Exception:
+            pass
+
+
+class SessionPoolExhausted(Exception):
+    """Semua max_sessions sesi sedang dipakai sampai batas waktu tunggu habis"""
+
+
+class SessionPool:
+    """
+    Satu sesi login yang tahan lama per router (host, port, username).
+    - sesi dipakai ulang antar refresh / edit comment / write-back
+    - sesi yang lama idle dicek dulu (health check) sebelum dipakai
+    - keepalive thread opsional supaya sesi tidak diputus NAT/firewall
+    - jumlah sesi dibatasi max_sessions (termasuk yang sedang login): sesi idle
+      paling lama ditutup; kalau semua sedang dipakai, acquire menunggu sampai
+      connect_timeout client lalu SessionPoolExhausted
+    Socket di luar batas ini (tidak dihitung pool): koneksi streaming iter_*
+    (satu per client, ditambah satu per stream yang berjalan bersamaan, lihat
+    MikrotikClient._stream_live) dan koneksi listen LeaseMirror (satu per
+    router kalau "lease_mirror" aktif). Jadi per router paling banyak
+    1 sesi pool + 1 streaming + 1 mirror dalam pemakaian normal.
+    """
+    HEALTH_CHECK_PATH = '/system/identity'
+    WAIT_POLL = 0.05
+
+    def __init__(self, max_sessions=8, idle_check=30.0):
+        self.max_sessions = max_sessions
+        self.idle_check = idle_check
+        self._sessions = {}
+        self._opening = 0       # sesi yang sedang connect/login (sudah memakai jatah)
+        self._lock = threading.Lock()
+        self._room = threading.Condition(self._lock)
+        self._keepalive_thread = None
+        self._stop = threading.Event()
+
+    def _open(self, client):
+        connection = RouterOsApiPool(
+            client.host,
+            username=client.username,
+            password=client.password,
+            port=client.port,
+            plaintext_login=True,
+            use_ssl=False
+        )
+        # connect pakai connect_timeout (router mati gagal cepat), sesudah itu read_timeout
+        set_timeout = getattr(connection, "set_timeout", None)
+        if set_timeout is not None:
+            set_timeout(client.connect_timeout)
+        api = connection.get_api()
+        if set_timeout is not None:
+            set_timeout(client.read_timeout)
+        sock = getattr(connection, "socket", None)
+        if sock is not None:
+            try:
+                sock.settimeout(client.read_timeout)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            except Exception:
+                pass
+        return connection, api
+
+    def _is_alive(self, session):
+        try:
+            with session.lock:
+                session.api.get_resource(self.HEALTH_CHECK_PATH).get()
+            session.last_used = time.monotonic()
+            return True
+        except Exception:
+            return False
+
+    def _evict_for_room(self):
+        # dipanggil dengan self._lock dipegang
+        while len(self._sessions) + self._opening >= self.max_sessions:
+            for sess in sorted(self._sessions.values(), key=lambda s: s.last_used):
+                if sess.lock.acquire(blocking=False):
+                    try:
+                        del self._sessions[sess.key]
+                        sess.close()
+                    finally:
+                        sess.lock.release()
+                    break
+            else:
+                return False
+        return True
+
+    def acquire(self, client):
+        """Ambil sesi hidup untuk client (buat baru kalau belum ada / rusak)"""
+        key = client.session_key
+        with self._lock:
+            session = self._sessions.get(key)
+        if session is not None:
+            idle = time.monotonic() - session.last_used
+            if idle < self.idle_check or self._is_alive(session):
+                return session
+            self.drop(key)
+
+        with self._room:
+            deadline = time.monotonic() + client.connect_timeout
+            while not self._evict_for_room():
+                # sesi yang sedang dipakai tidak memberi tahu pool saat selesai, jadi cek berkala
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SessionPoolExhausted(
+                        f"Batas {self.max_sessions} sesi RouterOS tercapai, semua sedang dipakai")
+                self._room.wait(min(remaining, self.WAIT_POLL))
+            old = self._sessions.get(key)
+            if old is not None:
+                return old   # thread lain sudah lebih dulu buka sesi, pakai yang itu
+            self._opening += 1
+        try:
+            connection, api = self._open(client)
+        except BaseException:
+            with self._room:
+                self._opening -= 1
+                self._room.notify_all()
+            raise
+        session = _Session(key, connection, api)
+        with self._room:
+            self._opening -= 1
+            old = self._sessions.get(key)
+            if old is not None:
+                # thread lain sudah lebih dulu buka sesi, pakai yang itu
+                self._room.notify_all()
+                session.close()
+                return old
+            self._sessions[key] = session
+        return session
+
+    def drop(self, key):
+        with self._room:
+            session = self._sessions.pop(key, None)
+            self._room.notify_all()
+        if session is not None:
+            session.close()
+
+    def close_all(self):
+        self._stop.set()
+        with self._room:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._room.notify_all()
+        for s in sessions:
+            s.close()
+
+    def start_keepalive(self, interval=None):
+        """Ping sesi yang idle tiap `interval` detik, buang yang sudah mati"""
+        interval = interval or self.idle_check
+        if self._keepalive_thread and self._keepalive_thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                with self._lock:
+                    sessions = list(self._sessions.values())
+                for s in sessions:
+                    if time.monotonic() - s.last_used >= interval and not self._is_alive(s):
+                        print(f"[INFO] Sesi {s.key[0]} putus, ditutup (reconnect saat dipakai lagi).")
+                        self.drop(s.key)
+
+        self._keepalive_thread = threading.Thread(target=loop, name="ros-keepalive", daemon=True)
+        self._keepalive_thread.start()
+
+session_pool = SessionPool()
+
+
+# ===== Mikrotik Client =====
+class MikrotikClient:
+    def __init__(self, host, username, password, port=8728, pool=None,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT, breaker=None):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.port = port
+        self.pool = pool or session_pool
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.api = None
+        self.connection = None
+        self.last_error = None
+        self.mirror = None      # LeaseMirror (opsional), lihat mikrotik_mirror.py
+        self._lease_ids = {}    # address / MAC -> .id, terisi dari fetch lease biasa
+        self.interface_policy = DEFAULT_INTERFACE_POLICY   # lihat mikrotik_usage.INTERFACE_POLICIES
+        self.usage_engine = None  # UsageEngine (opsional): usage per siklus tagihan, lihat usage_engine.py
+        self.usage_sampler = None # UsageSampler (opsional): snapshot queue/interface hasil poll background
+        self._stream_conn = None  # koneksi routeros_proto khusus iter_* (di luar pool routeros_api)
+        self.recorder = None      # SessionRecorder (opsional), lihat mikrotik_replay.py
+        self._stream_lock = threading.Lock()
+
+    @property
+    def session_key(self):
+        return (self.host, int(self.port or 8728), self.username)
+
+    def connect(self):
+        """Pakai sesi yang sudah ada di pool (login hanya kalau belum ada / putus)"""
+        if RouterOsApiPool is None:
+            self.last_error = "routeros_api tidak terinstall"
+            return False
+        if not self.breaker.allow():
+            # router dianggap mati: jangan tunggu timeout lagi sampai waktunya probe
+            self.api = None
+            self.last_error = f"router offline (circuit open, coba lagi {self.breaker.retry_in():.0f}s)"
+            return False
+        try:
+            session = self.pool.acquire(self)
+            self.connection = session.connection
+            self.api = session.api
+            self.last_error = None
+            self.breaker.record_success()
+            return True
+        except Exception as e:
+            if not isinstance(e, SessionPoolExhausted):
+                self.breaker.record_failure()
+            print(f"[ERROR] Gagal konek ke {self.host}: {e}")
+            self.last_error = str(e)
+            return False
+
+    def disconnect(self):
+        """Sesi tetap disimpan di pool; pakai close() untuk benar-benar memutus"""
+        pass
+
+    def close(self):
+        self.pool.drop(self.session_key)
+        self.api = None
+        self.connection = None
+        with self._stream_lock:
+            if self._stream_conn is not None:
+                self._stream_conn.close()
+                self._stream_conn = None
+
+    # ---- streaming: baris diproses saat !re datang, memori tidak ikut besar ----
+    def _open_stream(self):
+        conn = RouterOsConnection(self.host, self.port, self.connect_timeout)
+        try:
+            conn.connect()
+            conn.timeout = self.read_timeout
+            return conn.login(self.username, self.password)
+        except Exception:
+            conn.close()
+            raise
+
+    # ---- transport: _call / _stream / _call_pipelined (direkam kalau ada recorder) ----
+    def _call(self, path, command, arguments=None, queries=None, where=()):
+        if self.recorder is None:
+            return self._call_live(path, command, arguments, queries, where)
+        started = time.monotonic()
+        try:
+            result = self._call_live(path, command, arguments, queries, where)
+        except Exception as e:
+            self.recorder.record('call', path, command, arguments, queries, where, started, error=e)
+            raise
+        self.recorder.record('call', path, command, arguments, queries, where, started, result=result)
+        return result
+
+    def _stream(self, path, command, arguments=None, queries=None, where=()):
+        if self.recorder is None:
+            yield from self._stream_live(path, command, arguments, queries, where)
+            return
+        started = time.monotonic()
+        rows = []
+        try:
+            for row in self._stream_live(path, command, arguments, queries, where):
+                rows.append(row)
+                yield row
+        except Exception as e:
+            self.recorder.record('stream', path, command, arguments, queries, where, started, error=e)
+            raise
+        self.recorder.record('stream', path, command, arguments, queries, where, started, result=rows)
+
+    def _call_pipelined(self, path, command, arguments_list, batch_size=50):
+        started = time.monotonic()
+        errors = self._call_pipelined_live(path, command, arguments_list, batch_size)
+        if self.recorder is not None:
+            self.recorder.record('pipelined', path, command, arguments_list, None, (), started, result=errors)
+        return errors
+
+    def _release_stream(self, conn):
+        """Kembalikan koneksi streaming ke slot; kalau slot sudah terisi (stream bersamaan), tutup"""
+        with self._stream_lock:
+            if self._stream_conn is None:
+                self._stream_conn, conn = conn, None
+        if conn is not None:
+            conn.close()
+
+    def _stream_live(self, path, command, arguments=None, queries=None, where=()):
+        """
+        Generator padanan _call: yield satu baris per !re. Koneksi streaming
+        diambil dari slot selama satu perintah lalu dikembalikan setelah !done
+        (juga setelah !trap, perintahnya tetap selesai), jadi tidak ada lock
+        yang dipegang selama yield; pemanggil yang datang bersamaan membuka
+        koneksinya sendiri. Kalau putus sebelum ada baris yang diterima, login
+        ulang dan coba sekali lagi. Kalau pemakai berhenti di tengah jalan,
+        sisa balasan tidak dibaca dan koneksinya ditutup.
+        """
+        words = [f"?{k}={v}" for k, v in (queries or {}).items()] + list(where)
+        for attempt in (1, 2):
+            with self._stream_lock:
+                conn, self._stream_conn = self._stream_conn, None
+            if conn is None:
+                if not self.breaker.allow():
+                    raise ConnectionError(f"router {self.host} offline (circuit open)")
+                try:
+                    conn = self._open_stream()
+                except Exception:
+                    self.breaker.record_failure()
+                    raise
+                # login berhasil: tutup lagi breaker (allow() di atas bisa memindahnya ke half_open)
+                self.breaker.record_success()
+            received = False
+            reusable = False
+            try:
+                for row in conn.stream(f"{path}/{command}", arguments, words):
+                    received = True
+                    yield row
+                reusable = True
+                return
+            except RouterOsTrap:
+                reusable = True   # !trap ... !done: balasan lengkap, koneksi masih sinkron
+                raise
+            except _CONNECTION_ERRORS as e:
+                if received or attempt == 2:
+                    self.breaker.record_failure()
+                    raise
+                print(f"[WARN] Koneksi streaming {self.host} putus ({e}), reconnect...")
+            finally:
+                if reusable:
+                    self._release_stream(conn)
+                else:
+                    conn.close()
+
+    def _acquire_session(self):
+        """pool.acquire; connect/login yang gagal dicatat ke circuit breaker (pool penuh tidak)"""
+        try:
+            return self.pool.acquire(self)
+        except SessionPoolExhausted:
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+
+    def _call_live(self, path, command, arguments=None, queries=None, where=()):
+        """
+        Satu panggilan API lewat sesi pool. Kalau socket rusak, sesi dibuang,
+        login ulang, lalu panggilan diulang sekali.
+        queries: dict {prop: value} -> "?prop=value" (sama dengan)
+        where  : query word mentah, mis. ('?comment',) atau ('?>rx-byte=0',)
+        """
+        additional_queries = (_QueryWords(where),) if where else ()
+        for attempt in (1, 2):
+            session = self._acquire_session()
+            self.connection, self.api = session.connection, session.api
+            try:
+                with session.lock:
+                    result = session.api.get_resource(path).call(
+                        command, arguments or {}, queries or {}, additional_queries)
+                session.last_used = time.monotonic()
+                return result
+            except _CONNECTION_ERRORS as e:
+                self.pool.drop(self.session_key)
+                if attempt == 2:
+                    self.breaker.record_failure()
+                    raise
+                print(f"[WARN] Sesi {self.host} putus ({e}), reconnect...")
+
+    def _call_pipelined_live(self, path, command, arguments_list, batch_size=50):
+        """
+        Kirim banyak perintah sekaligus per batch (tanpa menunggu balasan satu
+        per satu), lalu kumpulkan balasannya. Return list error sejajar dengan
+        arguments_list (None = sukses). Item yang belum terjawab saat socket
+        putus dikirim ulang sekali setelah reconnect (set/remove idempotent).
+        """
+        errors = [None] * len(arguments_list)
+        todo = list(range(len(arguments_list)))
+        for attempt in (1, 2):
+            if not todo:
+                break
+            session = self._acquire_session()
+            self.connection, self.api = session.connection, session.api
+            retry = []
+            try:
+                with session.lock:
+                    resource = session.api.get_resource(path)
+                    call_async = getattr(resource, "call_async", None)
+                    for start in range(0, len(todo), batch_size):
+                        batch = todo[start:start + batch_size]
+                        if call_async is None:
+                            pending = [(i, None) for i in batch]
+                        else:
+                            pending = [(i, call_async(command, arguments_list[i])) for i in batch]
+                        for n, (i, promise) in enumerate(pending):
+                            try:
+                                if promise is None:
+                                    resource.call(command, arguments_list[i])
+                                else:
+                                    promise.get()
+                            except _CONNECTION_ERRORS:
+                                retry = [j for j, _ in pending[n:]] + todo[start + batch_size:]
+                                raise
+                            except Exception as e:
+                                errors[i] = str(e)
+                session.last_used = time.monotonic()
+                todo = []
+            except _CONNECTION_ERRORS as e:
+                self.pool.drop(self.session_key)
+                todo = retry
+                if attempt == 2:
+                    for i in todo:
+                        errors[i] = f"koneksi putus: {e}"
+                else:
+                    print(f"[WARN] Sesi {self.host} putus saat batch ({e}), kirim ulang {len(todo)} item...")
+        return errors
+
+    def set_lease_comments(self, items, batch_size=50):
+        """items: list (lease_id, comment). Return list error (None = sukses)"""
+        if not self.api:
+            return ["tidak terkoneksi"] * len(items)
+        args = [{'.id': lease_id, 'comment': comment} for lease_id, comment in items]
+        errors = self._call_pipelined('/ip/dhcp-server/lease', 'set', args, batch_size=batch_size)
+        for (lease_id, _), err in zip(items, errors):
+            if err and _is_no_such_item(err):
+                self._forget_lease_id(lease_id)
+        return errors
+
+    # ---- index address/MAC -> .id ----
+    def _remember_leases(self, leases):
+        for l in leases:
+            lease_id = item_id(l)
+            if not lease_id:
+                continue
+            if l.get('address'):
+                self._lease_ids[l['address']] = lease_id
+            if l.get('mac-address'):
+                self._lease_ids[l['mac-address'].upper()] = lease_id
+
+    def _forget_lease_id(self, lease_id):
+        for key in [k for k, v in list(self._lease_ids.items()) if v == lease_id]:
+            self._lease_ids.pop(key, None)
+
+    def lookup_lease_id(self, address=None, mac=None):
+        """.id dari index; kalau belum ada, cari satu lease saja di router (?address= / ?mac-address=)"""
+        key = address if address else (mac or '').upper()
+        if not key:
+            return None
+        lease_id = self._lease_ids.get(key)
+        if lease_id:
+            return lease_id
+        lease = self.get_lease(address=address, mac=mac, proplist=('.id', 'address', 'mac-address'))
+        return item_id(lease) if lease else None
+
+    def get_lease(self, address=None, mac=None, proplist=('.id', 'address', 'mac-address', 'comment')):
+        """
+        Satu lease (print ?address= / ?mac-address= dengan .proplist sempit),
+        index .id ikut diisi. None kalau tidak ada. Error dilempar ke pemanggil
+        """
+        if not (address or mac):
+            return None
+        prop = 'address' if address else 'mac-address'
+        rows = self._call('/ip/dhcp-server/lease', 'print',
+                          build_print_arguments(proplist=proplist), {prop: address or mac})
+        self._remember_leases(rows)
+        return rows[0] if rows else None
+
+    def get_leases_with_comment(self, proplist=LEASE_PROPLIST, queries=None, where=HAS_COMMENT):
+        """
+        Lease yang punya comment. Filter & pilih kolom dilakukan di router,
+        jadi lease dinamis tanpa comment tidak ikut terkirim.
+        Kalau ada mirror yang sudah sinkron, dilayani dari mirror (tanpa round trip).
+        """
+        default_query = proplist == LEASE_PROPLIST and not queries and where == HAS_COMMENT
+        if default_query and self.mirror is not None and self.mirror.synced:
+            leases = self.mirror.leases_with_comment()
+            self._remember_leases(leases)
+            return leases
+        if not self.api:
+            return []
+        try:
+            leases = self._call('/ip/dhcp-server/lease', 'print',
+                                build_print_arguments(proplist=proplist), queries, where)
+            self._remember_leases(leases)
+            filtered = [l for l in leases if validate_comment(l.get('comment', ''))]
+            for l in filtered:
+                l['parsed'] = parse_comment(l.get('comment', ''))
+            return filtered
+        except Exception as e:
+            print(f"[ERROR] Gagal ambil leases: {e}")
+            return []
+
+    def iter_leases_with_comment(self, proplist=LEASE_PROPLIST, queries=None, where=HAS_COMMENT):
+        """
+        Versi generator get_leases_with_comment: lease (dengan 'parsed') di-yield satu per satu.
+        Error stream dilempar ke pemanggil, jadi daftar yang terpotong tidak terlihat lengkap
+        """
+        default_query = proplist == LEASE_PROPLIST and not queries and where == HAS_COMMENT
+        if default_query and self.mirror is not None and self.mirror.synced:
+            leases = self.mirror.leases_with_comment()
+            self._remember_leases(leases)
+            yield from leases
+            return
+        if not self.api:
+            return
+        for l in self._stream('/ip/dhcp-server/lease', 'print',
+                              build_print_arguments(proplist=proplist), queries, where):
+            self._remember_leases((l,))
+            if not validate_comment(l.get('comment', '')):
+                continue
+            l['parsed'] = parse_comment(l.get('comment', ''))
+            yield l
+
+    def iter_queues(self, proplist=QUEUE_PROPLIST, queries=None, where=(), stats=True):
+        """Versi generator get_queues. Error dilempar ke pemanggil"""
+        arguments = {'stats': ''} if stats else {}
+        return self._stream('/queue/simple', 'print', build_print_arguments(arguments, proplist), queries, where)
+
+    def get_queues(self, proplist=QUEUE_PROPLIST, queries=None, where=(), stats=True):
+        """`/queue/simple print [stats]`, hanya kolom di proplist"""
+        arguments = {'stats': ''} if stats else {}
+        return self._call('/queue/simple', 'print',
+                          build_print_arguments(arguments, proplist), queries, where)
+
+    def get_queue_usage_index(self):
+        """Ambil `/queue/simple print stats` SEKALI lalu index per IP (dipakai semua lease)"""
+        if not self.api:
+            return QueueUsageIndex()
+        try:
+            return QueueUsageIndex(self.iter_queues())
+        except Exception as e:
+            print(f"[ERROR] Gagal ambil queue stats dari {self.host}: {e}")
+            return QueueUsageIndex()
+
+    def get_monthly_usage_gb(self, ip_addr, usage_index=None):
+        """Hitung total usage per IP dari queue simple (upload+download, counter mentah).
+        Kalau usage_index diberikan, tidak ada round trip ke router.
+        Usage per siklus tagihan: lihat usage_engine.UsageEngine."""
+        if not ip_addr:
+            return 0.0
+        if usage_index is None:
+            if not self.api:
+                return 0.0
+            usage_index = self.get_queue_usage_index()
+        return usage_index.usage_gb(ip_addr)
+
+    def get_interface_usage_gb(self, interface_name=None):
+        """Hitung usage per interface (upload+download)"""
+        if not self.api:
+            return {} if interface_name is None else 0.0
+        usage = {}
+        try:
+            interfaces = self._call('/interface', 'print', build_print_arguments(proplist=INTERFACE_PROPLIST),
+                                    {'name': interface_name} if interface_name else None)
+            for intf in interfaces:
+                name = intf.get('name')
+                if interface_name and name != interface_name:
+                    continue
+                rx = int(intf.get('rx-byte', 0))
+                tx = int(intf.get('tx-byte', 0))
+                usage_gb = round((rx + tx) / (1024**3), 2)
+                usage[name] = usage_gb
+            if interface_name:
+                return usage.get(interface_name, 0.0)
+            return usage
+        except Exception as e:
+            print(f"[ERROR] Gagal ambil usage interface dari {self.host}: {e}")
+            self.last_error = str(e)
+            return {} if interface_name is None else 0.0
+
+    def get_interface_counters(self):
+        """{nama interface: (rx_byte, tx_byte)} counter mentah. Error dilempar ke pemanggil"""
+        interfaces = self._call('/interface', 'print', build_print_arguments(proplist=INTERFACE_PROPLIST))
+        return {i.get('name'): (int(i.get('rx-byte', 0)), int(i.get('tx-byte', 0)))
+                for i in interfaces if i.get('name')}
+
+    # ---- set comment helpers ----
+    def set_lease_comment_by_id(self, lease_id, comment):
+        if not self.api or not lease_id:
+            return False
+        try:
+            self._call('/ip/dhcp-server/lease', 'set', {'.id': lease_id, 'comment': comment})
+            return True
+        except Exception as e:
+            print(f"[ERROR] Gagal set comment (.id={lease_id}): {e}")
+            return False
+
+    def _set_lease_comment_by_key(self, comment, address=None, mac=None):
+        """
+        Satu `set` kalau .id sudah ada di index. Kalau router membalas
+        "no such item" (lease dihapus / dibuat ulang), index dibuang,
+        .id dicari ulang sekali, lalu set diulang.
+        """
+        label = f"address={address}" if address else f"mac={mac}"
+        if not self.api or not (address or mac):
+            return False
+        lease_id = None
+        for attempt in (1, 2):
+            try:
+                lease_id = self.lookup_lease_id(address=address, mac=mac)
+                if not lease_id:
+                    print(f"[WARN] Lease untuk {label} tidak ditemukan.")
+                    return False
+                self._call('/ip/dhcp-server/lease', 'set', {'.id': lease_id, 'comment': comment})
+                return True
+            except Exception as e:
+                if attempt == 1 and _is_no_such_item(e):
+                    self._forget_lease_id(lease_id)
+                    continue
+                print(f"[ERROR] Gagal set comment ({label}): {e}")
+                return False
+
+    def set_lease_comment_by_address(self, address, comment):
+        return self._set_lease_comment_by_key(comment, address=address)
+
+    def set_lease_comment_by_mac(self, mac, comment):
+        return self._set_lease_comment_by_key(comment, mac=mac)
@@ -0,0 +1,168 @@
+# mikrotik_collector.py - ambil data pelanggan dari banyak router secara paralel
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from mikrotik_client import item_id
+from mikrotik_usage import InterfaceUsageFallback, resolve_lease_usage, format_usage
+from usage_engine import due_day
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_DEADLINE = 20.0   # detik per router, dihitung sejak fetch router itu mulai
+
+
+# ===== Load pelanggan dari satu router =====
+def load_pelanggan_dari_mikrotik_per_interface(client):
+    """Baris pelanggan satu router. Gagal konek / stream terpotong -> exception (bukan list kosong)"""
+    if not client.connect():
+        raise ConnectionError(client.last_error or f"Gagal konek ke {client.host}")
+    # index queue harus lengkap dulu, lease diproses sambil mengalir dari router
+    sampler = getattr(client, 'usage_sampler', None)
+    snap = sampler.latest(client.host) if sampler is not None else None
+    if snap is not None:
+        # hasil poll background masih segar: tidak perlu tarik queue/interface lagi
+        usage_index = snap["index"]
+        fallback = InterfaceUsageFallback(lambda: snap["interfaces"], client.interface_policy)
+    else:
+        usage_index = client.get_queue_usage_index()
+        fallback = InterfaceUsageFallback(client.get_interface_usage_gb, client.interface_policy)
+    engine = getattr(client, 'usage_engine', None)
+    meter = engine.meter(client.host, snap["ts"] if snap else None) if engine is not None else None
+    pelanggan_list = []
+
+    for lease in client.iter_leases_with_comment():
+        data = lease.get('parsed', {})
+        ip_addr = lease.get('address', '')
+
+        usage_total_gb, usage_per_interface = resolve_lease_usage(
+            ip_addr, usage_index, fallback, data.get('iface'),
+            meter, due_day(data.get('jatuh_tempo'), engine.cycle_day) if meter else None)
+
+        pelanggan_list.append({
+            # identitas stabil untuk tabel: router + MAC (tetap walau lease dibuat ulang), atau .id
+            "key": f"{client.host}:{lease.get('mac-address') or item_id(lease) or ip_addr}",
+            "nama_pelanggan": data.get('nama_pelanggan', 'Unknown'),
+            "paket": data.get('paket', '-'),
+            "harga": int(data.get('harga', 0)),  # pastikan angka
+            "no_hp": data.get('no_hp', '-'),
+            "jatuh_tempo": data.get('jatuh_tempo', '-'),
+            "ip": ip_addr,
+            "usage_total": format_usage(usage_total_gb),
+            "usage_per_interface": usage_per_interface
+        })
+
+    if meter is not None:
+        meter.flush()
+    client.disconnect()
+    return pelanggan_list
+
+
+# ===== Paralel banyak router =====
+class PartialResult(Exception):
+    """
+    Dilempar fetch yang gagal di tengah jalan tapi sudah punya hasil (mis.
+    write-back yang sebagian sudah ditulis). rows = hasil sebelum error.
+    """
+    def __init__(self, error, rows):
+        super().__init__(str(error))
+        self.rows = rows
+
+def _router_label(client):
+    return getattr(client, "host", None) or str(client)
+
+def collect_parallel(clients, fetch, max_workers=DEFAULT_MAX_WORKERS,
+                     deadline=DEFAULT_DEADLINE, on_result=None, cancel=None, keep_partial=False):
+    """
+    Jalankan fetch(client) untuk setiap router di worker pool terbatas.
+    Status router hanya dari fetch: return = ok, exception = error (bukan dari
+    client.last_error yang juga ditulis thread lain). PartialResult: status
+    error, rows-nya ikut digabung hanya kalau keep_partial.
+
+    Hasil digabung begitu router selesai (on_result(entry, rows) dipanggil
+    saat itu juga), router yang lewat deadline tidak ditunggu lagi.
+    cancel: objek dengan is_set() (mis. threading.Event); kalau di-set,
+    router yang belum selesai ditinggal dengan status "cancelled".
+    Return (rows, report):
+      rows   -> gabungan semua baris, urut sesuai urutan router di config
+      report -> list dict per router: host, status (ok/error/timeout),
+                count, elapsed, error
+    """
+    clients = list(clients)
+    if not clients:
+        return [], []
+
+    started = {}
+    lock = threading.Lock()
+
+    def run(idx, client):
+        with lock:
+            started[idx] = time.monotonic()
+        return fetch(client)
+
+    results = {}
+    report = [None] * len(clients)
+    t0 = time.monotonic()
+
+    def finish(idx, status, rows=None, error=None):
+        start = started.get(idx, t0)
+        entry = {
+            "host": _router_label(clients[idx]),
+            "status": status,
+            "count": len(rows or []),
+            "elapsed": round(time.monotonic() - start, 3),
+            "error": error,
+        }
+        report[idx] = entry
+        results[idx] = rows or []
+        if on_result:
+            try:
+                on_result(entry, rows or [])
+            except Exception as e:
+                print(f"[WARN] on_result callback gagal: {e}")
+
+    workers = max(1, min(int(max_workers or 1), len(clients)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mikrotik")
+    try:
+        pending = {executor.submit(run, i, c): i for i, c in enumerate(clients)}
+        while pending:
+            if cancel is not None and cancel.is_set():
+                for fut, idx in list(pending.items()):
+                    fut.cancel()
+                    finish(idx, "cancelled", error="dibatalkan")
+                pending.clear()
+                break
+            done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for fut in done:
+                idx = pending.pop(fut)
+                try:
+                    rows = fut.result()
+                except PartialResult as e:
+                    finish(idx, "error", e.rows if keep_partial else None, error=str(e))
+                    continue
+                except Exception as e:
+                    finish(idx, "error", error=str(e))
+                    continue
+                finish(idx, "ok", rows)
+
+            now = time.monotonic()
+            with lock:
+                expired = [f for f, i in pending.items()
+                           if i in started and now - started[i] > deadline]
+            for fut in expired:
+                idx = pending.pop(fut)
+                fut.cancel()
+                finish(idx, "timeout", error=f"lewat deadline {deadline}s")
+    finally:
+        # jangan blok di router yang hang, thread-nya selesai sendiri
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    for entry in report:
+        msg = f"[INFO] Router {entry['host']}: {entry['status']}, {entry['count']} pelanggan, {entry['elapsed']:.2f}s"
+        if entry["error"]:
+            msg += f" ({entry['error']})"
+        print(msg)
+
+    rows_all = []
+    for idx in range(len(clients)):
+        rows_all.extend(results.get(idx, []))
+    return rows_all, report
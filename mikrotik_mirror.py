@@ -0,0 +1,170 @@
+# mikrotik_mirror.py - salinan lokal tabel lease, di-update dari `listen` RouterOS
+import threading
+import time
+
+from mikrotik_client import LEASE_PROPLIST, parse_comment, validate_comment
+from routeros_proto import RouterOsTrap
+
+LEASE_PATH = '/ip/dhcp-server/lease'
+HEARTBEAT_PATH = '/system/identity/print'
+DEFAULT_IDLE_CHECK = 30.0
+
+
+class LeaseMirror:
+    """
+    Satu thread per router:
+      1. login, kirim `listen` dulu lalu `print` (dua tag di koneksi yang sama)
+      2. hasil print = isi awal mirror; event listen yang datang sebelum print
+         selesai ditahan lalu diterapkan sesudahnya (tidak ada event hilang)
+      3. setelah itu tiap event add/change/remove langsung mengubah mirror
+    Kalau koneksi putus: mirror ditandai belum sinkron, reconnect, full fetch lagi.
+    Putus diam-diam (NAT timeout, router reboot tanpa RST) dideteksi heartbeat:
+    kalau `idle_check` detik tidak ada sentence masuk, kirim perintah murah
+    (/system/identity/print); tidak dibalas dalam read_timeout client -> putus.
+    Connect/login memakai connect_timeout, read_timeout dan circuit breaker client.
+    """
+    def __init__(self, client, reconnect_delay=5.0, on_change=None, idle_check=DEFAULT_IDLE_CHECK):
+        self.client = client
+        self.idle_check = idle_check
+        self.reconnect_delay = reconnect_delay
+        self.on_change = on_change
+        self.synced = False
+        self.last_sync = None
+        self.last_error = None
+        self._leases = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = None
+
+    # ---- akses dari GUI / MikrotikClient ----
+    def snapshot(self):
+        with self._lock:
+            return [dict(l) for l in self._leases.values()]
+
+    def leases_with_comment(self):
+        leases = [l for l in self.snapshot() if validate_comment(l.get('comment', ''))]
+        for l in leases:
+            l['parsed'] = parse_comment(l.get('comment', ''))
+        return leases
+
+    # ---- thread ----
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"lease-mirror-{self.client.host}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        conn = self._conn
+        if conn is not None:
+            try:
+                conn.send('/cancel')
+            except Exception:
+                pass
+            conn.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._follow()
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.last_error = str(e)
+                print(f"[WARN] Mirror lease {self.client.host} putus: {e} (resync dalam {self.reconnect_delay}s)")
+            self.synced = False
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._stop.wait(self.reconnect_delay)
+
+    def _open(self):
+        c = self.client
+        if not c.breaker.allow():
+            raise ConnectionError(f"router offline (circuit open, coba lagi {c.breaker.retry_in():.0f}s)")
+        try:
+            conn = c._open_stream()   # connect_timeout untuk connect, read_timeout sesudahnya
+        except Exception:
+            c.breaker.record_failure()
+            raise
+        c.breaker.record_success()
+        return conn
+
+    def _follow(self):
+        c = self.client
+        conn = self._open()
+        self._conn = conn
+        listen_tag, print_tag = conn.next_tag(), conn.next_tag()
+        conn.send(LEASE_PATH + '/listen', tag=listen_tag)
+        conn.send(LEASE_PATH + '/print', {'.proplist': ','.join(LEASE_PROPLIST)}, tag=print_tag)
+
+        initial = {}
+        pending_events = []
+        last_rx = time.monotonic()
+        ping_tag, ping_sent = None, None
+        while not self._stop.is_set():
+            sentence = conn.read_sentence(timeout=1.0)
+            if sentence is None:
+                now = time.monotonic()
+                if ping_tag is not None:
+                    if now - ping_sent > c.read_timeout:
+                        c.breaker.record_failure()
+                        raise ConnectionError(f"heartbeat tidak dibalas dalam {c.read_timeout:.0f}s")
+                elif now - last_rx >= self.idle_check:
+                    ping_tag, ping_sent = conn.next_tag(), now
+                    conn.send(HEARTBEAT_PATH, tag=ping_tag)
+                continue
+            last_rx = time.monotonic()
+            reply, attrs, tag = sentence
+            if tag is not None and tag == ping_tag:
+                if reply != '!re':
+                    ping_tag = None   # !done (atau !trap): koneksi masih hidup
+                continue
+            if reply == '!fatal':
+                raise ConnectionError(attrs.get('message', 'fatal'))
+            if reply == '!trap':
+                raise RouterOsTrap(attrs.get('message', 'trap'), attrs)
+            if tag == print_tag:
+                if reply == '!re' and attrs.get('.id'):
+                    initial[attrs['.id']] = attrs
+                elif reply == '!done':
+                    with self._lock:
+                        self._leases = initial
+                        for ev in pending_events:
+                            self._apply(ev)
+                    pending_events = []
+                    self.synced = True
+                    self.last_sync = time.time()
+                    self.last_error = None
+                    print(f"[INFO] Mirror lease {c.host} sinkron ({len(initial)} lease)")
+                    self._notify()
+            elif tag == listen_tag and reply == '!re':
+                if not self.synced:
+                    pending_events.append(attrs)
+                    continue
+                with self._lock:
+                    self._apply(attrs)
+                self._notify()
+
+    def _apply(self, attrs):
+        # dipanggil dengan self._lock dipegang
+        lease_id = attrs.get('.id')
+        if not lease_id:
+            return
+        if attrs.get('.dead') == 'true' or attrs.get('.dead') == 'yes':
+            self._leases.pop(lease_id, None)
+            return
+        # listen mengirim item lengkap; ganti seluruh baris supaya properti
+        # yang dihapus (mis. comment dikosongkan) ikut hilang
+        self._leases[lease_id] = {k: v for k, v in attrs.items() if k in LEASE_PROPLIST}
+
+    def _notify(self):
+        if self.on_change:
+            try:
+                self.on_change(self)
+            except Exception as e:
+                print(f"[WARN] on_change mirror gagal: {e}")
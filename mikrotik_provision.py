@@ -0,0 +1,228 @@
+# mikrotik_provision.py - sinkron simple queue pelanggan ke router, hanya yang berubah
+#
+# Queue yang "dikelola" aplikasi (dibuat oleh aplikasi) ditandai comment
+# MANAGED_TAG. Queue lain di router (buatan tangan, dynamic, PPP, hotspot)
+# tidak pernah dihapus. Queue tanpa tanda yang target-nya sama persis dengan
+# pelanggan diadopsi: name/max-limit di-set (bukan dibuat dobel), tapi
+# comment-nya dibiarkan (catatan operator), jadi tetap tidak ikut dihapus.
+import re
+
+from mikrotik_client import item_id
+
+DEFAULT_MAX_LIMIT = "20M/20M"
+MANAGED_TAG = "invoice-app"
+QUEUE_PATH = '/queue/simple'
+PROVISION_PROPLIST = ('.id', 'name', 'target', 'max-limit', 'comment', 'dynamic')
+
+_RATE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kKmMgG]?)(?:bps|b)?\s*$', re.IGNORECASE)
+_UNITS = {'': 1, 'k': 1000, 'm': 1000**2, 'g': 1000**3}
+
+
+# ===== Normalisasi nilai queue =====
+def parse_rate(value, require_unit=False):
+    """'10M', '10Mbps', '512k', '20000000' -> bit/s (int), None kalau tidak terbaca"""
+    m = _RATE.match(str(value or ''))
+    if not m or (require_unit and not m.group(2)):
+        return None
+    return int(float(m.group(1)) * _UNITS[m.group(2).lower()])
+
+def parse_limit(value, require_unit=False):
+    """'10M/5M' atau '10Mbps' (simetris) -> (upload, download) bit/s, None kalau tidak terbaca.
+    require_unit: angka tanpa k/M/G ditolak (nama paket '20' bukan 20 bit/s)"""
+    parts = str(value or '').split('/')
+    rates = [parse_rate(p, require_unit) for p in parts[:2]]
+    if not rates or None in rates:
+        return None
+    return (rates[0], rates[-1])
+
+def format_limit(limit):
+    def one(bps):
+        for unit, div in (('G', 1000**3), ('M', 1000**2), ('k', 1000)):
+            if bps >= div and bps % div == 0:
+                return f"{bps // div}{unit}"
+        return str(bps)
+    return f"{one(limit[0])}/{one(limit[1])}"
+
+def normalize_target(target):
+    """'10.0.0.5' / '10.0.0.5/32' / beberapa target dipisah koma -> bentuk baku untuk dibandingkan"""
+    items = []
+    for t in str(target or '').split(','):
+        t = t.strip()
+        if t:
+            items.append(t if '/' in t else f"{t}/32")
+    return ','.join(sorted(items))
+
+def queue_name(nama):
+    return str(nama or 'pelanggan').strip().replace(" ", "_")
+
+
+# ===== Queue yang diinginkan =====
+def desired_queues(pelanggan_list, default_limit=DEFAULT_MAX_LIMIT):
+    """
+    pelanggan (dict nama_pelanggan/paket/ip) -> {target: {name, target, max-limit}}.
+    max-limit dari paket ('10Mbps', '10M/5M'), kalau tidak terbaca pakai default_limit.
+    """
+    fallback = parse_limit(default_limit) or parse_limit(DEFAULT_MAX_LIMIT)
+    desired = {}
+    for p in pelanggan_list:
+        ip = p.get('ip', '')
+        if not ip:
+            continue
+        target = normalize_target(ip)
+        limit = parse_limit(p.get('paket'), require_unit=True) or fallback
+        desired.setdefault(target, {
+            'name': queue_name(p.get('nama_pelanggan')),
+            'target': target,
+            'max-limit': format_limit(limit),
+        })
+    return desired
+
+
+# ===== Changeset =====
+def plan_queue_changes(existing, desired):
+    """
+    existing: hasil `/queue/simple print` (dengan PROVISION_PROPLIST)
+    Return dict:
+      add       -> list argumen add
+      set       -> list argumen set (dengan .id), hanya field yang berbeda
+      remove    -> list queue (dict) milik aplikasi yang sudah tidak ada pelanggannya
+      unchanged -> jumlah queue yang sudah sesuai
+      removes_all_managed -> True kalau SEMUA queue milik aplikasi ikut dihapus
+                             (apply_queue_changes menolak tanpa allow_remove_all)
+    """
+    plan = {"add": [], "set": [], "remove": [], "unchanged": 0}
+    by_target = {}
+    managed = 0
+    for q in existing:
+        if q.get('dynamic') == 'true':
+            continue
+        if q.get('comment') == MANAGED_TAG:
+            managed += 1
+        target = normalize_target(q.get('target'))
+        cur = by_target.get(target)
+        if cur is None:
+            by_target[target] = q
+        elif q.get('comment') == MANAGED_TAG:
+            if cur.get('comment') == MANAGED_TAG:
+                plan["remove"].append(q)   # queue dobel milik aplikasi
+            else:
+                by_target[target] = q      # utamakan queue milik aplikasi
+
+    for target, want in desired.items():
+        q = by_target.pop(target, None)
+        if q is None:
+            plan["add"].append(dict(want, comment=MANAGED_TAG))
+            continue
+        changes = {}
+        if q.get('name') != want['name']:
+            changes['name'] = want['name']
+        if parse_limit(q.get('max-limit')) != parse_limit(want['max-limit']):
+            changes['max-limit'] = want['max-limit']
+        if changes:
+            changes['.id'] = item_id(q)
+            changes['_target'] = target
+            plan["set"].append(changes)
+        else:
+            plan["unchanged"] += 1
+
+    plan["remove"].extend(q for q in by_target.values() if q.get('comment') == MANAGED_TAG)
+    plan["removes_all_managed"] = managed > 0 and len(plan["remove"]) == managed
+    return plan
+
+def summarize_plan(plan):
+    return f"{len(plan['add'])} baru, {len(plan['set'])} diubah, {len(plan['remove'])} dihapus, {plan['unchanged']} tetap"
+
+
+# ===== .rsc incremental (offline) =====
+def _rsc_value(v):
+    return '"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def plan_to_rsc(plan):
+    """Changeset -> baris script RouterOS. Item dicari lewat target (.id tidak sama di router lain)"""
+    lines = ["/queue simple"]
+    for q in plan["remove"]:
+        lines.append(f'remove [find where target={_rsc_value(q.get("target", ""))} comment={_rsc_value(MANAGED_TAG)}]')
+    for s in plan["set"]:
+        fields = ' '.join(f'{k}={_rsc_value(v)}' for k, v in s.items() if not k.startswith(('.', '_')))
+        lines.append(f'set [find where target={_rsc_value(s["_target"])} dynamic=no] {fields}')
+    for a in plan["add"]:
+        fields = ' '.join(f'{k}={_rsc_value(v)}' for k, v in a.items())
+        lines.append(f'add {fields}')
+    return lines
+
+def write_rsc(plan, output_file, header=None):
+    try:
+        with open(output_file, "w") as f:
+            f.write("# Auto-generated Mikrotik Simple Queue (incremental)\n")
+            if header:
+                f.write(f"# {header}\n")
+            f.write(f"# Import ke MikroTik dengan: /import {output_file}\n\n")
+            f.write("\n".join(plan_to_rsc(plan)) + "\n")
+        print(f"[INFO] File {output_file} berhasil dibuat ({summarize_plan(plan)}).")
+        return True
+    except Exception as e:
+        print(f"[ERROR] Gagal membuat file RSC: {e}")
+        return False
+
+
+# ===== Satu router =====
+def plan_router(client, default_limit=DEFAULT_MAX_LIMIT):
+    """
+    Bandingkan lease ber-comment (pelanggan) dengan queue yang ada. Return plan.
+    Kalau lease gagal diambil (atau terpotong), ConnectionError: daftar
+    pelanggan yang kosong/kurang akan membuat plan menghapus queue aplikasi.
+    """
+    if not client.api:
+        raise ConnectionError(f"Gagal ambil lease dari {client.host}: tidak terkoneksi")
+    try:
+        leases = list(client.iter_leases_with_comment())
+    except Exception as e:
+        raise ConnectionError(f"Gagal ambil lease dari {client.host}: {e}") from e
+    pelanggan = [dict(l.get('parsed', {}), ip=l.get('address', '')) for l in leases]
+    existing = client.get_queues(proplist=PROVISION_PROPLIST, stats=False)
+    return plan_queue_changes(existing, desired_queues(pelanggan, default_limit))
+
+def apply_queue_changes(client, plan, batch_size=50, allow_remove_all=False):
+    """
+    Kirim remove, set, add per batch (pipelined). Return list (aksi, item, error) yang gagal.
+    Plan yang menghapus semua queue milik aplikasi ditolak (ValueError) kecuali allow_remove_all.
+    """
+    if plan.get("removes_all_managed") and not allow_remove_all:
+        raise ValueError(f"Plan {client.host} menghapus semua {len(plan['remove'])} queue milik aplikasi, "
+                         f"perlu konfirmasi (allow_remove_all)")
+    failed = []
+    steps = (
+        ("remove", [{'.id': item_id(q)} for q in plan["remove"]]),
+        ("set", [{k: v for k, v in s.items() if not k.startswith('_')} for s in plan["set"]]),
+        ("add", plan["add"]),
+    )
+    for action, args in steps:
+        if not args:
+            continue
+        errors = client._call_pipelined(QUEUE_PATH, action, args, batch_size=batch_size)
+        for item, err in zip(args, errors):
+            if err:
+                failed.append((action, item, err))
+                print(f"[ERROR] Queue {action} {item.get('name') or item.get('.id')} di {client.host}: {err}")
+    return failed
+
+def provision_router(client, default_limit=DEFAULT_MAX_LIMIT, apply=True, rsc_file=None, batch_size=50,
+                     allow_remove_all=False):
+    """
+    Hitung changeset satu router, tulis .rsc incremental (opsional) lalu
+    terapkan (kalau apply). Return dict host, plan, failed.
+    """
+    if not client.connect():
+        raise ConnectionError(client.last_error or f"Gagal konek ke {client.host}")
+    try:
+        plan = plan_router(client, default_limit)
+        if rsc_file:
+            header = f"Router {client.host}: {summarize_plan(plan)}"
+            if plan["removes_all_managed"]:
+                header += " -- PERINGATAN: semua queue milik aplikasi dihapus"
+            write_rsc(plan, rsc_file, header=header)
+        failed = apply_queue_changes(client, plan, batch_size, allow_remove_all) if apply else []
+        print(f"[INFO] Provisioning queue {client.host}: {summarize_plan(plan)}, {len(failed)} gagal")
+        return {"host": client.host, "plan": plan, "failed": failed}
+    finally:
+        client.disconnect()
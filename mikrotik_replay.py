@@ -0,0 +1,177 @@
+# mikrotik_replay.py - rekam sesi API RouterOS ke file, putar ulang tanpa router
+#
+# Rekam (di PC yang terhubung ke router produksi):
+#   client.recorder = SessionRecorder("rekaman_router1.jsonl.gz", client.host)
+#   ... refresh / edit comment / write-back seperti biasa ...
+#   client.recorder.close()
+# atau set "record_session_dir" di config.json (semua router direkam).
+#
+# Putar ulang (di PC developer):
+#   client = ReplayClient("rekaman/192.168.88.1_8728-20260105-080000.jsonl.gz", speed=1.0)
+#   load_pelanggan_dari_mikrotik_per_interface(client)
+#
+# Format: gzip JSONL. Baris pertama header, lalu satu baris per panggilan:
+#   {"t": detik sejak mulai, "d": durasi, "op": call/stream/pipelined,
+#    "path", "cmd", "args", "q", "where", "res" atau "err": [tipe, pesan]}
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+from mikrotik_client import MikrotikClient, CircuitBreaker
+from routeros_proto import RouterOsTrap
+
+FORMAT_VERSION = 1
+
+
+def _plain(value):
+    """LazyAttrs / tuple -> tipe JSON biasa"""
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if hasattr(value, "items"):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+def _request_key(op, path, command, arguments, queries, where):
+    return json.dumps([op, path, command, _plain(arguments or {}), _plain(queries or {}), _plain(list(where or ()))],
+                      sort_keys=True, separators=(",", ":"))
+
+
+# ===== Rekam =====
+class SessionRecorder:
+    def __init__(self, path, host=None):
+        self.path = path
+        self._f = gzip.open(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        self.count = 0
+        self._write({"version": FORMAT_VERSION, "host": host, "started": time.time()})
+
+    def _write(self, obj):
+        self._f.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def record(self, op, path, command, arguments, queries, where, started, result=None, error=None):
+        now = time.monotonic()
+        entry = {
+            "t": round(started - self._t0, 4),
+            "d": round(now - started, 4),
+            "op": op, "path": path, "cmd": command,
+            "args": _plain(arguments or {}), "q": _plain(queries or {}), "where": _plain(list(where or ())),
+        }
+        if error is not None:
+            entry["err"] = [type(error).__name__, str(error)]
+        else:
+            entry["res"] = _plain(result)
+        with self._lock:
+            if self._f is None:
+                return
+            self._write(entry)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+        print(f"[INFO] Rekaman sesi {self.path}: {self.count} panggilan")
+
+
+# ===== Putar ulang =====
+_CONNECTION_ERROR_NAMES = {"ConnectionError", "OSError", "timeout", "TimeoutError", "BrokenPipeError",
+                           "ConnectionResetError", "RouterOsApiConnectionError", "FatalRouterOsApiError"}
+
+def _replay_error(err):
+    kind, message = err
+    if kind in _CONNECTION_ERROR_NAMES:
+        return ConnectionError(message)
+    if kind == "RouterOsTrap":
+        return RouterOsTrap(message)
+    return Exception(message)
+
+def load_recording(path):
+    """Return (header, list entry) dari file rekaman"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        entries = [json.loads(line) for line in f if line.strip()]
+    if header.get("version") != FORMAT_VERSION:
+        print(f"[WARN] Versi rekaman {header.get('version')} berbeda dengan {FORMAT_VERSION}")
+    return header, entries
+
+
+class ReplayClient(MikrotikClient):
+    """
+    MikrotikClient yang menjawab dari rekaman, bukan dari router.
+    Permintaan dicocokkan lewat (op, path, perintah, argumen, query); jawaban
+    untuk permintaan yang sama diputar sesuai urutan rekaman (yang terakhir
+    dipakai ulang kalau habis).
+    speed: 1.0 = durasi asli, 2.0 = dua kali lebih cepat, 0 = tanpa jeda.
+    """
+    def __init__(self, path, speed=1.0, host=None):
+        header, entries = load_recording(path)
+        super().__init__(host or header.get("host") or "replay", "replay", "", breaker=CircuitBreaker())
+        self.speed = speed
+        self.header = header
+        self._answers = defaultdict(deque)
+        for e in entries:
+            self._answers[_request_key(e["op"], e["path"], e["cmd"], e["args"], e["q"], e["where"])].append(e)
+        self.misses = 0
+
+    def connect(self):
+        self.api = self
+        self.last_error = None
+        return True
+
+    def close(self):
+        self.api = None
+
+    def _answer(self, op, path, command, arguments, queries, where):
+        queue = self._answers.get(_request_key(op, path, command, arguments, queries, where))
+        if not queue:
+            self.misses += 1
+            raise RouterOsTrap(f"tidak ada di rekaman: {op} {path}/{command}")
+        entry = queue.popleft() if len(queue) > 1 else queue[0]
+        return entry
+
+    def _sleep(self, seconds):
+        if self.speed and seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def _call(self, path, command, arguments=None, queries=None, where=()):
+        entry = self._answer('call', path, command, arguments, queries, where)
+        self._sleep(entry["d"])
+        if "err" in entry:
+            raise _replay_error(entry["err"])
+        return [dict(r) for r in entry["res"]]
+
+    def _stream(self, path, command, arguments=None, queries=None, where=()):
+        entry = self._answer('stream', path, command, arguments, queries, where)
+        rows = entry.get("res") or []
+        per_row = entry["d"] / max(1, len(rows))
+        for r in rows:
+            self._sleep(per_row)
+            yield dict(r)
+        if "err" in entry:
+            raise _replay_error(entry["err"])
+
+    def _call_pipelined(self, path, command, arguments_list, batch_size=50):
+        try:
+            entry = self._answer('pipelined', path, command, arguments_list, None, ())
+        except RouterOsTrap as e:
+            return [str(e)] * len(arguments_list)
+        self._sleep(entry["d"])
+        return list(entry["res"])
+
+
+def enable_recording(clients, directory):
+    """Pasang SessionRecorder ke tiap client: <directory>/<host>_<port>-<waktu>.jsonl.gz"""
+    import os
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    recorders = []
+    for c in clients:
+        c.recorder = SessionRecorder(os.path.join(directory, f"{c.host}_{c.port}-{stamp}.jsonl.gz"), c.host)
+        recorders.append(c.recorder)
+    return recorders
@@ -0,0 +1,196 @@
+# mikrotik_usage.py - index usage queue simple (sekali fetch per router per refresh)
+import ipaddress
+
+
+# ===== Helper angka usage =====
+def parse_bytes_pair(value):
+    """'upload/download' dari RouterOS -> total bytes (int)"""
+    if not value:
+        return 0
+    return sum(int(p) for p in str(value).split('/') if p.isdigit())
+
+def bytes_to_gb(total_bytes):
+    return round(total_bytes / (1024**3), 2)
+
+
+# ===== Index target (longest-prefix match) =====
+_ADDR_BITS = {4: 32, 6: 128}
+
+def _parse_addr(text):
+    """'10.0.0.5' -> (4, int); IPv6 lewat ipaddress. None kalau bukan IP"""
+    parts = text.split('.')
+    if len(parts) == 4 and all(p.isdigit() for p in parts):
+        a, b, c, d = (int(p) for p in parts)
+        if a < 256 and b < 256 and c < 256 and d < 256:
+            return 4, (a << 24) | (b << 16) | (c << 8) | d
+        return None
+    try:
+        addr = ipaddress.ip_address(text)
+    except ValueError:
+        return None
+    return addr.version, int(addr)
+
+class TargetIndex:
+    """
+    IP -> value dengan semantik longest-prefix match. Satu dict per panjang
+    prefix (key = bagian network dari alamat, sebagai int), jadi lookup hanya
+    sebanyak panjang prefix yang berbeda (maks. 33 untuk IPv4), bukan
+    sebanyak queue. Target boleh berisi beberapa alamat/subnet dipisah koma.
+    Prefix yang sama persis: value yang ditambahkan lebih dulu yang dipakai.
+    """
+    def __init__(self):
+        self._tables = {4: {}, 6: {}}    # versi -> {prefixlen: {network_int: value}}
+        self._lengths = {4: [], 6: []}   # prefixlen yang ada, urut dari terpanjang
+
+    def add(self, target, value):
+        """
+        Tambah semua bagian target. Return jumlah bagian yang benar-benar
+        tersimpan (IP/subnet yang prefix-nya belum dipakai value lain)
+        """
+        added = 0
+        for part in str(target or '').split(','):
+            addr_text, _, plen_text = part.strip().partition('/')
+            parsed = _parse_addr(addr_text)
+            if parsed is None:
+                continue   # target berupa nama interface, bukan IP
+            version, n = parsed
+            bits = _ADDR_BITS[version]
+            plen = int(plen_text) if plen_text.isdigit() else bits
+            if plen > bits:
+                continue
+            tables = self._tables[version]
+            table = tables.get(plen)
+            if table is None:
+                table = tables[plen] = {}
+                self._lengths[version] = sorted(tables, reverse=True)
+            key = n >> (bits - plen)
+            if key not in table:
+                table[key] = value
+                added += 1
+        return added
+
+    def lookup(self, ip_addr):
+        parsed = _parse_addr(ip_addr) if ip_addr else None
+        if parsed is None:
+            return None
+        version, n = parsed
+        bits = _ADDR_BITS[version]
+        tables = self._tables[version]
+        for plen in self._lengths[version]:
+            value = tables[plen].get(n >> (bits - plen))
+            if value is not None:
+                return value
+        return None
+
+def target_covers(ip_addr, target):
+    """True kalau ip_addr masuk salah satu alamat/subnet di target (boleh dipisah koma)"""
+    index = TargetIndex()
+    index.add(target, True)
+    return index.lookup(ip_addr) is not None
+
+
+# ===== Index IP -> counter dari /queue/simple =====
+def parse_counter_pair(value):
+    """'upload/download' -> (upload, download) int"""
+    up, _, down = str(value or '').partition('/')
+    return (int(up) if up.isdigit() else 0), (int(down) if down.isdigit() else 0)
+
+class QueueUsageIndex:
+    """
+    Dibangun dari SATU kali `/queue/simple print stats`, lalu dipakai
+    untuk semua lease di router itu (tanpa round trip tambahan).
+    IP diatribusikan ke queue dengan prefix paling spesifik yang meng-cover-nya
+    (/32 mengalahkan /24); kalau prefix-nya sama, queue yang lebih atas menang.
+    Queue yang semua target-nya sudah dipakai queue sebelumnya tidak masuk
+    index maupun counters(), jadi sampler dan meter melihat queue yang sama.
+    """
+    def __init__(self, queues=None):
+        self._entries = []      # [(target, upload, download)] urut sesuai queue
+        self._index = TargetIndex()
+        for q in queues or []:
+            target = q.get('target', '') or q.get('dst', '')
+            if not target or not q.get('bytes'):
+                continue
+            up, down = parse_counter_pair(q.get('bytes'))
+            entry = (target, up, down)
+            if self._index.add(target, entry):
+                self._entries.append(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def counters(self):
+        """{target: (upload, download)} queue di index (untuk usage_engine), pertama yang menang seperti lookup"""
+        counters = {}
+        for t, up, down in self._entries:
+            counters.setdefault(t, (up, down))
+        return counters
+
+    def lookup(self, ip_addr):
+        """(target, upload, download) queue yang meng-cover ip_addr, atau None"""
+        return self._index.lookup(ip_addr)
+
+    def lookup_bytes(self, ip_addr):
+        """Total bytes (counter mentah) queue yang meng-cover ip_addr, atau None"""
+        hit = self.lookup(ip_addr)
+        return None if hit is None else hit[1] + hit[2]
+
+    def usage_gb(self, ip_addr):
+        total = self.lookup_bytes(ip_addr)
+        return 0.0 if total is None else bytes_to_gb(total)
+
+def format_usage(gb):
+    return f"{gb:.2f} GB" if gb >= 1 else f"{gb*1024:.2f} MB"
+
+# ===== Fallback usage /interface untuk lease tanpa queue =====
+# router_total : lease tanpa queue diberi total semua interface router (perilaku lama)
+# unattributed : lease tanpa queue tidak diberi usage (0), /interface tidak diambil
+# iface        : pakai interface dari key `iface:` di comment pelanggan
+INTERFACE_POLICIES = ('router_total', 'unattributed', 'iface')
+DEFAULT_INTERFACE_POLICY = 'router_total'
+
+class InterfaceUsageFallback:
+    """
+    Usage /interface diambil paling banyak SEKALI per router per refresh
+    (baru diambil saat ada lease yang butuh), lalu dibagi ke semua lease.
+    """
+    def __init__(self, fetch, policy=DEFAULT_INTERFACE_POLICY):
+        if policy not in INTERFACE_POLICIES:
+            print(f"[WARN] interface_usage_policy '{policy}' tidak dikenal, pakai '{DEFAULT_INTERFACE_POLICY}'")
+            policy = DEFAULT_INTERFACE_POLICY
+        self.policy = policy
+        self._fetch = fetch
+        self._usage = None
+
+    def usage(self):
+        if self._usage is None:
+            self._usage = self._fetch() or {}
+        return self._usage
+
+    def for_lease(self, iface=None):
+        """dict {iface: gb} untuk satu lease tanpa queue, sesuai policy"""
+        if self.policy == 'unattributed':
+            return {}
+        if self.policy == 'iface':
+            if not iface:
+                return {}
+            usage = self.usage()
+            return {iface: usage[iface]} if iface in usage else {}
+        return dict(self.usage())
+
+def resolve_lease_usage(ip_addr, usage_index, fallback, iface=None, meter=None, cycle_day=None):
+    """
+    (usage_total_gb, usage_per_interface) untuk satu lease.
+    Dengan meter (usage_engine.RouterMeter) usage queue = pemakaian siklus
+    tagihan berjalan, tanpa meter = counter mentah queue.
+    Kalau IP tidak tercakup queue mana pun, pakai fallback (InterfaceUsageFallback).
+    """
+    hit = usage_index.lookup(ip_addr)
+    if hit is not None:
+        target, up, down = hit
+        total_bytes = up + down if meter is None else meter.cycle_bytes(target, up, down, cycle_day)
+        usage_total_gb = bytes_to_gb(total_bytes)
+        usage_per_interface = {'QueueSimple': usage_total_gb} if usage_total_gb > 0 else {}
+        return usage_total_gb, usage_per_interface
+    usage_per_interface = fallback.for_lease(iface)
+    return sum(usage_per_interface.values()), usage_per_interface
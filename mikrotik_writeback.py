@@ -0,0 +1,120 @@
+# mikrotik_writeback.py - tulis "Usage:" ke comment lease, hanya yang berubah & per batch
+import re
+
+from mikrotik_client import item_id
+from mikrotik_collector import PartialResult, collect_parallel
+from mikrotik_usage import InterfaceUsageFallback, resolve_lease_usage, format_usage
+from usage_engine import due_day
+
+DEFAULT_BATCH_SIZE = 50
+
+# potongan "iface: 1.23 GB" milik blok Usage (ikut terpecah karena dipisah ';')
+_USAGE_PART = re.compile(r'^[^:;]+:\s*[\d.]+ (GB|MB)$')
+
+
+def build_usage_comment(old_comment, usage_total_gb, usage_per_interface):
+    """Comment lama tanpa bagian 'Usage:' lama + 'Usage: Total: ...; iface: ...'"""
+    usage_interface_strs = [f"{iface}: {format_usage(gb)}" for iface, gb in usage_per_interface.items()]
+    usage_full_str = f"Total: {format_usage(usage_total_gb)}; " + '; '.join(usage_interface_strs)
+
+    comment_parts = []
+    in_usage = False
+    for p in (old_comment or '').split(';'):
+        p = p.strip()
+        if not p:
+            continue
+        if p.startswith('Usage:'):
+            in_usage = True
+            continue
+        if in_usage and _USAGE_PART.match(p):
+            continue
+        in_usage = False
+        comment_parts.append(p)
+    comment_parts.append(f"Usage: {usage_full_str}")
+    return '; '.join(comment_parts)
+
+def plan_usage_comments(client):
+    """
+    Hitung comment baru untuk SEMUA lease dulu (tanpa menulis apa pun).
+    Return (changes, skipped, error): changes berisi lease yang comment-nya
+    berubah. Stream lease terpotong -> error berisi pesannya, changes/skipped
+    tetap berisi lease yang sudah diterima sebelum terpotong.
+    """
+    usage_index = client.get_queue_usage_index()
+    fallback = InterfaceUsageFallback(client.get_interface_usage_gb, client.interface_policy)
+    engine = getattr(client, 'usage_engine', None)
+    meter = engine.meter(client.host) if engine is not None else None
+
+    changes, skipped, error = [], [], None
+    leases = client.iter_leases_with_comment()
+    while True:
+        try:
+            lease = next(leases)
+        except StopIteration:
+            break
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            print(f"[WARN] Stream lease dari {client.host} terpotong setelah "
+                  f"{len(changes) + len(skipped)} lease: {error}")
+            break
+        ip_addr = lease.get('address', '')
+        parsed = lease.get('parsed', {})
+        total_gb, per_iface = resolve_lease_usage(
+            ip_addr, usage_index, fallback, parsed.get('iface'),
+            meter, due_day(parsed.get('jatuh_tempo'), engine.cycle_day) if meter else None)
+        old_comment = lease.get('comment', '')
+        new_comment = build_usage_comment(old_comment, total_gb, per_iface)
+        if new_comment == old_comment:
+            skipped.append({"id": item_id(lease), "address": ip_addr})
+        else:
+            changes.append({"id": item_id(lease), "address": ip_addr, "old": old_comment, "new": new_comment})
+    if meter is not None:
+        meter.flush()
+    return changes, skipped, error
+
+def update_usage_comment_per_interface(client, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Write-back untuk satu router. Return list hasil per lease:
+    {"host", "id", "address", "status": written/skipped/failed, "error"}
+    Gagal konek -> exception (router dilaporkan error). Stream lease
+    terpotong -> lease yang sudah diterima tetap ditulis, lalu PartialResult
+    dengan hasil tulis tersebut.
+    """
+    if not client.connect():
+        raise ConnectionError(client.last_error or f"Gagal konek ke {client.host}")
+    try:
+        changes, skipped, error = plan_usage_comments(client)
+        results = [dict(host=client.host, id=s["id"], address=s["address"], status="skipped", error=None)
+                   for s in skipped]
+        errors = client.set_lease_comments([(c["id"], c["new"]) for c in changes], batch_size=batch_size)
+        for c, err in zip(changes, errors):
+            results.append(dict(host=client.host, id=c["id"], address=c["address"],
+                                status="failed" if err else "written", error=err))
+            if err:
+                print(f"[ERROR] Gagal set comment {c['address']} (.id={c['id']}) di {client.host}: {err}")
+        if error:
+            raise PartialResult(error, results)
+        return results
+    finally:
+        client.disconnect()
+
+def update_usage_comment_all(clients, batch_size=DEFAULT_BATCH_SIZE, max_workers=4, deadline=120):
+    """
+    Write-back semua router secara paralel.
+    Return {"written": [...], "skipped": [...], "failed": [...], "routers": [...]}
+    Router yang stream lease-nya terpotong berstatus error di "routers",
+    tapi lease yang sempat ditulis tetap masuk laporan.
+    """
+    results, router_report = collect_parallel(
+        clients,
+        lambda c: update_usage_comment_per_interface(c, batch_size=batch_size),
+        max_workers=max_workers,
+        deadline=deadline,
+        keep_partial=True,
+    )
+    report = {"written": [], "skipped": [], "failed": [], "routers": router_report}
+    for r in results:
+        report[r["status"]].append(r)
+    print(f"[INFO] Write-back usage: {len(report['written'])} ditulis, "
+          f"{len(report['skipped'])} tidak berubah, {len(report['failed'])} gagal")
+    return report
@@ -0,0 +1,112 @@
+# refresh_worker.py - jalankan refresh di thread background, hasil dikirim ke Tk lewat queue
+#
+# Thread worker tidak pernah menyentuh widget. Progres dan hasil dimasukkan ke
+# queue.Queue, lalu dibaca di thread Tk dengan after() (sekitar 60x per detik,
+# hanya selama ada refresh berjalan). Refresh baru membatalkan refresh yang
+# masih berjalan: token lamanya di-set cancel dan semua pesan dari generasi
+# lama dibuang, jadi tabel tidak pernah ditimpa hasil yang sudah basi.
+import queue
+import threading
+
+POLL_MS = 16
+
+
+class RefreshCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """Dibawa job: cek .cancelled / check(), kirim progres lewat progress()"""
+    def __init__(self, generation, outbox):
+        self.generation = generation
+        self._event = threading.Event()
+        self._outbox = outbox
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise RefreshCancelled()
+
+    def progress(self, info):
+        if not self._event.is_set():
+            self._outbox.put(("progress", self.generation, info))
+
+
+class RefreshWorker:
+    """
+    start(job, on_progress, on_done, on_error):
+      job(token) jalan di thread background dan return hasil;
+      on_progress(info) / on_done(hasil) / on_error(exc) dipanggil di thread Tk.
+    """
+    def __init__(self, widget, poll_ms=POLL_MS):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._outbox = queue.Queue()
+        self._generation = 0
+        self._token = None
+        self._callbacks = {}
+        self._polling = False
+
+    @property
+    def busy(self):
+        return self._token is not None
+
+    def start(self, job, on_progress=None, on_done=None, on_error=None, name="refresh"):
+        self.cancel()
+        self._generation += 1
+        token = self._token = CancelToken(self._generation, self._outbox)
+        self._callbacks = {"progress": on_progress, "done": on_done, "error": on_error}
+
+        def run():
+            try:
+                result = job(token)
+            except RefreshCancelled:
+                return
+            except Exception as e:
+                self._outbox.put(("error", token.generation, e))
+                return
+            self._outbox.put(("done", token.generation, result))
+
+        threading.Thread(target=run, name=f"{name}-{token.generation}", daemon=True).start()
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+        return token
+
+    def cancel(self):
+        if self._token is not None:
+            self._token.cancel()
+            self._token = None
+
+    def _poll(self):
+        while True:
+            try:
+                kind, generation, value = self._outbox.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation or self._token is None:
+                continue   # pesan dari refresh yang sudah dibatalkan
+            if kind != "progress":
+                self._token = None
+            callback = self._callbacks.get(kind)
+            if callback is not None:
+                try:
+                    callback(value)
+                except Exception as e:
+                    print(f"[ERROR] Callback refresh ({kind}) gagal: {e}")
+        if self._token is None and self._outbox.empty():
+            self._polling = False
+            return
+        try:
+            self.widget.after(self.poll_ms, self._poll)
+        except Exception:
+            self._polling = False   # jendela sudah ditutup
@@ -0,0 +1,270 @@
+# routeros_async.py - client API RouterOS berbasis asyncio (banyak perintah bertag di satu koneksi)
+import asyncio
+import binascii
+import hashlib
+
+from mikrotik_client import (
+    LEASE_PROPLIST, QUEUE_PROPLIST, INTERFACE_PROPLIST, HAS_COMMENT,
+    build_print_arguments, parse_comment, validate_comment,
+)
+from mikrotik_usage import QueueUsageIndex
+from routeros_proto import (
+    encode_sentence, build_command, SentenceDecoder,
+    RouterOsTrap,
+)
+
+
+class _Pending:
+    def __init__(self, loop):
+        self.rows = []
+        self.trap = None
+        self.future = loop.create_future()
+
+
+class AsyncRouterOsConnection:
+    """
+    Satu koneksi TCP, banyak perintah sekaligus: tiap perintah diberi .tag,
+    satu reader task membagi balasan (!re/!done/!trap) ke pemanggil yang benar.
+    """
+    def __init__(self, host, port=8728, timeout=10.0):
+        self.host = host
+        self.port = int(port or 8728)
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._pending = {}
+        self._tag = 0
+        self._closed_error = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+        return self
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        self._fail_all(ConnectionError(f"Koneksi ke {self.host} ditutup"))
+
+    def _fail_all(self, exc):
+        self._closed_error = exc
+        for p in self._pending.values():
+            if not p.future.done():
+                p.future.set_exception(exc)
+        self._pending.clear()
+
+    async def _read_loop(self):
+        decoder = SentenceDecoder()
+        try:
+            while True:
+                chunk = await self._reader.read(65536)
+                if not chunk:
+                    raise ConnectionError(f"Koneksi ke {self.host} ditutup router")
+                decoder.feed(chunk)
+                for sentence in decoder:
+                    self._dispatch(*sentence)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail_all(e)
+
+    def _dispatch(self, reply, attrs, tag):
+        if reply == '!fatal':
+            self._fail_all(ConnectionError(attrs.get('message', 'fatal')))
+            return
+        pending = self._pending.get(tag)
+        if pending is None:
+            return
+        if reply == '!re':
+            pending.rows.append(attrs)
+        elif reply == '!trap':
+            pending.trap = attrs
+        elif reply == '!done':
+            del self._pending[tag]
+            trap = pending.trap
+            if pending.future.done():
+                return
+            if trap is not None:
+                pending.future.set_exception(RouterOsTrap(trap.get('message', 'trap'), trap))
+            else:
+                if attrs:
+                    pending.rows.append(attrs)
+                pending.future.set_result(pending.rows)
+
+    async def call(self, command, arguments=None, queries=(), timeout=None):
+        """Kirim satu perintah bertag; boleh dipanggil bersamaan dari banyak task"""
+        if self._closed_error is not None:
+            raise self._closed_error
+        self._tag += 1
+        tag = str(self._tag)
+        pending = _Pending(asyncio.get_running_loop())
+        self._pending[tag] = pending
+        self._writer.write(encode_sentence(build_command(command, arguments, queries, tag)))
+        await self._writer.drain()
+        try:
+            return await asyncio.wait_for(pending.future, timeout or self.timeout)
+        finally:
+            self._pending.pop(tag, None)
+
+    async def login(self, username, password):
+        rows = await self.call('/login', {'name': username, 'password': password})
+        ret = next((r.get('ret') for r in rows if r.get('ret')), None)
+        if ret:
+            digest = hashlib.md5(b"\x00" + password.encode("utf-8") + binascii.unhexlify(ret)).hexdigest()
+            await self.call('/login', {'name': username, 'response': '00' + digest})
+        return self
+
+
+class AsyncMikrotikClient:
+    """Padanan async dari MikrotikClient (method high-level yang sama)"""
+    def __init__(self, host, username, password, port=8728, timeout=10.0):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+        self.last_error = None
+
+    async def connect(self):
+        try:
+            conn = AsyncRouterOsConnection(self.host, self.port, self.timeout)
+            await conn.connect()
+            try:
+                await conn.login(self.username, self.password)
+            except Exception:
+                await conn.close()
+                raise
+            self.conn = conn
+            self.last_error = None
+            return True
+        except Exception as e:
+            print(f"[ERROR] Gagal konek ke {self.host}: {e}")
+            self.last_error = str(e)
+            return False
+
+    async def disconnect(self):
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.disconnect()
+
+    async def _call(self, path, command, arguments=None, queries=None, where=()):
+        words = [f"?{k}={v}" for k, v in (queries or {}).items()] + list(where)
+        return await self.conn.call(f"{path}/{command}", arguments, words)
+
+    async def get_leases_with_comment(self, proplist=LEASE_PROPLIST, queries=None, where=HAS_COMMENT):
+        if not self.conn:
+            return []
+        try:
+            leases = await self._call('/ip/dhcp-server/lease', 'print',
+                                      build_print_arguments(proplist=proplist), queries, where)
+        except Exception as e:
+            print(f"[ERROR] Gagal ambil leases: {e}")
+            return []
+        filtered = [l for l in leases if validate_comment(l.get('comment', ''))]
+        for l in filtered:
+            l['parsed'] = parse_comment(l.get('comment', ''))
+        return filtered
+
+    async def get_queues(self, proplist=QUEUE_PROPLIST, queries=None, where=(), stats=True):
+        arguments = {'stats': ''} if stats else {}
+        return await self._call('/queue/simple', 'print',
+                                build_print_arguments(arguments, proplist), queries, where)
+
+    async def get_queue_usage_index(self):
+        if not self.conn:
+            return QueueUsageIndex()
+        try:
+            return QueueUsageIndex(await self.get_queues())
+        except Exception as e:
+            print(f"[ERROR] Gagal ambil queue stats dari {self.host}: {e}")
+            return QueueUsageIndex()
+
+    async def get_monthly_usage_gb(self, ip_addr, usage_index=None):
+        if not ip_addr:
+            return 0.0
+        if usage_index is None:
+            usage_index = await self.get_queue_usage_index()
+        return usage_index.usage_gb(ip_addr)
+
+    async def get_interface_usage_gb(self, interface_name=None):
+        if not self.conn:
+            return {} if interface_name is None else 0.0
+        usage = {}
+        try:
+            interfaces = await self._call('/interface', 'print', build_print_arguments(proplist=INTERFACE_PROPLIST),
+                                          {'name': interface_name} if interface_name else None)
+            for intf in interfaces:
+                rx = int(intf.get('rx-byte', 0))
+                tx = int(intf.get('tx-byte', 0))
+                usage[intf.get('name')] = round((rx + tx) / (1024**3), 2)
+        except Exception as e:
+            print(f"[ERROR] Gagal ambil interface dari {self.host}: {e}")
+        if interface_name:
+            return usage.get(interface_name, 0.0)
+        return usage
+
+    async def set_lease_comment_by_id(self, lease_id, comment):
+        if not self.conn or not lease_id:
+            return False
+        try:
+            await self._call('/ip/dhcp-server/lease', 'set', {'.id': lease_id, 'comment': comment})
+            return True
+        except Exception as e:
+            print(f"[ERROR] Gagal set comment (.id={lease_id}): {e}")
+            return False
+
+    async def set_lease_comment_by_address(self, address, comment):
+        if not self.conn or not address:
+            return False
+        try:
+            rows = await self._call('/ip/dhcp-server/lease', 'print',
+                                    build_print_arguments(proplist=('.id', 'address')), {'address': address})
+        except Exception as e:
+            print(f"[ERROR] Gagal set comment (address={address}): {e}")
+            return False
+        if not rows:
+            print(f"[WARN] Lease untuk address {address} tidak ditemukan.")
+            return False
+        return await self.set_lease_comment_by_id(rows[0].get('.id'), comment)
+
+    async def set_lease_comments(self, items):
+        """items: list (lease_id, comment), semua dikirim bersamaan. Return list error"""
+        async def one(lease_id, comment):
+            try:
+                await self._call('/ip/dhcp-server/lease', 'set', {'.id': lease_id, 'comment': comment})
+                return None
+            except Exception as e:
+                return str(e)
+        return await asyncio.gather(*(one(i, c) for i, c in items))
+
+
+async def gather_routers(clients, job):
+    """
+    Jalankan `await job(client)` untuk semua router bersamaan di satu event loop.
+    Return list (client, hasil atau Exception) sesuai urutan clients.
+    """
+    async def run(c):
+        if not await c.connect():
+            return ConnectionError(c.last_error)
+        try:
+            return await job(c)
+        finally:
+            await c.disconnect()
+    results = await asyncio.gather(*(run(c) for c in clients), return_exceptions=True)
+    return list(zip(clients, results))
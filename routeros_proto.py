@@ -0,0 +1,372 @@
+# routeros_proto.py - protokol API RouterOS (word, sentence, tag) di atas socket biasa
+#
+# Dipakai untuk hal yang tidak bisa lewat routeros_api, misalnya perintah
+# `listen` yang balasannya terus mengalir dan tidak pernah `!done`.
+import binascii
+import hashlib
+import socket
+import sys
+from collections.abc import MutableMapping
+
+
+class RouterOsProtocolError(Exception):
+    pass
+
+class RouterOsTrap(Exception):
+    """Balasan !trap dari router (perintah ditolak / item tidak ada)"""
+    def __init__(self, message, attrs=None):
+        super().__init__(message)
+        self.attrs = attrs or {}
+
+
+# ===== Encoding panjang word =====
+def encode_length(n):
+    if n < 0x80:
+        return bytes((n,))
+    if n < 0x4000:
+        return (n | 0x8000).to_bytes(2, "big")
+    if n < 0x200000:
+        return (n | 0xC00000).to_bytes(3, "big")
+    if n < 0x10000000:
+        return (n | 0xE0000000).to_bytes(4, "big")
+    return b"\xF0" + n.to_bytes(4, "big")
+
+def decode_length(buf, pos):
+    """Return (panjang, pos_setelah_prefix) atau None kalau byte belum lengkap"""
+    if pos >= len(buf):
+        return None
+    b = buf[pos]
+    if b < 0x80:
+        return b, pos + 1
+    if b < 0xC0:
+        size, n = 2, b & 0x3F
+    elif b < 0xE0:
+        size, n = 3, b & 0x1F
+    elif b < 0xF0:
+        size, n = 4, b & 0x0F
+    elif b == 0xF0:
+        size, n = 5, 0
+    else:
+        raise RouterOsProtocolError(f"Control byte tidak dikenal: {b:#x}")
+    if pos + size > len(buf):
+        return None
+    for i in range(1, size):
+        n = (n << 8) | buf[pos + i]
+    return n, pos + size
+
+def encode_word(word):
+    if isinstance(word, str):
+        word = word.encode("utf-8")
+    return encode_length(len(word)) + word
+
+def encode_sentence(words):
+    return b"".join(encode_word(w) for w in words) + b"\x00"
+
+def build_command(command, arguments=None, queries=(), tag=None):
+    """'/ip/dhcp-server/lease/print', {'.proplist': 'address'}, ('?comment',) -> list word"""
+    words = [command]
+    for k, v in (arguments or {}).items():
+        words.append(f"={k}={v}")
+    words.extend(queries or ())
+    if tag is not None:
+        words.append(f".tag={tag}")
+    return words
+
+def pop_sentence(buf):
+    """
+    Ambil satu sentence lengkap dari depan buffer (bytearray) dan buang
+    byte-nya dari buffer. Return list word (str) atau None kalau belum lengkap.
+    """
+    pos = 0
+    words = []
+    while True:
+        decoded = decode_length(buf, pos)
+        if decoded is None:
+            return None
+        n, pos = decoded
+        if n == 0:
+            del buf[:pos]
+            return words
+        if pos + n > len(buf):
+            return None
+        words.append(bytes(buf[pos:pos + n]).decode("utf-8", errors="replace"))
+        pos += n
+
+def parse_sentence(words):
+    """list word (str) -> (reply, attrs, tag). reply: '!re', '!done', '!trap', '!fatal', ..."""
+    if not words:
+        raise RouterOsProtocolError("Sentence kosong")
+    reply = words[0]
+    attrs = {}
+    tag = None
+    for w in words[1:]:
+        if w.startswith("="):
+            k, _, v = w[1:].partition("=")
+            attrs[k] = v
+        elif w.startswith(".tag="):
+            tag = w[5:]
+        elif reply == "!fatal":
+            attrs["message"] = w
+    return reply, attrs, tag
+
+
+# ===== Decoder tanpa salin per word =====
+class LazyAttrs(MutableMapping):
+    """
+    Atribut satu sentence. Saat diterima hanya byte sentence yang disimpan
+    (satu salinan); word baru dipecah & di-decode saat baris ini pertama kali
+    diakses. Key di-intern, jadi ribuan baris berbagi objek key yang sama.
+    Setelah itu berperilaku seperti dict biasa (bisa diubah).
+    """
+    __slots__ = ('_raw', '_keys', '_data')
+
+    def __init__(self, raw, keys, data=None):
+        self._raw = raw          # bytes sentence lengkap (termasuk word reply)
+        self._keys = keys        # cache key milik SentenceDecoder
+        self._data = data        # dict hasil decode, None = belum
+
+    def _load(self):
+        data = self._data
+        if data is not None:
+            return data
+        data = {}
+        raw, keys = self._raw, self._keys
+        # sentence ASCII (hampir selalu): decode sekali, offset byte == offset str
+        text = raw.decode("ascii") if raw.isascii() else None
+        p, size, first = 0, len(raw), True
+        while p < size:
+            n = raw[p]
+            if n < 0x80:
+                p += 1
+            else:
+                n, p = decode_length(raw, p)
+            if n == 0:
+                break
+            end = p + n
+            if first:
+                first = False
+            elif raw[p] == 0x3D:                    # '=key=value'
+                if text is not None:
+                    eq = text.find("=", p + 1, end)
+                    if eq < 0:
+                        eq = end
+                    kt = text[p + 1:eq]
+                    key = keys.get(kt)
+                    if key is None:
+                        key = keys[kt] = sys.intern(kt)
+                    data[key] = text[eq + 1:end]
+                else:
+                    eq = raw.find(b"=", p + 1, end)
+                    if eq < 0:
+                        eq = end
+                    key = sys.intern(raw[p + 1:eq].decode("utf-8", errors="replace"))
+                    data[key] = raw[eq + 1:end].decode("utf-8", errors="replace")
+            p = end
+        self._data = data
+        self._raw = None
+        return data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+
+    def __delitem__(self, key):
+        del self._load()[key]
+
+    def __contains__(self, key):
+        return key in self._load()
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def get(self, key, default=None):
+        return self._load().get(key, default)
+
+    def __repr__(self):
+        return repr(self._load())
+
+    def copy(self):
+        return dict(self._load())
+
+
+class SentenceDecoder:
+    """
+    Buffer terima yang dipakai ulang: feed() menambah byte dari socket,
+    next_sentence() mengambil satu (reply, attrs, tag). Buffer tidak dipotong
+    per sentence (hanya offset baca yang maju; dipadatkan sesekali) dan
+    atribut di-decode malas lewat LazyAttrs.
+    """
+    COMPACT_AT = 1 << 16
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+        self._keys = {}          # key -> str yang sudah di-intern (dipakai bersama semua baris)
+
+    def feed(self, data):
+        if self._pos and (self._pos >= len(self._buf) or self._pos >= self.COMPACT_AT):
+            del self._buf[:self._pos]
+            self._pos = 0
+        self._buf += data
+
+    def pending(self):
+        return len(self._buf) - self._pos
+
+    def next_sentence(self):
+        """
+        (reply, attrs, tag) berikutnya, atau None kalau sentence belum lengkap.
+        Sentence kosong -> (None, {}, None).
+        """
+        buf = self._buf
+        size = len(buf)
+        start = p = self._pos
+        reply_span = tag_span = None
+        while True:
+            if p >= size:
+                return None
+            n = buf[p]
+            if n < 0x80:
+                p += 1
+            else:
+                decoded = decode_length(buf, p)
+                if decoded is None:
+                    return None
+                n, p = decoded
+            if n == 0:
+                break
+            if p + n > size:
+                return None
+            if reply_span is None:
+                reply_span = (p, p + n)
+            elif buf[p] == 0x2E and buf[p:p + 5] == b".tag=":
+                tag_span = (p + 5, p + n)
+            p += n
+        self._pos = p
+        if reply_span is None:
+            return None, {}, None
+        reply = buf[reply_span[0]:reply_span[1]].decode("utf-8", errors="replace")
+        tag = buf[tag_span[0]:tag_span[1]].decode("utf-8", errors="replace") if tag_span else None
+        raw = bytes(memoryview(buf)[start:p])
+        if reply == "!fatal":
+            # !fatal: pesan berupa word polos (tanpa '=')
+            return reply, parse_sentence(pop_sentence(bytearray(raw)))[1], tag
+        return reply, LazyAttrs(raw, self._keys), tag
+
+    def __iter__(self):
+        while True:
+            sentence = self.next_sentence()
+            if sentence is None:
+                return
+            if sentence[0] is not None:
+                yield sentence
+
+
+# ===== Koneksi blocking =====
+class RouterOsConnection:
+    """
+    Koneksi API RouterOS minimal dengan buffer baca sendiri, sehingga
+    read_sentence() bisa dipanggil dengan timeout tanpa merusak sentence
+    yang baru setengah diterima.
+    """
+    def __init__(self, host, port=8728, timeout=10.0):
+        self.host = host
+        self.port = int(port or 8728)
+        self.timeout = timeout
+        self.sock = None
+        self._decoder = SentenceDecoder()
+        self._tag = 0
+
+    def connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return self
+
+    def close(self):
+        try:
+            if self.sock:
+                self.sock.close()
+        except OSError:
+            pass
+        self.sock = None
+
+    def next_tag(self):
+        self._tag += 1
+        return str(self._tag)
+
+    def send(self, command, arguments=None, queries=(), tag=None):
+        self.sock.sendall(encode_sentence(build_command(command, arguments, queries, tag)))
+
+    def read_sentence(self, timeout=None):
+        """
+        Return (reply, attrs, tag) atau None kalau sampai timeout belum ada
+        sentence lengkap. Koneksi ditutup router -> ConnectionError.
+        attrs berupa LazyAttrs (value di-decode saat diakses).
+        """
+        while True:
+            sentence = self._decoder.next_sentence()
+            if sentence is not None:
+                if sentence[0] is None:
+                    continue   # sentence kosong
+                return sentence
+            self.sock.settimeout(self.timeout if timeout is None else timeout)
+            try:
+                chunk = self.sock.recv(65536)
+            except socket.timeout:
+                return None
+            if not chunk:
+                raise ConnectionError(f"Koneksi ke {self.host} ditutup router")
+            self._decoder.feed(chunk)
+
+    def stream(self, command, arguments=None, queries=()):
+        """
+        Kirim satu perintah, yield attrs tiap !re begitu datang (tidak ditumpuk
+        jadi list). !trap -> RouterOsTrap setelah !done.
+        """
+        tag = self.next_tag()
+        self.send(command, arguments, queries, tag)
+        trap = None
+        while True:
+            sentence = self.read_sentence()
+            if sentence is None:
+                raise socket.timeout(f"Timeout menunggu balasan {command} dari {self.host}")
+            reply, attrs, rtag = sentence
+            if reply == "!fatal":
+                raise ConnectionError(attrs.get("message", "fatal"))
+            if rtag != tag:
+                continue
+            if reply == "!re":
+                yield attrs
+            elif reply == "!trap":
+                trap = attrs
+            elif reply == "!done":
+                if trap is not None:
+                    raise RouterOsTrap(trap.get("message", "trap"), trap)
+                if attrs:
+                    yield attrs
+                return
+
+    def talk(self, command, arguments=None, queries=()):
+        """Kirim satu perintah, tunggu sampai !done. Return list attrs dari !re"""
+        return list(self.stream(command, arguments, queries))
+
+    def login(self, username, password):
+        rows = self.talk("/login", {"name": username, "password": password})
+        ret = next((r.get("ret") for r in rows if r.get("ret")), None)
+        if ret:
+            # RouterOS < 6.43: login challenge-response MD5
+            digest = hashlib.md5(b"\x00" + password.encode("utf-8") + binascii.unhexlify(ret)).hexdigest()
+            self.talk("/login", {"name": username, "response": "00" + digest})
+        return self
+
+def open_connection(host, port, username, password, timeout=10.0):
+    conn = RouterOsConnection(host, port, timeout)
+    try:
+        return conn.connect().login(username, password)
+    except Exception:
+        conn.close()
+        raise
@@ -0,0 +1,374 @@
+# routeros_sim.py - router RouterOS palsu (protokol API biner) untuk benchmark & uji offline
+#
+# Jalankan:  python routeros_sim.py --port 18728 --leases 10000 --latency 0.01
+# Lalu arahkan host/port router di config.json ke 127.0.0.1:18728.
+import argparse
+import asyncio
+import random
+import threading
+
+from routeros_proto import encode_sentence, pop_sentence
+
+
+# ===== Data sintetis =====
+def make_tables(leases=1000, commented=0.8, interfaces=4, queue_ratio=0.9, seed=1):
+    """Buat tabel lease, queue simple dan interface yang bentuknya mirip router produksi"""
+    rnd = random.Random(seed)
+    lease_rows, queue_rows = [], []
+    for i in range(leases):
+        # host 10.0.0.1, 10.0.0.2, ... (offset +1: alamat unik, tidak mulai dari 10.0.0.0)
+        n = i + 1
+        ip = f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+        mac = ":".join(f"{(i >> s) & 255:02X}" for s in (40, 32, 24, 16, 8, 0))
+        row = {
+            ".id": f"*{i + 1:X}",
+            "address": ip,
+            "mac-address": mac,
+            "server": "dhcp1",
+            "status": "bound",
+            "host-name": f"host-{i}",
+            "dynamic": "false",
+        }
+        if rnd.random() < commented:
+            row["comment"] = (f"nama:Pelanggan {i}; paket:{rnd.choice((5, 10, 20))}Mbps; "
+                              f"harga:{rnd.choice((100000, 150000, 200000))}; due:{rnd.randint(1, 28):02d}/01/2026; "
+                              f"no_hp:08{rnd.randint(10**9, 10**10 - 1)}")
+        lease_rows.append(row)
+        if rnd.random() < queue_ratio:
+            up, down = rnd.randint(0, 5 * 1024**3), rnd.randint(0, 50 * 1024**3)
+            queue_rows.append({
+                ".id": f"*{0x1000 + i:X}",
+                "name": f"q-{i}",
+                "target": f"{ip}/32",
+                "max-limit": "20000000/20000000",
+                "bytes": f"{up}/{down}",
+                "rate": f"{rnd.randint(0, 10**6)}/{rnd.randint(0, 10**7)}",
+                "disabled": "false",
+            })
+    iface_rows = [{
+        ".id": f"*{n + 1:X}",
+        "name": f"ether{n + 1}",
+        "type": "ether",
+        "rx-byte": str(rnd.randint(0, 10**12)),
+        "tx-byte": str(rnd.randint(0, 10**12)),
+        "running": "true",
+    } for n in range(interfaces)]
+    return {
+        "/ip/dhcp-server/lease": lease_rows,
+        "/queue/simple": queue_rows,
+        "/interface": iface_rows,
+        "/system/identity": [{"name": "SimRouter"}],
+    }
+
+
+# ===== Query RouterOS (?prop, ?-prop, ?prop=v, ?<prop=v, ?>prop=v) =====
+def _match(row, queries):
+    for q in queries:
+        body = q[1:]
+        if body.startswith("#"):
+            continue  # operasi stack (?#|, ?#!) tidak disimulasikan, semua AND
+        if body.startswith("-"):
+            if body[1:] in row:
+                return False
+            continue
+        op = "="
+        if body[:1] in "<>":
+            op, body = body[0], body[1:]
+        if "=" not in body:
+            if body not in row:
+                return False
+            continue
+        key, _, value = body.partition("=")
+        cur = row.get(key)
+        if op == "=" and (cur or "") != value:
+            return False
+        if op in "<>":
+            try:
+                a, b = int(cur), int(value)
+            except (TypeError, ValueError):
+                return False
+            if (op == "<" and not a < b) or (op == ">" and not a > b):
+                return False
+    return True
+
+
+class SimulatedRouter:
+    """
+    Satu router palsu. Gangguan yang bisa disuntik:
+      latency         detik tambahan per perintah (+/- jitter)
+      error_rate      peluang perintah dibalas !trap
+      disconnect_rate peluang koneksi diputus di tengah perintah
+    """
+    def __init__(self, tables=None, username="admin", password="", latency=0.0, jitter=0.0,
+                 error_rate=0.0, disconnect_rate=0.0, seed=1):
+        self.tables = tables or make_tables()
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.disconnect_rate = disconnect_rate
+        self.rnd = random.Random(seed)
+        self.stats = {"connections": 0, "commands": 0, "rows_sent": 0, "bytes_sent": 0}
+        self._listeners = {}     # path -> {(writer, tag)}
+        self._next_id = 0x100000
+        self.server = None
+        self.port = None
+        self.loop = None
+        self._thread = None
+        self._clients = {}       # task _handle -> writer per koneksi client
+
+    # ---- mutasi tabel (dipakai set/add/remove & dari test) ----
+    def _find(self, path, item_id):
+        return next((r for r in self.tables.get(path, []) if r.get(".id") == item_id), None)
+
+    def _emit(self, path, row, dead=False):
+        words = ["!re"] + [f"={k}={v}" for k, v in row.items()]
+        if dead:
+            words.append("=.dead=true")
+        for writer, tag in list(self._listeners.get(path, ())):
+            try:
+                writer.write(encode_sentence(words + [f".tag={tag}"]))
+            except Exception:
+                self._listeners[path].discard((writer, tag))
+
+    def reset_counters(self, path="/queue/simple"):
+        """Simulasi reboot: semua counter bytes kembali 0"""
+        for r in self.tables.get(path, []):
+            if "bytes" in r:
+                r["bytes"] = "0/0"
+
+    def add_traffic(self, max_bytes=50 * 1024**2):
+        for r in self.tables.get("/queue/simple", []):
+            up, _, down = r.get("bytes", "0/0").partition("/")
+            r["bytes"] = f"{int(up) + self.rnd.randint(0, max_bytes)}/{int(down) + self.rnd.randint(0, max_bytes)}"
+
+    # ---- protokol ----
+    async def _handle(self, reader, writer):
+        self.stats["connections"] += 1
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        buf = bytearray()
+        logged_in = False
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                buf += chunk
+                while True:
+                    words = pop_sentence(buf)
+                    if words is None:
+                        break
+                    if not words:
+                        continue
+                    logged_in = await self._command(words, writer, logged_in)
+                    if logged_in is None:
+                        return
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # dibatalkan saat shutdown, jangan sampai jadi traceback di callback asyncio
+        finally:
+            for subs in self._listeners.values():
+                for sub in [s for s in subs if s[0] is writer]:
+                    subs.discard(sub)
+            writer.close()
+            self._clients.pop(task, None)
+
+    async def _command(self, words, writer, logged_in):
+        self.stats["commands"] += 1
+        command = words[0]
+        args, queries, tag = {}, [], None
+        for w in words[1:]:
+            if w.startswith("="):
+                k, _, v = w[1:].partition("=")
+                args[k] = v
+            elif w.startswith("?"):
+                queries.append(w)
+            elif w.startswith(".tag="):
+                tag = w[5:]
+
+        def send(reply, attrs=None):
+            out = [reply] + [f"={k}={v}" for k, v in (attrs or {}).items()]
+            if tag is not None:
+                out.append(f".tag={tag}")
+            data = encode_sentence(out)
+            self.stats["bytes_sent"] += len(data)
+            writer.write(data)
+
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + self.rnd.uniform(-self.jitter, self.jitter)))
+        if self.disconnect_rate and self.rnd.random() < self.disconnect_rate:
+            writer.close()
+            return None
+
+        if command == "/login":
+            if args.get("name") == self.username and args.get("password", "") == self.password:
+                send("!done")
+                return True
+            send("!trap", {"message": "invalid user name or password (6)"})
+            send("!done")
+            return False
+        if not logged_in:
+            send("!fatal", {"message": "not logged in"})
+            writer.close()
+            return None
+        if command == "/cancel":
+            target = args.get("tag")
+            for subs in self._listeners.values():
+                for sub in [s for s in subs if s[0] is writer and (target is None or s[1] == target)]:
+                    subs.discard(sub)
+                    writer.write(encode_sentence(["!trap", "=category=2", "=message=interrupted", f".tag={sub[1]}"]))
+                    writer.write(encode_sentence(["!done", f".tag={sub[1]}"]))
+            send("!done")
+            return True
+        if self.error_rate and self.rnd.random() < self.error_rate:
+            send("!trap", {"message": "simulated failure"})
+            send("!done")
+            return True
+
+        path, _, action = command.rpartition("/")
+        table = self.tables.get(path)
+        if table is None:
+            send("!trap", {"message": "no such command prefix"})
+            send("!done")
+            return True
+
+        if action == "print":
+            proplist = args.get(".proplist")
+            keys = proplist.split(",") if proplist else None
+            for row in table:
+                if writer.is_closing():
+                    return True   # client berhenti membaca di tengah print
+                if queries and not _match(row, queries):
+                    continue
+                out = row if keys is None else {k: row[k] for k in keys if k in row}
+                send("!re", out)
+                self.stats["rows_sent"] += 1
+                if self.stats["rows_sent"] % 500 == 0:
+                    await writer.drain()
+            send("!done")
+        elif action == "listen":
+            self._listeners.setdefault(path, set()).add((writer, tag))
+        elif action == "set":
+            row = self._find(path, args.get(".id"))
+            if row is None:
+                send("!trap", {"message": "no such item"})
+            else:
+                row.update({k: v for k, v in args.items() if k != ".id"})
+                self._emit(path, row)
+            send("!done")
+        elif action == "add":
+            self._next_id += 1
+            row = {".id": f"*{self._next_id:X}"}
+            row.update(args)
+            table.append(row)
+            self._emit(path, row)
+            send("!done", {"ret": row[".id"]})
+        elif action == "remove":
+            row = self._find(path, args.get(".id"))
+            if row is None:
+                send("!trap", {"message": "no such item"})
+            else:
+                table.remove(row)
+                self._emit(path, {".id": row[".id"]}, dead=True)
+            send("!done")
+        else:
+            send("!trap", {"message": f"unknown command {action}"})
+            send("!done")
+        return True
+
+    # ---- server ----
+    async def serve(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def shutdown(self):
+        """Tutup listener lalu putus semua koneksi client dan tunggu task _handle selesai"""
+        if self.server is not None:
+            self.server.close()
+        clients = list(self._clients.items())
+        for _, writer in clients:
+            writer.close()   # reader dapat EOF, _handle keluar dari loop dengan normal
+        tasks = [task for task, _ in clients]
+        _, pending = await asyncio.wait(tasks, timeout=2.0) if tasks else (set(), set())
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+
+    def start_in_thread(self, host="127.0.0.1", port=0):
+        """Jalankan di thread background (untuk benchmark sinkron). Return port"""
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self.loop = loop
+            try:
+                loop.run_until_complete(self.serve(host, port))
+                ready.set()
+                loop.run_forever()
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                ready.set()
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name="routeros-sim", daemon=True)
+        self._thread.start()
+        ready.wait(10)
+        return self.port
+
+    def stop(self, timeout=5.0):
+        """Pasangan start_in_thread: shutdown() di loop simulator, hentikan loop, tunggu thread selesai"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.shutdown(), loop).result(timeout)
+        except Exception as e:
+            print(f"[WARN] Simulator tidak berhenti bersih: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+def main():
+    ap = argparse.ArgumentParser(description="Simulator API RouterOS untuk benchmark Sistem Mikrotik Invoice")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=18728)
+    ap.add_argument("--leases", type=int, default=1000)
+    ap.add_argument("--commented", type=float, default=0.8, help="porsi lease yang punya comment")
+    ap.add_argument("--interfaces", type=int, default=4)
+    ap.add_argument("--username", default="admin")
+    ap.add_argument("--password", default="")
+    ap.add_argument("--latency", type=float, default=0.0, help="detik per perintah")
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--disconnect-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    router = SimulatedRouter(
+        make_tables(a.leases, a.commented, a.interfaces, seed=a.seed),
+        username=a.username, password=a.password, latency=a.latency, jitter=a.jitter,
+        error_rate=a.error_rate, disconnect_rate=a.disconnect_rate, seed=a.seed,
+    )
+
+    async def run():
+        await router.serve(a.host, a.port)
+        print(f"[INFO] Simulator RouterOS jalan di {a.host}:{router.port} ({a.leases} lease)")
+        while True:
+            await asyncio.sleep(3600)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print(f"[INFO] Simulator berhenti. Statistik: {router.stats}")
+
+if __name__ == "__main__":
+    main()
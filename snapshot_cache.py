@@ -0,0 +1,58 @@
+# snapshot_cache.py - simpan/muat tabel pelanggan terakhir (tampil instan saat aplikasi dibuka)
+#
+# Format file: header biner tetap (magic, versi, waktu simpan, jumlah baris)
+# lalu JSON terkompresi zlib. Baris disimpan sebagai list nilai (tanpa nama
+# kolom berulang) dan dikelompokkan per sumber ("manual" atau host router),
+# jadi router yang gagal saat refresh berikutnya bisa tetap memakai baris
+# lamanya (ditandai stale).
+import json
+import os
+import struct
+import time
+import zlib
+
+MAGIC = b"MKSNAP"
+VERSION = 1
+FIELDS = ('key', 'nama_pelanggan', 'paket', 'harga', 'no_hp', 'jatuh_tempo', 'usage_total', 'ip')
+_HEADER = struct.Struct("<6sBdI")   # magic, versi, waktu simpan, jumlah baris
+
+
+def save_snapshot(path, groups, selected=None, saved=None):
+    """groups: {sumber: [dict baris]}. Tulis atomik, return True kalau berhasil"""
+    payload = {
+        "fields": FIELDS,
+        "selected": selected,
+        "groups": {src: [[r.get(f) for f in FIELDS] for r in rows] for src, rows in groups.items()},
+    }
+    count = sum(len(rows) for rows in groups.values())
+    blob = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, time.time() if saved is None else saved, count))
+            f.write(blob)
+        os.replace(tmp, path)
+        return True
+    except Exception as e:
+        print(f"[WARN] Gagal simpan snapshot {path}: {e}")
+        return False
+
+def load_snapshot(path):
+    """Return {"saved", "selected", "groups": {sumber: [dict]}} atau None kalau tidak ada/rusak/beda versi"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(_HEADER.size)
+            if len(head) < _HEADER.size:
+                return None
+            magic, version, saved, count = _HEADER.unpack(head)
+            if magic != MAGIC or version != VERSION:
+                return None
+            payload = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[WARN] Snapshot {path} tidak terbaca: {e}")
+        return None
+    fields = payload.get("fields", FIELDS)
+    groups = {src: [dict(zip(fields, vals)) for vals in rows] for src, rows in payload.get("groups", {}).items()}
+    return {"saved": saved, "selected": payload.get("selected"), "groups": groups}
@@ -0,0 +1,5 @@
+# conftest.py - modul aplikasi ada di root repo (bukan package), tambahkan ke sys.path
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
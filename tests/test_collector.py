@@ -0,0 +1,43 @@
+# test_collector.py - status per router di collect_parallel
+from mikrotik_collector import PartialResult, collect_parallel
+
+
+class _Client:
+    def __init__(self, host, rows, error=None):
+        self.host = host
+        self.rows = rows
+        self.error = error
+        self.last_error = None
+
+    def fetch(self):
+        if self.error:
+            raise ConnectionError(self.error)
+        return self.rows
+
+
+def test_truncated_stream_is_not_ok():
+    good = _Client("r1", [{"ip": "10.0.0.1"}])
+    cut = _Client("r2", [{"ip": "10.0.1.1"}], error="Koneksi ke r2 ditutup router")
+    rows, report = collect_parallel([good, cut], lambda c: c.fetch())
+    assert [e["status"] for e in report] == ["ok", "error"]
+    assert report[1]["error"] == cut.error
+    assert rows == good.rows   # baris terpotong tidak ikut digabung (dan tidak masuk snapshot)
+
+
+def test_status_comes_from_fetch_not_shared_client_state():
+    ok = _Client("r1", [{"ip": "10.0.0.1"}])
+    ok.last_error = "timeout dari thread sampler"   # ditulis thread lain, bukan hasil refresh ini
+    rows, report = collect_parallel([ok], lambda c: c.rows)
+    assert report[0]["status"] == "ok"
+    assert rows == ok.rows
+
+
+def test_partial_result_kept_only_when_asked():
+    def fetch(c):
+        raise PartialResult("stream putus", [{"ip": "10.0.0.1"}])
+
+    c = _Client("r1", [])
+    rows, report = collect_parallel([c], fetch)
+    assert (rows, report[0]["status"]) == ([], "error")
+    rows, report = collect_parallel([c], fetch, keep_partial=True)
+    assert (rows, report[0]["status"], report[0]["error"]) == ([{"ip": "10.0.0.1"}], "error", "stream putus")
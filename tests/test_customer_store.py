@@ -0,0 +1,84 @@
+# test_customer_store.py - penyimpanan pelanggan manual di SQLite
+import json
+
+import pytest
+
+from customer_store import MIGRATED_KEY, CustomerStore
+
+
+LEGACY = [
+    {"nama_pelanggan": "Budi", "paket": "10Mbps", "harga": "Rp 150.000", "no_hp": "0812", "jatuh_tempo": "2026-01-05",
+     "ip": "10.0.0.2", "usage_total": "-", "iface": "ether2"},
+    {"nama_pelanggan": "Siti", "paket": "20Mbps", "harga": 200000, "no_hp": "0813", "jatuh_tempo": "2026-01-20",
+     "ip": "10.0.0.3"},
+]
+
+
+@pytest.fixture
+def legacy_json(tmp_path):
+    path = tmp_path / "customers.json"
+    path.write_text(json.dumps(LEGACY), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = CustomerStore(str(tmp_path / "customers.db"))
+    yield s
+    s.close()
+
+
+def test_migrate_json_imports_once_and_keeps_file(tmp_path, legacy_json):
+    before = legacy_json.read_bytes()
+    s = CustomerStore(str(tmp_path / "customers.db"), legacy_json=str(legacy_json))
+    try:
+        assert s.count() == 2
+        budi = s.find("Budi")
+        assert budi["harga"] == 150000 and budi["iface"] == "ether2"
+        assert json.loads(s.get_meta(MIGRATED_KEY)) == {"file": "customers.json", "rows": 2}
+        # semua pelanggan dihapus: migrasi tetap tidak diulang
+        for c in s.all():
+            s.delete(c["id"])
+        assert s.migrate_json(str(legacy_json)) == 0
+        assert s.count() == 0
+    finally:
+        s.close()
+    assert legacy_json.read_bytes() == before     # file lama (dilacak git) tidak disentuh
+    reopened = CustomerStore(str(tmp_path / "customers.db"), legacy_json=str(legacy_json))
+    try:
+        assert reopened.count() == 0
+    finally:
+        reopened.close()
+
+
+def test_migrate_json_rolls_back_on_bad_row(store, tmp_path):
+    path = tmp_path / "customers.json"
+    path.write_text(json.dumps(LEGACY + [{"paket": "5Mbps", "nama_pelanggan": None}]), encoding="utf-8")
+    assert store.migrate_json(str(path)) == 0     # nama_pelanggan NOT NULL -> seluruh import dibatalkan
+    assert store.count() == 0
+    assert store.get_meta(MIGRATED_KEY) is None
+    path.write_text(json.dumps(LEGACY), encoding="utf-8")
+    assert store.migrate_json(str(path)) == 2     # bisa diulang setelah diperbaiki
+
+
+def test_update_merges_extra(store):
+    cid = store.add({"nama_pelanggan": "Budi", "harga": 100000, "iface": "ether2", "usage": "1 GB"})
+    assert store.update(cid, {"harga": "Rp 150.000", "usage": "2 GB", "catatan": "pindah paket"})
+    c = store.get(cid)
+    assert c["harga"] == 150000 and c["nama_pelanggan"] == "Budi"
+    assert (c["iface"], c["usage"], c["catatan"]) == ("ether2", "2 GB", "pindah paket")
+    assert not store.update(cid + 1, {"harga": 1})
+
+
+def test_failed_update_rolls_back(store):
+    cid = store.add({"nama_pelanggan": "Budi", "harga": 100000, "iface": "ether2"})
+    with pytest.raises(TypeError):
+        store.update(cid, {"harga": 200000, "iface": object()})   # extra tidak bisa di-JSON-kan
+    c = store.get(cid)
+    assert c["harga"] == 100000 and c["iface"] == "ether2"
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store._insert({"nama_pelanggan": "Siti"})
+            raise RuntimeError("gagal di tengah")
+    assert store.count() == 1
+    assert store.add({"nama_pelanggan": "Siti"})   # koneksi tetap bisa dipakai setelah rollback
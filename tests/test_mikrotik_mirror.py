@@ -0,0 +1,59 @@
+# test_mikrotik_mirror.py - LeaseMirror terhadap SimulatedRouter (sinkron, event, heartbeat)
+import time
+
+import pytest
+
+from mikrotik_client import CircuitBreaker, MikrotikClient, SessionPool
+from mikrotik_mirror import LeaseMirror
+from routeros_sim import SimulatedRouter, make_tables
+
+LEASES = "/ip/dhcp-server/lease"
+
+
+def wait_for(cond, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def router():
+    sim = SimulatedRouter(make_tables(30, seed=4))
+    sim.start_in_thread()
+    yield sim
+    sim.stop()
+
+
+def _mirror(router, **kw):
+    client = MikrotikClient("127.0.0.1", "admin", "", router.port, pool=SessionPool(),
+                            connect_timeout=1.0, read_timeout=0.5, breaker=CircuitBreaker(3, 0.1))
+    return LeaseMirror(client, reconnect_delay=0.1, **kw)
+
+
+def test_heartbeat_keeps_idle_mirror_synced(router):
+    mirror = _mirror(router, idle_check=0.2).start()
+    try:
+        assert wait_for(lambda: mirror.synced)
+        before = router.stats["commands"]
+        time.sleep(1.5)
+        assert mirror.synced
+        assert router.stats["commands"] > before   # heartbeat terkirim saat idle
+        assert len(mirror.snapshot()) == len(router.tables[LEASES])
+    finally:
+        mirror.stop()
+
+
+def test_silent_stall_marks_unsynced_and_resyncs(router):
+    mirror = _mirror(router, idle_check=0.2).start()
+    try:
+        assert wait_for(lambda: mirror.synced)
+        router.latency = 3.0          # router diam: heartbeat tidak dibalas dalam read_timeout
+        assert wait_for(lambda: not mirror.synced, 4.0)
+        assert "heartbeat" in (mirror.last_error or "")
+        router.latency = 0.0
+        assert wait_for(lambda: mirror.synced, 8.0)
+    finally:
+        mirror.stop()
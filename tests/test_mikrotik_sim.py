@@ -0,0 +1,101 @@
+# test_mikrotik_sim.py - MikrotikClient (routeros_api + streaming) terhadap routeros_sim.SimulatedRouter
+import threading
+
+import pytest
+
+pytest.importorskip("routeros_api")
+
+from mikrotik_client import MikrotikClient, SessionPool
+from routeros_proto import RouterOsTrap
+from routeros_sim import SimulatedRouter, make_tables
+
+LEASES = "/ip/dhcp-server/lease"
+
+
+@pytest.fixture
+def router():
+    sim = SimulatedRouter(make_tables(200, seed=7))
+    sim.start_in_thread()
+    yield sim
+    sim.stop()
+
+
+@pytest.fixture
+def client(router):
+    c = MikrotikClient("127.0.0.1", "admin", "", router.port, pool=SessionPool())
+    assert c.connect(), c.last_error
+    yield c
+    c.close()
+
+
+def _commented(router):
+    return {r["address"] for r in router.tables[LEASES] if r.get("comment")}
+
+
+def test_get_leases_with_comment_sync(client, router):
+    leases = client.get_leases_with_comment()
+    assert leases
+    assert {l["address"] for l in leases} == _commented(router)
+    assert all(l["parsed"].get("nama_pelanggan") for l in leases)
+
+
+def test_sync_and_stream_agree(client):
+    sync = sorted(l["address"] for l in client.get_leases_with_comment())
+    stream = sorted(l["address"] for l in client.iter_leases_with_comment())
+    assert sync == stream
+
+
+def test_lease_id_index_filled_from_sync_fetch(client):
+    leases = client.get_leases_with_comment()
+    lease = leases[0]
+    assert client.lookup_lease_id(address=lease["address"]) == lease["id"]
+    assert client.lookup_lease_id(mac=lease["mac-address"]) == lease["id"]
+
+
+def test_set_lease_comment_by_address_one_call_when_indexed(client, router):
+    target = next(r for r in router.tables[LEASES][10:] if r.get("comment"))
+    lease = client.get_lease(address=target["address"])
+    assert lease["comment"] == target["comment"]
+    before = router.stats["commands"]
+    assert client.set_lease_comment_by_address(target["address"], "nama:Baru; paket:10Mbps")
+    assert router.stats["commands"] - before == 1
+    assert target["comment"] == "nama:Baru; paket:10Mbps"
+
+
+def test_stream_trap_keeps_connection(client, router):
+    list(client.iter_queues())
+    conn = client._stream_conn
+    assert conn is not None
+    with pytest.raises(RouterOsTrap):
+        list(client._stream("/tidak/ada", "print"))
+    assert client._stream_conn is conn
+    assert len(list(client.iter_queues())) == len(router.tables["/queue/simple"])
+
+
+def test_abandoned_stream_does_not_block_next_call(client, router):
+    stalled = client.iter_queues()
+    next(stalled)   # konsumen berhenti di tengah, generator belum ditutup
+    done = []
+    t = threading.Thread(target=lambda: done.append(len(list(client.iter_queues()))), daemon=True)
+    t.start()
+    t.join(5)
+    assert done == [len(router.tables["/queue/simple"])]
+    stalled.close()
+
+
+def test_lease_stream_error_reaches_collector(client, router):
+    from mikrotik_collector import collect_parallel, load_pelanggan_dari_mikrotik_per_interface
+    del router.tables[LEASES]
+    with pytest.raises(RouterOsTrap):
+        list(client.iter_leases_with_comment())
+    rows, report = collect_parallel([client], load_pelanggan_dari_mikrotik_per_interface)
+    assert (rows, report[0]["status"]) == ([], "error")
+
+
+def test_interface_usage_error_logged_and_recorded(client, router, capsys):
+    assert client.get_interface_usage_gb("ether1") > 0
+    del router.tables["/interface"]
+    assert client.get_interface_usage_gb() == {}
+    assert client.get_interface_usage_gb("ether1") == 0.0
+    assert client.last_error
+    assert "[ERROR] Gagal ambil usage interface dari 127.0.0.1" in capsys.readouterr().out
@@ -0,0 +1,73 @@
+# test_mikrotik_usage.py - TargetIndex (longest-prefix) dan QueueUsageIndex
+from mikrotik_usage import QueueUsageIndex, TargetIndex, target_covers
+
+
+def _queue(target, up, down):
+    return {"target": target, "bytes": f"{up}/{down}"}
+
+
+def test_duplicate_target_first_wins_in_lookup_and_counters():
+    index = QueueUsageIndex([_queue("10.0.0.5/32", 1000, 1000), _queue("10.0.0.5/32", 5, 5)])
+    assert index.lookup("10.0.0.5") == ("10.0.0.5/32", 1000, 1000)
+    assert index.counters() == {"10.0.0.5/32": (1000, 1000)}
+    assert len(index) == 1
+
+
+def test_counters_agree_with_lookup_for_every_hit():
+    queues = [
+        _queue("10.0.0.5", 7, 7),
+        _queue("10.0.0.5/32", 9, 9),          # target beda teks, prefix sama: tertutup queue pertama
+        _queue("10.0.0.0/24", 100, 200),
+        _queue("10.0.1.1/32,10.0.0.5/32", 3, 4),
+    ]
+    index = QueueUsageIndex(queues)
+    counters = index.counters()
+    for ip in ("10.0.0.5", "10.0.0.9", "10.0.1.1"):
+        target, up, down = index.lookup(ip)
+        assert counters[target] == (up, down)
+    assert "10.0.0.5/32" not in counters
+
+
+def test_multi_target_queue():
+    index = TargetIndex()
+    assert index.add("10.0.0.1/32, 10.0.2.0/24,ether1", "q1") == 2
+    assert index.lookup("10.0.0.1") == "q1"
+    assert index.lookup("10.0.2.77") == "q1"
+    assert index.lookup("10.0.3.1") is None
+
+
+def test_overlapping_prefixes_longest_wins():
+    index = TargetIndex()
+    index.add("10.0.0.0/8", "lebar")
+    index.add("10.1.0.0/16", "sedang")
+    index.add("10.1.2.3/32", "host")
+    assert index.lookup("10.1.2.3") == "host"
+    assert index.lookup("10.1.9.9") == "sedang"
+    assert index.lookup("10.200.0.1") == "lebar"
+    assert index.lookup("11.0.0.1") is None
+
+
+def test_default_route_prefix_zero():
+    index = TargetIndex()
+    index.add("0.0.0.0/0", "semua")
+    index.add("192.168.1.10", "host")
+    assert index.lookup("8.8.8.8") == "semua"
+    assert index.lookup("192.168.1.10") == "host"
+    assert index.lookup("2001:db8::1") is None   # /0 IPv4 tidak meng-cover IPv6
+
+
+def test_ipv6_targets():
+    index = TargetIndex()
+    index.add("2001:db8::/32", "net")
+    index.add("2001:db8::5/128", "host")
+    assert index.lookup("2001:db8::5") == "host"
+    assert index.lookup("2001:db8:ffff::1") == "net"
+    assert index.lookup("2001:db9::1") is None
+    assert target_covers("2001:db8::1", "2001:db8::/64")
+
+
+def test_invalid_targets_ignored():
+    index = TargetIndex()
+    assert index.add("ether1,pppoe-out1,999.1.1.1,10.0.0.1/40", "x") == 0
+    assert index.lookup("not-an-ip") is None
+    assert index.lookup("") is None
@@ -0,0 +1,100 @@
+# test_provision.py - changeset queue simple (mikrotik_provision) termasuk apply ke SimulatedRouter
+import pytest
+
+from mikrotik_provision import MANAGED_TAG, apply_queue_changes, plan_queue_changes, plan_router, provision_router
+
+QUEUES = "/queue/simple"
+LEASES = "/ip/dhcp-server/lease"
+
+
+def _want(ip, name="Budi", limit="10M/10M"):
+    return {f"{ip}/32": {"name": name, "target": f"{ip}/32", "max-limit": limit}}
+
+
+def test_plan_reads_routeros_api_id_key():
+    # routeros_api mengembalikan .id sebagai 'id'
+    existing = [
+        {"id": "*1", "name": "Budi", "target": "10.0.0.2/32", "max-limit": "5M/5M", "comment": MANAGED_TAG},
+        {"id": "*2", "name": "Lama", "target": "10.0.0.9/32", "max-limit": "5M/5M", "comment": MANAGED_TAG},
+    ]
+    plan = plan_queue_changes(existing, _want("10.0.0.2"))
+    assert plan["set"][0][".id"] == "*1"
+    assert [q["id"] for q in plan["remove"]] == ["*2"]
+    assert not plan["removes_all_managed"]
+
+
+def test_adoption_keeps_operator_comment():
+    existing = [{".id": "*5", "name": "q-lama", "target": "10.0.0.2/32", "max-limit": "5M/5M",
+                 "comment": "jangan dihapus - pak RT"}]
+    plan = plan_queue_changes(existing, _want("10.0.0.2"))
+    assert plan["set"] == [{"name": "Budi", "max-limit": "10M/10M", ".id": "*5", "_target": "10.0.0.2/32"}]
+    # pelanggannya hilang: queue adopsi bukan milik aplikasi, tidak dihapus
+    assert plan_queue_changes(existing, {})["remove"] == []
+
+
+def test_remove_all_managed_needs_confirmation():
+    existing = [{".id": "*1", "name": "Budi", "target": "10.0.0.2/32", "comment": MANAGED_TAG}]
+    plan = plan_queue_changes(existing, {})
+    assert plan["removes_all_managed"]
+
+    class Client:
+        host = "r1"
+        calls = []
+
+        def _call_pipelined(self, path, command, args, batch_size=50):
+            self.calls.append((command, args))
+            return [None] * len(args)
+
+    client = Client()
+    with pytest.raises(ValueError):
+        apply_queue_changes(client, plan)
+    assert client.calls == []
+    assert apply_queue_changes(client, plan, allow_remove_all=True) == []
+    assert client.calls == [("remove", [{".id": "*1"}])]
+
+
+@pytest.fixture
+def router():
+    pytest.importorskip("routeros_api")
+    from routeros_sim import SimulatedRouter, make_tables
+    sim = SimulatedRouter(make_tables(40, queue_ratio=0.5, seed=3))
+    sim.start_in_thread()
+    yield sim
+    sim.stop()
+
+
+@pytest.fixture
+def client(router):
+    from mikrotik_client import MikrotikClient, SessionPool
+    c = MikrotikClient("127.0.0.1", "admin", "", router.port, pool=SessionPool())
+    yield c
+    c.close()
+
+
+def test_provision_against_simulator(client, router):
+    for q in router.tables[QUEUES][:3]:
+        q["comment"] = "catatan operator"
+    operator_comments = {q[".id"]: q.get("comment") for q in router.tables[QUEUES]}
+    result = provision_router(client, apply=True)
+    assert result["failed"] == []
+    assert result["plan"]["add"] and result["plan"]["set"]
+
+    router.tables[QUEUES].append({".id": "*F000", "name": "mantan", "target": "10.9.9.9/32",
+                                  "max-limit": "1M/1M", "comment": MANAGED_TAG})
+    result = provision_router(client, apply=True)
+    assert [q["name"] for q in result["plan"]["remove"]] == ["mantan"]
+    assert not any(q["target"] == "10.9.9.9/32" for q in router.tables[QUEUES])
+    for q in router.tables[QUEUES]:
+        if q[".id"] in operator_comments:
+            assert q.get("comment") == operator_comments[q[".id"]]
+
+    again = provision_router(client, apply=False)["plan"]
+    assert not (again["add"] or again["set"] or again["remove"])
+
+
+def test_plan_router_aborts_when_lease_fetch_fails(client, router):
+    router.tables[QUEUES].append({".id": "*F000", "name": "x", "target": "10.9.9.9/32", "comment": MANAGED_TAG})
+    del router.tables[LEASES]
+    assert client.connect()
+    with pytest.raises(ConnectionError):
+        plan_router(client)
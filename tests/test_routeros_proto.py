@@ -0,0 +1,168 @@
+# test_routeros_proto.py - decoder sentence API RouterOS (SentenceDecoder / LazyAttrs)
+import pytest
+
+from routeros_proto import (LazyAttrs, RouterOsProtocolError, SentenceDecoder, decode_length,
+                            encode_length, encode_sentence, parse_sentence, pop_sentence)
+
+
+SENTENCES = [
+    ["!re", "=.id=*1", "=address=10.0.0.1", "=comment=nama:Budi; paket:10Mbps", ".tag=3"],
+    ["!re", "=.id=*2", "=address=10.0.0.2", "=comment=", ".tag=3"],
+    ["!re", "=.id=*3", "=comment=nama:Śiti Ñur ✓; alamat:Jl. Mawar", "=host-name=ラップトップ"],
+    ["!trap", "=category=0", "=message=no such item", ".tag=4"],
+    ["!done", ".tag=3"],
+    ["!fatal", "not logged in"],
+]
+
+
+def reference(stream):
+    """Hasil decoder lama: pop_sentence + parse_sentence"""
+    buf, out = bytearray(stream), []
+    while True:
+        words = pop_sentence(buf)
+        if words is None:
+            return out
+        if words:
+            out.append(parse_sentence(words))
+
+
+def drain(decoder):
+    return [(reply, dict(attrs), tag) for reply, attrs, tag in decoder]
+
+
+def feed_in_chunks(stream, size):
+    dec, out = SentenceDecoder(), []
+    for i in range(0, len(stream), size):
+        dec.feed(stream[i:i + size])
+        out += drain(dec)
+    assert dec.pending() == 0
+    return out
+
+
+# ---- encode/decode panjang ----
+@pytest.mark.parametrize("n, width", [
+    (0, 1), (0x7F, 1), (0x80, 2), (0x3FFF, 2), (0x4000, 3), (0x1FFFFF, 3),
+    (0x200000, 4), (0xFFFFFFF, 4), (0x10000000, 5), (0xFFFFFFFF, 5),
+])
+def test_length_prefix_widths(n, width):
+    prefix = encode_length(n)
+    assert len(prefix) == width
+    assert decode_length(prefix + b"x", 0) == (n, width)
+    for cut in range(width):
+        assert decode_length(prefix[:cut], 0) is None
+
+
+def test_unknown_control_byte():
+    with pytest.raises(RouterOsProtocolError):
+        decode_length(b"\xF8\x00", 0)
+
+
+# ---- SentenceDecoder vs pop_sentence/parse_sentence ----
+def test_matches_reference_whole_stream():
+    stream = b"".join(encode_sentence(s) for s in SENTENCES)
+    dec = SentenceDecoder()
+    dec.feed(stream)
+    assert drain(dec) == reference(stream)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_split_across_feed_chunks(size):
+    stream = b"".join(encode_sentence(s) for s in SENTENCES)
+    assert feed_in_chunks(stream, size) == reference(stream)
+
+
+@pytest.mark.parametrize("n", [0x7F, 0x80, 0x3FFF, 0x4000, 0x200000])
+def test_long_word_split_inside_length_prefix(n):
+    sentence = ["!re", "=comment=" + "a" * (n - len("=comment=")), ".tag=9"]
+    stream = encode_sentence(sentence) + encode_sentence(["!done", ".tag=9"])
+    expected = reference(stream)
+    start = len(encode_sentence(["!re"])) - 1      # offset prefix word '=comment=...'
+    width = len(encode_length(n))
+    for cut in range(start, start + width + 1):   # potong sebelum, di tengah, dan sesudah prefix
+        dec = SentenceDecoder()
+        dec.feed(stream[:cut])
+        assert drain(dec) == []
+        dec.feed(stream[cut:])
+        assert drain(dec) == expected
+    assert expected[0][1]["comment"] == "a" * (n - len("=comment="))
+
+
+def test_non_ascii_values_and_keys():
+    stream = encode_sentence(["!re", "=comment=nama:Śiti ✓", "=ключ=значение", "=plain=ascii"])
+    dec = SentenceDecoder()
+    dec.feed(stream)
+    (reply, attrs, tag), = list(dec)
+    assert reply == "!re" and tag is None
+    assert dict(attrs) == {"comment": "nama:Śiti ✓", "ключ": "значение", "plain": "ascii"}
+    assert [(reply, dict(attrs), tag)] == reference(stream)
+
+
+def test_trap_and_fatal():
+    stream = encode_sentence(["!trap", "=message=no such item", ".tag=4"]) + encode_sentence(["!fatal", "session terminated"])
+    dec = SentenceDecoder()
+    dec.feed(stream)
+    (trap, trap_attrs, trap_tag), (fatal, fatal_attrs, fatal_tag) = list(dec)
+    assert (trap, trap_attrs["message"], trap_tag) == ("!trap", "no such item", "4")
+    assert (fatal, dict(fatal_attrs), fatal_tag) == ("!fatal", {"message": "session terminated"}, None)
+
+
+def test_empty_sentence_is_skipped():
+    stream = b"\x00" + encode_sentence(["!done"])
+    dec = SentenceDecoder()
+    dec.feed(stream)
+    assert dec.next_sentence() == (None, {}, None)
+    assert drain(dec) == [("!done", {}, None)]
+
+
+def test_value_containing_equals_sign():
+    stream = encode_sentence(["!re", "=comment=a=b; c=d", "=flag"])
+    dec = SentenceDecoder()
+    dec.feed(stream)
+    assert drain(dec) == reference(stream) == [("!re", {"comment": "a=b; c=d", "flag": ""}, None)]
+
+
+# ---- pemadatan buffer ----
+def test_buffer_compacted_after_consumed():
+    dec = SentenceDecoder()
+    dec.COMPACT_AT = 64
+    row = encode_sentence(["!re", "=comment=" + "x" * 40])
+    out = []
+    for _ in range(10):
+        dec.feed(row + row[:5])          # satu sentence utuh + potongan sentence berikutnya
+        out += drain(dec)
+        dec.feed(row[5:])
+        out += drain(dec)
+        assert len(dec._buf) <= dec.COMPACT_AT + 2 * len(row)
+    assert len(out) == 20
+    assert all(attrs == {"comment": "x" * 40} for _, attrs, _ in out)
+    dec.feed(b"")
+    assert dec._pos == 0 and dec.pending() == 0 and len(dec._buf) == 0
+
+
+def test_compaction_keeps_partial_sentence():
+    dec = SentenceDecoder()
+    dec.COMPACT_AT = 1
+    first, second = encode_sentence(["!re", "=a=1"]), encode_sentence(["!re", "=b=2"])
+    dec.feed(first + second[:3])
+    assert drain(dec) == [("!re", {"a": "1"}, None)]
+    dec.feed(second[3:])                 # feed memadatkan buffer sebelum menambah byte
+    assert drain(dec) == [("!re", {"b": "2"}, None)]
+    assert dec.pending() == 0
+
+
+# ---- LazyAttrs ----
+def test_lazy_attrs_decoded_on_first_access_and_mutable():
+    dec = SentenceDecoder()
+    dec.feed(encode_sentence(["!re", "=.id=*1", "=comment=lama"]) + encode_sentence(["!re", "=.id=*2", "=comment=x"]))
+    (_, a, _), (_, b, _) = list(dec)
+    assert isinstance(a, LazyAttrs) and a._data is None
+    assert a["comment"] == "lama" and a._raw is None
+    a["comment"] = "baru"
+    del a[".id"]
+    a["extra"] = "1"
+    assert a.copy() == {"comment": "baru", "extra": "1"}
+    assert "comment" in a and ".id" not in a and len(a) == 2
+    assert a.get("missing", "-") == "-"
+    key_a = next(k for k in a if k == "comment")
+    key_b = next(k for k in b if k == "comment")
+    assert key_a is key_b                # key di-intern, dipakai bersama antar baris
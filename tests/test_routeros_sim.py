@@ -0,0 +1,66 @@
+# test_routeros_sim.py - simulator RouterOS sendiri + benchmark singkat di atasnya
+import pytest
+
+from routeros_proto import RouterOsConnection
+from routeros_sim import SimulatedRouter, make_tables
+
+
+def _login(sim):
+    conn = RouterOsConnection("127.0.0.1", sim.port, 2.0).connect()
+    return conn.login("admin", "")
+
+
+def test_print_query_and_proplist():
+    sim = SimulatedRouter(make_tables(50, seed=2))
+    sim.start_in_thread()
+    try:
+        conn = _login(sim)
+        rows = conn.talk("/ip/dhcp-server/lease/print", {".proplist": ".id,address,comment"}, ["?comment"])
+        conn.close()
+    finally:
+        sim.stop()
+    expected = [r for r in sim.tables["/ip/dhcp-server/lease"] if "comment" in r]
+    assert [r[".id"] for r in rows] == [r[".id"] for r in expected]
+    assert all(set(dict(r)) == {".id", "address", "comment"} for r in rows)
+
+
+def test_make_tables_addresses_unique():
+    leases = make_tables(600)["/ip/dhcp-server/lease"]
+    addresses = [r["address"] for r in leases]
+    assert len(set(addresses)) == len(addresses)
+
+
+def test_stop_closes_server_and_clients():
+    sim = SimulatedRouter(make_tables(5))
+    sim.start_in_thread()
+    conn = _login(sim)
+    sim.stop()
+    assert not sim._thread.is_alive()
+    assert sim.loop.is_closed()
+    with pytest.raises(OSError):
+        conn.talk("/system/identity/print")   # koneksi sudah diputus simulator
+    conn.close()
+    with pytest.raises(OSError):
+        _login(sim)   # listener sudah ditutup
+
+
+def test_bench_sync_refresh_and_writeback(capsys):
+    pytest.importorskip("routeros_api")
+    import bench_mikrotik
+    from mikrotik_collector import collect_parallel, load_pelanggan_dari_mikrotik_per_interface
+
+    routers = bench_mikrotik.start_routers(2, 300, 0.0, 0.0, 0.0)
+    clients = bench_mikrotik.sim_clients(routers)
+    try:
+        hasil = bench_mikrotik.bench_sync(clients, rounds=1)
+        rows, report = collect_parallel(clients, load_pelanggan_dari_mikrotik_per_interface)
+    finally:
+        for c in clients:
+            c.close()
+        for r in routers:
+            r.stop()
+    assert set(hasil) == {"refresh", "writeback"}
+    assert [e["status"] for e in report] == ["ok", "ok"]
+    commented = sum(1 for r in routers for l in r.tables["/ip/dhcp-server/lease"] if l.get("comment"))
+    assert len(rows) == commented
+    assert ", 0 gagal" in capsys.readouterr().out
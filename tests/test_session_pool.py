@@ -0,0 +1,81 @@
+# test_session_pool.py - batas sesi SessionPool & circuit breaker di jalur _call
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("routeros_api")
+
+from mikrotik_client import CircuitBreaker, MikrotikClient, SessionPool, SessionPoolExhausted
+from routeros_sim import SimulatedRouter, make_tables
+
+
+@pytest.fixture
+def routers():
+    sims = [SimulatedRouter(make_tables(5, seed=n)) for n in (1, 2)]
+    for sim in sims:
+        sim.start_in_thread()
+    yield sims
+    for sim in sims:
+        sim.stop()
+
+
+def test_max_sessions_is_a_hard_cap(routers):
+    pool = SessionPool(max_sessions=1)
+    a, b = (MikrotikClient("127.0.0.1", "admin", "", r.port, pool=pool, connect_timeout=0.2) for r in routers)
+    session = pool.acquire(a)
+    busy, release = threading.Event(), threading.Event()
+
+    def use_a():   # sesi a sedang dipakai thread lain
+        with session.lock:
+            busy.set()
+            release.wait(5)
+
+    t = threading.Thread(target=use_a, daemon=True)
+    t.start()
+    busy.wait(5)
+    with pytest.raises(SessionPoolExhausted):
+        pool.acquire(b)
+    assert not b.connect()
+    assert b.breaker.failures == 0   # pool penuh bukan kegagalan router
+    release.set()
+    t.join(5)
+    assert pool.acquire(b) is not session   # sesi a idle -> ditutup untuk memberi tempat
+    assert len(pool._sessions) == 1
+    pool.close_all()
+
+
+def test_call_connect_failure_opens_breaker():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]   # port tertutup setelah with
+    client = MikrotikClient("127.0.0.1", "admin", "", port, pool=SessionPool(), connect_timeout=0.5)
+    for _ in range(client.breaker.failure_threshold):
+        with pytest.raises(Exception):
+            client.get_queues()
+    assert client.breaker.state == client.breaker.OPEN
+
+
+def test_stream_probe_closes_breaker(routers):
+    sim = routers[0]
+    client = MikrotikClient("127.0.0.1", "admin", "", sim.port, pool=SessionPool(),
+                            breaker=CircuitBreaker(1, 0.1))
+    client.breaker.record_failure()
+    assert client.breaker.state == client.breaker.OPEN
+    time.sleep(0.15)
+    assert len(list(client.iter_queues())) == len(sim.tables["/queue/simple"])
+    assert client.breaker.state == client.breaker.CLOSED
+    assert client.connect(), client.last_error
+    client.close()
+
+
+def test_stream_connect_failure_opens_breaker():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    client = MikrotikClient("127.0.0.1", "admin", "", port, pool=SessionPool(), connect_timeout=0.5,
+                            breaker=CircuitBreaker(1, 30))
+    with pytest.raises(OSError):
+        list(client.iter_queues())
+    assert client.breaker.state == client.breaker.OPEN
@@ -0,0 +1,131 @@
+# test_usage_engine.py - hitungan usage per siklus tagihan (dasar angka di invoice)
+from datetime import datetime
+
+import pytest
+
+from usage_engine import HISTORY_CYCLES, MAX_SAMPLE_DELTA, UsageEngine, counter_delta, cycle_start, due_day
+
+
+def ts(*args):
+    return datetime(*args).timestamp()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return UsageEngine(str(tmp_path / "usage_state.json"))
+
+
+# ---- counter_delta ----
+def test_counter_delta_increase():
+    assert counter_delta(100, 250) == 150
+    assert counter_delta(7, 7) == 0
+
+
+def test_counter_delta_reset_counts_from_zero():
+    # reboot / queue dibuat ulang: counter kecil lagi, nilai sekarang = trafik sejak reset
+    assert counter_delta(5_000_000, 1_200) == 1_200
+    assert counter_delta(10**12, 0) == 0
+
+
+def test_counter_delta_32bit_wrap():
+    assert counter_delta(2**32 - 100, 50) == 150
+
+
+def test_counter_delta_64bit_wrap():
+    assert counter_delta(2**64 - 10, 5) == 15
+
+
+def test_counter_delta_implausible_wrap_is_reset():
+    # dari separuh atas 64 bit tapi selisih wrap > MAX_SAMPLE_DELTA -> reset
+    last = 2**63
+    assert 2**64 - last > MAX_SAMPLE_DELTA
+    assert counter_delta(last, 42) == 42
+
+
+# ---- siklus ----
+def test_due_day_formats():
+    assert due_day("05/01/2026") == 5
+    assert due_day("2026-01-17") == 17
+    assert due_day("9") == 9
+    assert due_day("-", default=3) == 3
+    assert due_day("45/01/2026", default=1) == 1
+
+
+def test_cycle_start_clamps_short_months():
+    assert cycle_start(ts(2026, 2, 28, 12), 31) == datetime(2026, 2, 28)
+    assert cycle_start(ts(2026, 2, 27, 12), 31) == datetime(2026, 1, 31)
+    assert cycle_start(ts(2026, 1, 4), 5) == datetime(2025, 12, 5)
+
+
+# ---- record ----
+def test_first_sample_is_baseline_then_deltas_add(engine):
+    assert engine.record("r1", "10.0.0.2/32", 1000, 5000, ts(2026, 1, 10)) == 0
+    assert engine.record("r1", "10.0.0.2/32", 1500, 7000, ts(2026, 1, 11)) == 2500
+    assert engine.record("r1", "10.0.0.2/32", 1600, 7000, ts(2026, 1, 12)) == 2600
+
+
+def test_reset_between_samples_adds_new_counter(engine):
+    engine.record("r1", "q", 10_000, 10_000, ts(2026, 1, 10))
+    assert engine.record("r1", "q", 300, 200, ts(2026, 1, 11)) == 500
+
+
+def test_late_sample_is_ignored(engine):
+    engine.record("r1", "q", 0, 0, ts(2026, 1, 10))
+    engine.record("r1", "q", 100, 100, ts(2026, 1, 12))
+    assert engine.record("r1", "q", 50, 50, ts(2026, 1, 11)) == 200   # tidak mengubah apa pun
+    assert engine.record("r1", "q", 150, 150, ts(2026, 1, 13)) == 300
+    assert engine.record("r1", "q", 0, 0, ts(2025, 12, 20)) == 0       # terlambat, siklus lain
+
+
+def test_cycle_rollover_splits_delta_proportionally(engine):
+    engine.record("r1", "q", 0, 0, ts(2026, 1, 30, 12))
+    assert engine.record("r1", "q", 100, 100, ts(2026, 1, 31, 12)) == 200
+    # 1000 bytes antara 31 Jan 12:00 dan 1 Feb 12:00, batas siklus tepat di tengah
+    assert engine.record("r1", "q", 600, 600, ts(2026, 2, 1, 12)) == 500
+    st = engine._state[engine.key("r1", "q")]
+    assert st["cycle"] == "2026-02-01"
+    assert st["hist"] == {"2026-01-01": 700}
+    assert engine.cycle_usage("r1", "q", ts(2026, 2, 10)) == 500
+    assert engine.cycle_usage("r1", "q", ts(2026, 3, 2)) == 0   # siklus sudah lewat
+
+
+def test_history_keeps_last_cycles(engine):
+    for month in range(1, HISTORY_CYCLES + 4):
+        engine.record("r1", "q", month * 10, 0, ts(2026, month, 15))
+    hist = engine._state[engine.key("r1", "q")]["hist"]
+    assert len(hist) == HISTORY_CYCLES
+    assert max(hist) == f"2026-{HISTORY_CYCLES + 2:02d}-01"
+
+
+def test_cycle_day_relabel_is_not_a_rollover(engine):
+    # sampler (tanpa jatuh tempo) dulu, lalu refresh tahu siklus mulai tanggal 15
+    engine.record("r1", "q", 0, 0, ts(2026, 1, 20))
+    assert engine.record("r1", "q", 100, 0, ts(2026, 1, 20, 12)) == 100
+    assert engine.record("r1", "q", 300, 0, ts(2026, 1, 21), cycle_day=15) == 300
+    st = engine._state[engine.key("r1", "q")]
+    assert st["day"] == 15
+    assert st["cycle"] == "2026-01-15"
+    assert st["hist"] == {}
+    # sample berikut tanpa cycle_day memakai tanggal yang sudah tersimpan
+    assert engine.record("r1", "q", 400, 0, ts(2026, 2, 14)) == 400
+    assert engine.record("r1", "q", 500, 0, ts(2026, 2, 16)) > 0
+    assert engine._state[engine.key("r1", "q")]["cycle"] == "2026-02-15"
+
+
+def test_state_persists_across_instances(tmp_path):
+    path = str(tmp_path / "usage_state.json")
+    first = UsageEngine(path)
+    first.record("r1", "q", 0, 0, ts(2026, 1, 10))
+    first.record("r1", "q", 10, 20, ts(2026, 1, 11))
+    first.save()
+    second = UsageEngine(path)
+    assert second.record("r1", "q", 20, 40, ts(2026, 1, 12)) == 60
+
+
+def test_meter_records_shared_queue_once(engine):
+    meter = engine.meter("r1", ts(2026, 1, 10))
+    assert meter.cycle_bytes("10.0.0.0/24", 5, 5) == 0
+    engine.record("r1", "10.0.0.0/24", 5, 5, ts(2026, 1, 9))   # sample lama, diabaikan
+    meter = engine.meter("r1", ts(2026, 1, 11))
+    assert meter.cycle_bytes("10.0.0.0/24", 10, 10) == 10
+    assert meter.cycle_bytes("10.0.0.0/24", 99, 99) == 10   # lease kedua di subnet yang sama
@@ -0,0 +1,99 @@
+# test_writeback.py - write-back "Usage:" ke comment lease (mikrotik_writeback) terhadap routeros_sim
+import pytest
+
+from mikrotik_writeback import build_usage_comment
+
+LEASES = "/ip/dhcp-server/lease"
+
+
+# ---- build_usage_comment ----
+def test_build_usage_comment_appends_usage():
+    assert build_usage_comment("nama:Budi; paket:10Mbps", 1.5, {"ether2": 1.5}) == \
+        "nama:Budi; paket:10Mbps; Usage: Total: 1.50 GB; ether2: 1.50 GB"
+
+
+def test_build_usage_comment_replaces_old_usage_block():
+    old = "nama:Budi; Usage: Total: 1.00 GB; ether2: 0.50 GB; ether3: 500.00 MB; no_hp:0812"
+    new = build_usage_comment(old, 2.0, {"ether2": 2.0})
+    assert new == "nama:Budi; no_hp:0812; Usage: Total: 2.00 GB; ether2: 2.00 GB"
+    assert build_usage_comment(new, 2.0, {"ether2": 2.0}) == new   # idempoten
+
+
+def test_build_usage_comment_empty_comment():
+    assert build_usage_comment(None, 0, {"ether2": 0}) == "Usage: Total: 0.00 MB; ether2: 0.00 MB"
+
+
+# ---- terhadap simulator ----
+@pytest.fixture
+def router():
+    pytest.importorskip("routeros_api")
+    from routeros_sim import SimulatedRouter, make_tables
+    sim = SimulatedRouter(make_tables(60, seed=3))
+    sim.start_in_thread()
+    yield sim
+    sim.stop()
+
+
+@pytest.fixture
+def client(router):
+    from mikrotik_client import MikrotikClient, SessionPool
+    c = MikrotikClient("127.0.0.1", "admin", "", router.port, pool=SessionPool())
+    yield c
+    c.close()
+
+
+def _commented(router):
+    return [r for r in router.tables[LEASES] if r.get("comment")]
+
+
+def test_writeback_writes_then_skips_current_comments(client, router):
+    from mikrotik_writeback import update_usage_comment_all
+    commented = _commented(router)
+    report = update_usage_comment_all([client])
+    assert [r["status"] for r in report["routers"]] == ["ok"]
+    assert len(report["written"]) == len(commented) and not report["skipped"] and not report["failed"]
+    assert all("Usage: Total:" in r["comment"] for r in commented)
+    before = router.stats["commands"]
+
+    report = update_usage_comment_all([client])
+    assert len(report["skipped"]) == len(commented) and not report["written"]
+    sets = router.stats["commands"] - before
+    assert sets < 10          # hanya login + print, tidak ada /set untuk comment yang sudah sama
+
+
+def test_writeback_reports_failed_lease(client, router):
+    from mikrotik_writeback import update_usage_comment_all
+    victim = _commented(router)[0]
+    stream = client.iter_leases_with_comment
+
+    def iter_then_remove():
+        for lease in stream():
+            yield lease
+        router.tables[LEASES].remove(victim)   # lease hilang antara print dan set
+
+    client.iter_leases_with_comment = iter_then_remove
+    report = update_usage_comment_all([client])
+    assert [f["address"] for f in report["failed"]] == [victim["address"]]
+    assert "no such item" in report["failed"][0]["error"]
+    assert len(report["written"]) == len(_commented(router))
+    assert report["routers"][0]["status"] == "ok"
+
+
+def test_truncated_stream_keeps_partial_writes(client, router):
+    from mikrotik_writeback import update_usage_comment_all
+    commented = _commented(router)
+    stream = client.iter_leases_with_comment
+
+    def truncated():
+        for i, lease in enumerate(stream()):
+            if i == 5:
+                raise ConnectionError("koneksi terputus")
+            yield lease
+
+    client.iter_leases_with_comment = truncated
+    report = update_usage_comment_all([client])
+    assert report["routers"][0]["status"] == "error"
+    assert "koneksi terputus" in report["routers"][0]["error"]
+    assert [w["id"] for w in report["written"]] == [r[".id"] for r in commented[:5]]
+    assert all("Usage:" in r["comment"] for r in commented[:5])
+    assert not any("Usage:" in r["comment"] for r in commented[5:])
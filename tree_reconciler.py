@@ -0,0 +1,103 @@
+# tree_reconciler.py - update ttk.Treeview per baris yang berubah saja (bukan hapus semua lalu isi ulang)
+#
+# Tiap baris punya key stabil (iid Treeview): "router:mac/.id" untuk lease,
+# "manual:<id>" untuk pelanggan manual. Saat refresh, hanya baris yang baru,
+# berubah, hilang atau pindah posisi yang menyentuh Tk, jadi pilihan (selection)
+# dan posisi scroll tetap dan tabel tidak berkedip.
+from bisect import bisect_left
+
+
+def row_key(row):
+    """Key baris; baris lama tanpa key (mis. snapshot versi awal) pakai nama+IP"""
+    return row.get('key') or f"{row.get('nama_pelanggan')}|{row.get('ip')}"
+
+
+def _stable_items(order, current):
+    """iid di `order` yang posisinya di `current` membentuk subsequence naik terpanjang"""
+    position = {iid: i for i, iid in enumerate(current)}
+    seq = [iid for iid in order if iid in position]
+    tails, tail_idx, prev = [], [], [None] * len(seq)
+    for i, iid in enumerate(seq):
+        p = position[iid]
+        k = bisect_left(tails, p)
+        if k == len(tails):
+            tails.append(p)
+            tail_idx.append(i)
+        else:
+            tails[k] = p
+            tail_idx[k] = i
+        prev[i] = tail_idx[k - 1] if k else None
+    stable = set()
+    i = tail_idx[-1] if tail_idx else None
+    while i is not None:
+        stable.add(seq[i])
+        i = prev[i]
+    return stable
+
+
+class TreeReconciler:
+    def __init__(self, tree, key=row_key):
+        self.tree = tree
+        self.key = key
+        self._order = []        # iid sesuai urutan di tree
+        self._state = {}        # iid -> (values, tags) yang sedang tampil
+
+    def __len__(self):
+        return len(self._order)
+
+    def clear(self):
+        if self._order:
+            self.tree.delete(*self._order)
+        self._order = []
+        self._state = {}
+
+    def apply(self, rows, values, tags=None):
+        """
+        rows: list dict, values(row) -> tuple kolom, tags(row) -> tuple tag.
+        Return (changed, removed): set iid yang nilainya berubah / dihapus.
+        """
+        tree = self.tree
+        wanted = {}
+        order = []
+        for row in rows:
+            iid = str(self.key(row))
+            if iid in wanted:                       # key dobel: beri akhiran supaya tetap unik
+                n = 2
+                while f"{iid}#{n}" in wanted:
+                    n += 1
+                iid = f"{iid}#{n}"
+            wanted[iid] = (tuple(values(row)), tuple(tags(row)) if tags else ())
+            order.append(iid)
+
+        removed = {iid for iid in self._order if iid not in wanted}
+        if removed:
+            tree.delete(*removed)
+        current = [iid for iid in self._order if iid not in removed]
+
+        # baris lama yang urutannya sudah benar (subsequence naik terpanjang)
+        # tidak disentuh; sisanya dipindah/disisipkan tepat setelah baris
+        # sebelumnya di urutan baru
+        stable = _stable_items(order, current)
+        changed = set()
+        for pos, iid in enumerate(order):
+            if iid in stable:
+                continue
+            if iid in self._state:
+                current.remove(iid)
+            at = current.index(order[pos - 1]) + 1 if pos else 0
+            if iid in self._state:
+                tree.move(iid, '', at)
+            else:
+                vals, tg = wanted[iid]
+                tree.insert('', at, iid=iid, values=vals, tags=tg)
+            current.insert(at, iid)
+        for iid in order:
+            old = self._state.get(iid)
+            if old is not None and old != wanted[iid]:
+                vals, tg = wanted[iid]
+                tree.item(iid, values=vals, tags=tg)
+                changed.add(iid)
+
+        self._order = order
+        self._state = wanted
+        return changed, removed
@@ -0,0 +1,217 @@
+# usage_engine.py - usage per siklus tagihan dari sample counter bytes queue simple
+#
+# Counter `bytes` queue simple di RouterOS kembali ke 0 kalau router reboot
+# atau queue dibuat ulang, dan tidak ada hubungannya dengan bulan tagihan.
+# Engine ini menyimpan sample terakhir per (router, target queue), menghitung
+# selisih antar sample (reset & wrap dideteksi) lalu menjumlahkannya ke
+# siklus tagihan yang sedang berjalan. Hitungan per sample O(1), jadi murah
+# untuk semua pelanggan sekaligus.
+import calendar
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_STATE_FILE = "usage_state.json"
+DEFAULT_CYCLE_DAY = 1
+# selisih maksimum yang masih masuk akal antar dua sample (lebih dari ini
+# setelah counter turun -> dianggap reset, bukan wrap)
+MAX_SAMPLE_DELTA = 2**40
+COUNTER_BITS = (32, 64)
+HISTORY_CYCLES = 3
+STATE_VERSION = 1
+
+
+# ===== Siklus tagihan =====
+def due_day(jatuh_tempo, default=DEFAULT_CYCLE_DAY):
+    """'05/01/2026', '2026-01-05' atau '5' -> 5. Tidak terbaca -> default"""
+    s = str(jatuh_tempo or '').strip()
+    m = re.match(r'^(\d{4})-(\d{1,2})-(\d{1,2})', s)
+    if m:
+        day = int(m.group(3))
+    else:
+        m = re.match(r'^(\d{1,2})(?:\D|$)', s)
+        if not m:
+            return default
+        day = int(m.group(1))
+    return day if 1 <= day <= 31 else default
+
+def _clamped(year, month, day):
+    return datetime(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+def cycle_start(ts, day=DEFAULT_CYCLE_DAY):
+    """Awal siklus tagihan (datetime lokal) yang memuat timestamp ts"""
+    now = datetime.fromtimestamp(ts)
+    start = _clamped(now.year, now.month, day)
+    if now < start:
+        year, month = (now.year, now.month - 1) if now.month > 1 else (now.year - 1, 12)
+        start = _clamped(year, month, day)
+    return start
+
+def counter_delta(last, current):
+    """
+    Selisih counter yang aman terhadap reset dan wrap.
+    Counter naik -> selisih biasa. Counter turun dari separuh atas rentang
+    32/64 bit dengan selisih wrap yang masih masuk akal -> wrap, selain itu
+    reset (counter mulai dari 0 lagi, jadi nilai sekarang = trafik sejak reset).
+    """
+    if current >= last:
+        return current - last
+    for bits in COUNTER_BITS:
+        limit = 2**bits
+        if limit // 2 <= last < limit and limit - last + current <= MAX_SAMPLE_DELTA:
+            return limit - last + current
+    return current
+
+
+# ===== Engine =====
+class UsageEngine:
+    """
+    State per key "router|target":
+      c     counter terakhir [upload, download]
+      t     timestamp sample terakhir
+      day   tanggal awal siklus (dari jatuh tempo pelanggan, kalau sudah diketahui)
+      cycle awal siklus berjalan (YYYY-MM-DD)
+      used  bytes terpakai di siklus berjalan (sejak sample pertama)
+      hist  {cycle: bytes} beberapa siklus sebelumnya
+    """
+    def __init__(self, path=DEFAULT_STATE_FILE, cycle_day=DEFAULT_CYCLE_DAY):
+        self.path = path
+        self.cycle_day = cycle_day
+        self._state = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def key(router, target):
+        return f"{router}|{target}"
+
+    def __len__(self):
+        return len(self._state)
+
+    # ---- persistensi ----
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._lock:
+                self._state = data.get("counters", {})
+        except Exception as e:
+            print(f"[WARN] Gagal load {self.path}: {e}")
+
+    def save(self):
+        """Tulis atomik (file sementara lalu os.replace), hanya kalau ada perubahan"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({"version": STATE_VERSION, "saved": time.time(), "counters": self._state},
+                                  separators=(",", ":"))
+            self._dirty = False
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except Exception as e:
+            self._dirty = True
+            print(f"[ERROR] Gagal simpan {self.path}: {e}")
+
+    # ---- sample ----
+    def record(self, router, target, upload, download, ts=None, cycle_day=None):
+        """
+        Catat satu sample counter dan return bytes terpakai di siklus berjalan.
+        Sample pertama untuk sebuah key hanya menjadi titik awal (usage 0).
+        cycle_day None -> pakai tanggal siklus yang sudah tersimpan untuk key ini
+        (sampler background tidak tahu jatuh tempo pelanggan).
+        """
+        ts = time.time() if ts is None else ts
+        key = self.key(router, target)
+        with self._lock:
+            st = self._state.get(key)
+            day = cycle_day or (st or {}).get("day") or self.cycle_day
+            start = cycle_start(ts, day)
+            cycle = start.strftime("%Y-%m-%d")
+            if st is None:
+                self._state[key] = {"c": [upload, download], "t": ts, "cycle": cycle, "used": 0, "hist": {}}
+                if cycle_day:
+                    self._state[key]["day"] = cycle_day
+                self._dirty = True
+                return 0
+            if cycle_day and st.get("day") != cycle_day:
+                # tanggal siklus baru diketahui/berubah: label ulang siklus sample
+                # terakhir, jangan dianggap ganti siklus
+                st["day"] = cycle_day
+                st["cycle"] = cycle_start(st["t"], cycle_day).strftime("%Y-%m-%d")
+            if ts < st["t"]:
+                return st["used"] if st["cycle"] == cycle else 0   # sample lama/terlambat
+            last_up, last_down = st["c"]
+            delta = counter_delta(last_up, upload) + counter_delta(last_down, download)
+            if st["cycle"] != cycle:
+                # ganti siklus di antara dua sample: bagi selisih secara proporsional waktu
+                boundary = start.timestamp()
+                span = ts - st["t"]
+                before = int(delta * (boundary - st["t"]) / span) if span > 0 and boundary > st["t"] else 0
+                hist = st.setdefault("hist", {})
+                hist[st["cycle"]] = st["used"] + before
+                for old in sorted(hist)[:-HISTORY_CYCLES]:
+                    del hist[old]
+                st["cycle"] = cycle
+                st["used"] = delta - before
+            else:
+                st["used"] += delta
+            st["c"] = [upload, download]
+            st["t"] = ts
+            self._dirty = True
+            return st["used"]
+
+    def cycle_usage(self, router, target, ts=None, cycle_day=None):
+        """Bytes siklus berjalan tanpa menambah sample (0 kalau siklus sudah lewat)"""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            st = self._state.get(self.key(router, target))
+            if st is None:
+                return 0
+            day = cycle_day or st.get("day") or self.cycle_day
+            cycle = cycle_start(ts, day).strftime("%Y-%m-%d")
+            return st["used"] if st["cycle"] == cycle else 0
+
+    def record_many(self, router, counters, ts=None):
+        """counters: {target: (upload, download)} dari satu poll. Return jumlah key"""
+        ts = time.time() if ts is None else ts
+        for target, (up, down) in counters.items():
+            self.record(router, target, up, down, ts)
+        return len(counters)
+
+    def meter(self, router, ts=None):
+        """Sampler satu router untuk satu refresh (semua lease memakai timestamp yang sama)"""
+        return RouterMeter(self, router, time.time() if ts is None else ts)
+
+
+class RouterMeter:
+    """
+    Dipakai resolve_lease_usage: satu queue bisa meng-cover banyak lease
+    (target subnet), counter-nya cukup dicatat sekali per refresh.
+    """
+    def __init__(self, engine, router, ts):
+        self.engine = engine
+        self.router = router
+        self.ts = ts
+        self._seen = {}
+
+    def cycle_bytes(self, target, upload, download, cycle_day=None):
+        # queue subnet yang dipakai bersama: siklus ikut lease pertama yang memakainya
+        if target not in self._seen:
+            self._seen[target] = self.engine.record(self.router, target, upload, download, self.ts, cycle_day)
+        return self._seen[target]
+
+    def flush(self):
+        self.engine.save()
@@ -0,0 +1,115 @@
+# usage_sampler.py - poll counter queue & interface di background, hasil ke usage_engine
+#
+# Tombol Refresh tidak perlu lagi menarik `/queue/simple print stats` dari
+# semua router: index queue terakhir hasil poll dipakai selama masih segar,
+# dan sample berkala membuat riwayat usage per siklus tidak bolong.
+import random
+import threading
+import time
+
+from mikrotik_usage import QueueUsageIndex, bytes_to_gb
+
+DEFAULT_POLL_INTERVAL = 300.0   # detik
+DEFAULT_JITTER = 0.1            # +/- 10% dari interval
+DEFAULT_MAX_BACKOFF = 1800.0
+
+
+class UsageSampler:
+    """
+    Satu thread per router:
+      - poll pertama diacak dalam satu interval supaya router tidak dipoll bersamaan
+      - sukses -> tunggu interval (+/- jitter)
+      - gagal  -> tunggu interval * 2^(gagal-1), maksimal max_backoff (+/- jitter)
+    Hasil poll: sample counter ke UsageEngine + snapshot terakhir di memori
+    (index queue & usage interface) yang dibaca GUI lewat latest().
+    """
+    def __init__(self, clients, engine, interval=DEFAULT_POLL_INTERVAL, jitter=DEFAULT_JITTER,
+                 max_backoff=DEFAULT_MAX_BACKOFF, on_sample=None):
+        self.clients = list(clients)
+        self.engine = engine
+        self.interval = float(interval)
+        self.jitter = float(jitter)
+        self.max_backoff = float(max_backoff)
+        self.on_sample = on_sample
+        self._latest = {}       # host -> {"ts", "index", "interfaces"}
+        self._status = {}       # host -> {"failures", "last_ok", "last_error", "next_poll"}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._rnd = random.Random()
+
+    # ---- dibaca GUI / collector ----
+    def latest(self, host, max_age=None):
+        """Snapshot poll terakhir router host, atau None kalau belum ada / lebih tua dari max_age"""
+        max_age = self.interval * 2 if max_age is None else max_age
+        with self._lock:
+            snap = self._latest.get(host)
+        if snap is None or time.time() - snap["ts"] > max_age:
+            return None
+        return snap
+
+    def status(self):
+        with self._lock:
+            return {host: dict(st) for host, st in self._status.items()}
+
+    # ---- thread ----
+    def start(self):
+        if self._threads or self.interval <= 0:
+            return self
+        self._stop.clear()
+        for client in self.clients:
+            t = threading.Thread(target=self._run, args=(client,), name=f"usage-sampler-{client.host}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._threads = []
+
+    def _delay(self, failures):
+        base = self.interval if failures == 0 else min(self.interval * 2 ** (failures - 1), self.max_backoff)
+        return max(1.0, base * (1 + self._rnd.uniform(-self.jitter, self.jitter)))
+
+    def _run(self, client):
+        failures = 0
+        wait = self._rnd.uniform(0, self.interval)
+        while not self._stop.wait(wait):
+            try:
+                self.poll(client)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                self._set_status(client.host, failures=failures, last_error=str(e))
+                print(f"[WARN] Poll usage {client.host} gagal ({failures}x): {e}")
+            wait = self._delay(failures)
+            self._set_status(client.host, next_poll=time.time() + wait)
+
+    def _set_status(self, host, **kw):
+        with self._lock:
+            self._status.setdefault(host, {"failures": 0, "last_ok": None, "last_error": None,
+                                           "next_poll": None}).update(kw)
+
+    def poll(self, client):
+        """Satu poll router: queue + interface -> engine & snapshot. Error dilempar"""
+        if not client.connect():
+            raise ConnectionError(client.last_error or f"Gagal konek ke {client.host}")
+        try:
+            ts = time.time()
+            index = QueueUsageIndex(client.get_queues())
+            counters = client.get_interface_counters()
+        finally:
+            client.disconnect()
+
+        self.engine.record_many(client.host, index.counters(), ts)
+        self.engine.record_many(client.host, {f"iface:{name}": c for name, c in counters.items()}, ts)
+        self.engine.save()
+        interfaces = {name: bytes_to_gb(rx + tx) for name, (rx, tx) in counters.items()}
+        with self._lock:
+            self._latest[client.host] = {"ts": ts, "index": index, "interfaces": interfaces}
+        self._set_status(client.host, failures=0, last_ok=ts, last_error=None)
+        if self.on_sample:
+            try:
+                self.on_sample(client.host)
+            except Exception as e:
+                print(f"[WARN] on_sample sampler gagal: {e}")
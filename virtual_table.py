@@ -0,0 +1,242 @@
+# virtual_table.py - Treeview virtual: item Tk hanya untuk baris yang terlihat (+ margin)
+#
+# Semua baris disimpan di model (list Python). Treeview hanya berisi jendela
+# kecil dari model yang sedang terlihat, diupdate lewat TreeReconciler, jadi
+# scroll 1 baris = hapus 1 + sisip 1 item, berapa pun jumlah pelanggan.
+# Scroll (scrollbar, roda mouse, keyboard), urut (klik judul kolom) dan
+# filter (teks cari) semuanya dihitung di model.
+from tree_reconciler import TreeReconciler, row_key
+
+MARGIN = 5
+DEFAULT_ROW_HEIGHT = 20
+DEFAULT_HEADER_HEIGHT = 24
+
+
+def _sort_key(value):
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    s = str(value if value is not None else "")
+    try:
+        return (0, float(s.replace(",", "")), "")
+    except ValueError:
+        return (1, 0, s.casefold())
+
+
+class VirtualTable:
+    """
+    tree      : ttk.Treeview (kolom & heading sudah dibuat)
+    scrollbar : ttk.Scrollbar vertikal (opsional), dikendalikan tabel ini
+    on_select : callback(row dict atau None) saat user memilih baris
+    Baris diidentifikasi lewat key(row); pilihan disimpan sebagai key, jadi
+    tetap ada walau barisnya sedang di luar jendela atau tabel di-refresh.
+    """
+    def __init__(self, tree, key=row_key, scrollbar=None, on_select=None, margin=MARGIN):
+        self.tree = tree
+        self.key = key
+        self.scrollbar = scrollbar
+        self.on_select = on_select
+        self.margin = margin
+        self._sync = TreeReconciler(tree, key=lambda e: e[0])
+        self._entries = []          # model: (key, values, tags, row)
+        self._by_key = {}
+        self._view = []             # entry setelah filter + urut
+        self._first = 0
+        self._visible = max(1, int(tree.cget("height") or 10))
+        self._row_h = DEFAULT_ROW_HEIGHT
+        self._header_h = DEFAULT_HEADER_HEIGHT
+        self._filter = ""
+        self._search = {}           # key -> teks gabungan lowercase (dibuat saat filter dipakai)
+        self._sort_col = None
+        self._sort_desc = False
+        self.selected_key = None
+        self._columns = list(tree["columns"])
+        self._headings = {c: tree.heading(c, "text") for c in self._columns}
+        for i, col in enumerate(self._columns):
+            tree.heading(col, command=lambda i=i: self.sort_by(i))
+        if scrollbar is not None:
+            scrollbar.config(command=self._on_scrollbar)
+        tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        tree.bind("<Configure>", self._on_configure)
+        tree.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        tree.bind("<Button-5>", lambda e: self.scroll(3))
+        for seq, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"),
+                          ("<Home>", "home"), ("<End>", "end")):
+            tree.bind(seq, lambda e, step=step: self._on_key(step))
+
+    # ---- model ----
+    def __len__(self):
+        return len(self._view)
+
+    @property
+    def total(self):
+        return len(self._entries)
+
+    def set_rows(self, rows, values, tags=None):
+        """
+        Ganti isi model. Posisi scroll ditahan pada baris teratas yang sama.
+        Return status baris terpilih: "removed", "changed" atau None.
+        """
+        top_key = self._view[self._first][0] if self._first < len(self._view) else None
+        old_selected = self._by_key.get(self.selected_key)
+        entries, by_key = [], {}
+        for row in rows:
+            k = str(self.key(row))
+            if k in by_key:                 # key dobel: beri akhiran supaya tetap unik
+                n = 2
+                while f"{k}#{n}" in by_key:
+                    n += 1
+                k = f"{k}#{n}"
+            entry = (k, tuple(values(row)), tuple(tags(row)) if tags else (), row)
+            entries.append(entry)
+            by_key[k] = entry
+        self._entries, self._by_key = entries, by_key
+        self._search = {}
+        self._rebuild_view(anchor=top_key)
+
+        if old_selected is None:
+            return None
+        new_selected = by_key.get(self.selected_key)
+        if new_selected is None:
+            self.selected_key = None
+            return "removed"
+        return "changed" if new_selected[1] != old_selected[1] else None
+
+    def selected_row(self):
+        entry = self._by_key.get(self.selected_key)
+        return entry[3] if entry else None
+
+    def set_filter(self, text):
+        text = (text or "").strip().casefold()
+        if text == self._filter:
+            return
+        self._filter = text
+        self._first = 0
+        self._rebuild_view()
+
+    def sort_by(self, col_index):
+        if self._sort_col == col_index:
+            self._sort_desc = not self._sort_desc
+        else:
+            self._sort_col, self._sort_desc = col_index, False
+        for i, col in enumerate(self._columns):
+            arrow = (" ▼" if self._sort_desc else " ▲") if i == col_index else ""
+            self.tree.heading(col, text=self._headings[col] + arrow)
+        self._rebuild_view(anchor=self.selected_key)
+
+    def _rebuild_view(self, anchor=None):
+        view = self._entries
+        if self._filter:
+            search = self._search
+            if not search:
+                search = self._search = {
+                    e[0]: " ".join(str(v) for v in e[1] if v is not None).casefold() for e in self._entries}
+            needle = self._filter
+            view = [e for e in view if needle in search[e[0]]]
+        if self._sort_col is not None:
+            i = self._sort_col
+            view = sorted(view, key=lambda e: _sort_key(e[1][i] if i < len(e[1]) else None),
+                          reverse=self._sort_desc)
+        self._view = list(view)
+        if anchor is not None:
+            pos = next((n for n, e in enumerate(self._view) if e[0] == anchor), None)
+            if pos is not None:
+                self._first = pos
+        self._render()
+
+    # ---- jendela ----
+    def _window_size(self):
+        return self._visible + self.margin
+
+    def _clamp(self, first):
+        return max(0, min(first, len(self._view) - self._visible))
+
+    def _render(self):
+        self._first = self._clamp(self._first)
+        window = self._view[self._first:self._first + self._window_size()]
+        self._sync.apply(window, lambda e: e[1], lambda e: e[2])
+        tree = self.tree
+        tree.yview_moveto(0)
+        in_window = self.selected_key is not None and any(e[0] == self.selected_key for e in window)
+        if in_window:
+            if tree.selection() != (self.selected_key,):
+                tree.selection_set(self.selected_key)
+            tree.focus(self.selected_key)
+        elif tree.selection():
+            tree.selection_set(())
+        if window:
+            box = tree.bbox(window[0][0])
+            if box:
+                self._header_h, self._row_h = box[1], max(1, box[3])
+        if self.scrollbar is not None:
+            n = len(self._view)
+            if n:
+                self.scrollbar.set(self._first / n, min(1.0, (self._first + self._visible) / n))
+            else:
+                self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, rows):
+        first = self._clamp(self._first + rows)
+        if first != self._first:
+            self._first = first
+            self._render()
+        return "break"
+
+    def scroll_to(self, index):
+        """Pastikan baris ke-index (di view) terlihat"""
+        if index < self._first:
+            self._first = index
+        elif index >= self._first + self._visible:
+            self._first = index - self._visible + 1
+        self._render()
+
+    def _on_scrollbar(self, *args):
+        n = len(self._view)
+        if args[0] == "moveto":
+            self._first = int(float(args[1]) * n)
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self._first += amount * (self._visible if args[2] == "pages" else 1)
+        self._render()
+
+    def _on_configure(self, event):
+        visible = max(1, (event.height - self._header_h) // self._row_h)
+        if visible != self._visible:
+            self._visible = visible
+            self._render()
+
+    # ---- pilihan ----
+    def _select_index(self, index):
+        if not self._view:
+            return
+        index = max(0, min(index, len(self._view) - 1))
+        self.selected_key = self._view[index][0]
+        self.scroll_to(index)
+        if self.on_select:
+            self.on_select(self.selected_row())
+
+    def _on_key(self, step):
+        n = len(self._view)
+        pos = next((i for i, e in enumerate(self._view) if e[0] == self.selected_key), None)
+        if pos is None:
+            pos = self._first - 1 if step in (1, "page") else self._first
+        if step == "home":
+            target = 0
+        elif step == "end":
+            target = n - 1
+        elif step == "page":
+            target = pos + self._visible
+        elif step == "-page":
+            target = pos - self._visible
+        else:
+            target = pos + step
+        self._select_index(target)
+        return "break"
+
+    def _on_tree_select(self, event=None):
+        sel = self.tree.selection()
+        if not sel or sel[0] == self.selected_key:
+            return   # perubahan dari _render (scroll/refresh), bukan pilihan user
+        self.selected_key = sel[0]
+        if self.on_select:
+            self.on_select(self.selected_row())